@@ -6,6 +6,10 @@ from .DosType import *
 from .FSError import *
 
 
+def _popcount(val):
+    return bin(val).count("1")
+
+
 class ADFSBitmap:
     def __init__(self, root_blk):
         self.root_blk = root_blk
@@ -13,7 +17,8 @@ class ADFSBitmap:
         # state
         self.ext_blks = []
         self.bitmap_blks = []
-        self.bitmap_data = None
+        # bitmap is stored as a list of longs. a set bit marks a free block
+        self.bitmap_words = None
         self.valid = False
         # bitmap block entries
         self.bitmap_blk_bytes = root_blk.blkdev.block_bytes - 4
@@ -27,6 +32,7 @@ class ADFSBitmap:
         if last_long_bits == 0:
             last_long_bits = 32
         self.bitmap_last_long_bits = last_long_bits
+        self.bitmap_last_long_mask = (1 << last_long_bits) - 1
         # number of blocks required for bitmap (and bytes consumed there)
         self.bitmap_num_blks = (
             self.bitmap_longs + self.bitmap_blk_longs - 1
@@ -45,13 +51,16 @@ class ADFSBitmap:
         self.dirty = False
         # for DOS6/7 track used blocks
         self.num_used = 0
+        # number of free blocks (always kept up to date)
+        self.num_free = 0
 
     def create(self):
         # clear local count
         self.num_used = 0
 
-        # create data and preset with 0xff
-        self.bitmap_data = bytearray([0xFF] * self.bitmap_all_blk_bytes)
+        # create data and preset with all free
+        self.bitmap_words = [0xFFFFFFFF] * (self.bitmap_all_blk_bytes // 4)
+        self.num_free = self.bitmap_bits
 
         # clear bit for root block
         blk_pos = self.root_blk.blk_num
@@ -119,12 +128,32 @@ class ADFSBitmap:
 
     def _write_bitmap_blks(self):
         # write bitmap blocks
+        bitmap_data = self.get_bitmap_data()
         off = 0
         for blk in self.bitmap_blks:
-            blk.set_bitmap_data(self.bitmap_data[off : off + self.bitmap_blk_bytes])
+            blk.set_bitmap_data(bitmap_data[off : off + self.bitmap_blk_bytes])
             blk.write()
             off += self.bitmap_blk_bytes
 
+    def get_bitmap_data(self):
+        """return the bitmap as raw bytes"""
+        n = len(self.bitmap_words)
+        return struct.pack(">%dI" % n, *self.bitmap_words)
+
+    def _set_bitmap_data(self, data):
+        n = len(data) // 4
+        self.bitmap_words = list(struct.unpack(">%dI" % n, data))
+        self.num_free = self._count_free()
+
+    def _count_free(self):
+        # popcount all full longs at once and mask the last one
+        last = self.bitmap_longs - 1
+        words = self.bitmap_words
+        data = struct.pack(">%dI" % last, *words[:last])
+        num = _popcount(int.from_bytes(data, "big"))
+        num += _popcount(words[last] & self.bitmap_last_long_mask)
+        return num
+
     def read(self):
         self.bitmap_blks = []
         bitmap_data = bytearray()
@@ -179,7 +208,7 @@ class ADFSBitmap:
                 extra="got=%d want=%d" % (self.bitmap_num_blks, num_bm_blks),
             )
 
-        self.bitmap_data = bitmap_data
+        self._set_bitmap_data(bitmap_data)
         self.valid = True
 
     def find_free(self):
@@ -188,60 +217,103 @@ class ADFSBitmap:
             return result[0]
 
     def find_n_free(self, num):
+        """find num free blocks (not necessarily contiguous) with first fit"""
+        if num > self.num_free:
+            return None
         result = []
+        words = self.bitmap_words
+        num_longs = self.bitmap_longs
+        last_long = num_longs - 1
         long_off = self.find_start_off
-        last_long = self.bitmap_longs - 1
         # run through all longs of bitmap if needed
-        for n in range(self.bitmap_longs):
-            # read bitmap long
-            val = struct.unpack_from(">I", self.bitmap_data, long_off * 4)[0]
+        for n in range(num_longs):
+            val = words[long_off]
+            # last long has less bits
+            if long_off == last_long:
+                val &= self.bitmap_last_long_mask
             # some bits are free in here.. find em
             if val != 0:
-                # last long has less bits
-                if long_off == last_long:
-                    max_bits = self.bitmap_last_long_bits
-                else:
-                    max_bits = 32
-
                 base_blk_num = self.blkdev.reserved + long_off * 32
-
-                # walk through bits and collect free ones
-                for bit in range(max_bits):
-                    mask = 1 << bit
-                    if (val & mask) == mask:
-                        blk_num = base_blk_num + bit
-                        result.append(blk_num)
-                        # got all free blocks?
-                        if len(result) == num:
-                            # keep as start offset for the next time
-                            self.find_start_off = long_off
-                            return result
+                while val != 0:
+                    # lowest set bit
+                    low = val & -val
+                    result.append(base_blk_num + low.bit_length() - 1)
+                    # got all free blocks?
+                    if len(result) == num:
+                        # keep as start offset for the next time
+                        self.find_start_off = long_off
+                        return result
+                    val ^= low
 
             # next long
             long_off += 1
-            if long_off == self.bitmap_longs:
+            if long_off == num_longs:
                 long_off = 0
 
+    def find_free_run(self, num):
+        """find a contiguous run of num free blocks.
+        return the first block number of the run or None"""
+        if num > self.num_free:
+            return None
+        start_off = self.find_start_off
+        blk_off = self._find_free_run_in(num, start_off, self.bitmap_longs)
+        if blk_off is None and start_off > 0:
+            blk_off = self._find_free_run_in(num, 0, self.bitmap_longs)
+        if blk_off is None:
+            return None
+        self.find_start_off = blk_off // 32
+        return blk_off + self.blkdev.reserved
+
+    def _find_free_run_in(self, num, begin_long, end_long):
+        words = self.bitmap_words
+        last_long = self.bitmap_longs - 1
+        run_begin = 0
+        run_len = 0
+        for long_off in range(begin_long, end_long):
+            val = words[long_off]
+            max_bits = 32
+            if long_off == last_long:
+                val &= self.bitmap_last_long_mask
+                max_bits = self.bitmap_last_long_bits
+            if val == 0xFFFFFFFF:
+                # all free: extend run by full long
+                if run_len == 0:
+                    run_begin = long_off * 32
+                run_len += 32
+                if run_len >= num:
+                    return run_begin
+            elif val == 0:
+                # all used: skip long
+                run_len = 0
+            else:
+                bit_off = long_off * 32
+                for bit in range(max_bits):
+                    if val & (1 << bit):
+                        if run_len == 0:
+                            run_begin = bit_off + bit
+                        run_len += 1
+                        if run_len == num:
+                            return run_begin
+                    else:
+                        run_len = 0
+
     def get_num_free(self):
-        num = 0
-        res = self.blkdev.reserved
-        for i in range(self.bitmap_bits):
-            if self.get_bit(i + res):
-                num += 1
-        return num
+        return self.num_free
 
     def get_num_used(self):
-        num = 0
-        res = self.blkdev.reserved
-        for i in range(self.bitmap_bits):
-            if not self.get_bit(i + res):
-                num += 1
-        return num
+        return self.bitmap_bits - self.num_free
 
     def alloc_n(self, num):
-        free_blks = self.find_n_free(num)
-        if free_blks == None:
-            return None
+        """allocate num blocks. prefer a contiguous run of blocks"""
+        free_blks = None
+        if num > 1:
+            blk_num = self.find_free_run(num)
+            if blk_num is not None:
+                free_blks = list(range(blk_num, blk_num + num))
+        if free_blks is None:
+            free_blks = self.find_n_free(num)
+            if free_blks is None:
+                return None
         for b in free_blks:
             self.clr_bit(b)
         return free_blks
@@ -254,47 +326,42 @@ class ADFSBitmap:
         if off < self.blkdev.reserved or off >= self.blkdev.num_blocks:
             return None
         off = off - self.blkdev.reserved
-        long_off = off // 32
-        bit_off = off % 32
-        val = struct.unpack_from(">I", self.bitmap_data, long_off * 4)[0]
-        mask = 1 << bit_off
-        return (val & mask) == mask
+        val = self.bitmap_words[off >> 5]
+        return (val >> (off & 31)) & 1 == 1
 
     # mark as free
     def set_bit(self, off):
         if off < self.blkdev.reserved or off >= self.blkdev.num_blocks:
             return False
         off = off - self.blkdev.reserved
-        long_off = off // 32
-        bit_off = off % 32
-        val = struct.unpack_from(">I", self.bitmap_data, long_off * 4)[0]
-        mask = 1 << bit_off
+        long_off = off >> 5
+        mask = 1 << (off & 31)
+        val = self.bitmap_words[long_off]
         if val & mask == 0:
-            val = val | mask
-            struct.pack_into(">I", self.bitmap_data, long_off * 4, val)
+            self.bitmap_words[long_off] = val | mask
             self.dirty = True
             self.num_used -= 1
+            self.num_free += 1
 
     # mark as used
     def clr_bit(self, off):
         if off < self.blkdev.reserved or off >= self.blkdev.num_blocks:
             return False
         off = off - self.blkdev.reserved
-        long_off = off // 32
-        bit_off = off % 32
-        val = struct.unpack_from(">I", self.bitmap_data, long_off * 4)[0]
-        mask = 1 << bit_off
+        long_off = off >> 5
+        mask = 1 << (off & 31)
+        val = self.bitmap_words[long_off]
         if val & mask == mask:
-            val = val & ~mask
-            struct.pack_into(">I", self.bitmap_data, long_off * 4, val)
+            self.bitmap_words[long_off] = val & ~mask
             self.dirty = True
             self.num_used += 1
+            self.num_free -= 1
 
     def dump(self):
         print("Bitmap:")
         print("  ext: ", self.ext_blks)
         print("  blks:", len(self.bitmap_blks))
-        print("  bits:", len(self.bitmap_data) * 8, self.blkdev.num_blocks)
+        print("  bits:", len(self.bitmap_words) * 32, self.blkdev.num_blocks)
 
     def print_info(self):
         num_free = self.get_num_free()
@@ -1,8 +1,10 @@
 import struct
 from .block.Block import Block
+from .block.EntryBlock import EntryBlock
 from .block.UserDirBlock import UserDirBlock
 from .block.DirCacheBlock import *
 from .ADFSFile import ADFSFile
+from .ADFSFileStream import ADFSFileWriter
 from .ADFSNode import ADFSNode
 from .FileName import FileName
 from .FSError import *
@@ -38,10 +40,15 @@ class ADFSDir(ADFSNode):
             dcb.write()
 
     def blocks_create_old(self, anon_blk):
-        ud = UserDirBlock(self.blkdev, anon_blk.blk_num, self.volume.is_longname)
-        ud.set(anon_blk.data)
-        if not ud.valid:
-            raise FSError(INVALID_USER_DIR_BLOCK, block=anon_blk)
+        # already decoded block from cache?
+        if isinstance(anon_blk, UserDirBlock):
+            ud = anon_blk
+        else:
+            ud = UserDirBlock(self.blkdev, anon_blk.blk_num, self.volume.is_longname)
+            ud.set(anon_blk.data)
+            if not ud.valid:
+                raise FSError(INVALID_USER_DIR_BLOCK, block=anon_blk)
+            self.volume.block_cache.put(ud)
         self.set_block(ud)
         return ud
 
@@ -70,40 +77,62 @@ class ADFSDir(ADFSNode):
         return hash_chain, node
 
     def _init_name_hash(self):
-        self.name_hash = []
+        # a slot holds the nodes of a hash chain or None if not read yet
         self.hash_size = self.block.hash_size
-        for i in range(self.hash_size):
-            self.name_hash.append([])
+        self.name_hash = [None] * self.hash_size
+
+    def _get_hash_idx(self, fn):
+        if self.name_hash is None:
+            self._init_name_hash()
+        return fn.hash(hash_size=self.hash_size)
+
+    def _get_hash_chain(self, hash_idx):
+        """return the nodes of a hash chain. only this chain is read"""
+        if self.name_hash is None:
+            self._init_name_hash()
+        chain = self.name_hash[hash_idx]
+        if chain is not None:
+            return chain
+        chain = []
+        block_cache = self.volume.block_cache
+        blk_num = self.block.hash_table[hash_idx]
+        while blk_num != 0:
+            # take decoded block from cache or read anonymous block
+            blk = block_cache.get(blk_num, EntryBlock)
+            if blk is None:
+                blk = Block(self.blkdev, blk_num)
+                blk.read()
+                if not blk.valid:
+                    self.valid = False
+                    break
+            # create file/dir node
+            blk_num, node = self._read_add_node(blk, False)
+            chain.append(node)
+        self.name_hash[hash_idx] = chain
+        return chain
 
     def read(self, recursive=False):
-        self._init_name_hash()
+        # read all hash chains. already read chains keep their nodes
+        if self.name_hash is None:
+            self._init_name_hash()
+        chains = [self._get_hash_chain(i) for i in range(self.hash_size)]
+        # entries are ordered like a breadth first scan of all chains
         self.entries = []
-
-        # create initial list with blk_num/hash_index for dir scan
-        blocks = []
-        for i in range(self.block.hash_size):
-            blk_num = self.block.hash_table[i]
-            if blk_num != 0:
-                blocks.append((blk_num, i))
-
-        for blk_num, hash_idx in blocks:
-            # read anonymous block
-            blk = Block(self.blkdev, blk_num)
-            blk.read()
-            if not blk.valid:
-                self.valid = False
-                return
-            # create file/dir node
-            hash_chain, node = self._read_add_node(blk, recursive)
-            # store node in entries
-            self.entries.append(node)
-            # store node in name_hash
-            self.name_hash[hash_idx].append(node)
-            # follow hash chain
-            if hash_chain != 0:
-                blocks.append((hash_chain, hash_idx))
+        depth = 0
+        while chains:
+            chains = [c for c in chains if len(c) > depth]
+            for c in chains:
+                self.entries.append(c[depth])
+            depth += 1
+        if recursive:
+            for node in self.entries:
+                if isinstance(node, ADFSDir):
+                    node.read(True)
 
         # dircaches available?
+        self._read_dircache()
+
+    def _read_dircache(self):
         if self.volume.is_dircache:
             self.dcache_blks = []
             dcb_num = self.block.extension
@@ -116,10 +145,17 @@ class ADFSDir(ADFSNode):
                 self.dcache_blks.append(dcb)
                 dcb_num = dcb.next_cache
 
+    def _ensure_dircache(self):
+        if self.volume.is_dircache and self.dcache_blks is None:
+            self._read_dircache()
+
     def flush(self):
-        if self.entries:
-            for e in self.entries:
-                e.flush()
+        if self.name_hash:
+            for chain in self.name_hash:
+                if chain:
+                    for e in chain:
+                        if e is not None:
+                            e.flush()
         self.entries = None
         self.name_hash = None
 
@@ -131,14 +167,18 @@ class ADFSDir(ADFSNode):
         self.ensure_entries()
         return self.entries
 
-    def has_name(self, fn):
-        fn_hash = fn.hash(hash_size=self.hash_size)
+    def _find_name(self, fn):
+        """return the node with the given FileName or None.
+        only the hash chain of the name is read"""
+        fn_hash = self._get_hash_idx(fn)
         fn_up = fn.get_upper_ami_str()
-        node_list = self.name_hash[fn_hash]
-        for node in node_list:
-            if node.name.get_upper_ami_str() == fn_up:
-                return True
-        return False
+        for node in self._get_hash_chain(fn_hash):
+            if node is not None and node.name.get_upper_ami_str() == fn_up:
+                return node
+        return None
+
+    def has_name(self, fn):
+        return self._find_name(fn) is not None
 
     def blocks_create_new(self, free_blks, name, hash_chain_blk, parent_blk, meta_info):
         blk_num = free_blks[0]
@@ -154,6 +194,7 @@ class ADFSDir(ADFSNode):
             hash_chain_blk,
         )
         ud.write()
+        self.volume.block_cache.put(ud)
         self.set_block(ud)
         self._init_name_hash()
         # DOS5: create extra blocks
@@ -167,7 +208,7 @@ class ADFSDir(ADFSNode):
         return 1
 
     def _create_node(self, node, name, meta_info, update_ts=True):
-        self.ensure_entries()
+        self._ensure_dircache()
 
         # make sure a default meta_info is available
         if meta_info == None:
@@ -184,8 +225,8 @@ class ADFSDir(ADFSNode):
         if self.has_name(fn):
             raise FSError(NAME_ALREADY_EXISTS, file_name=name, node=self)
         # calc hash index of name
-        fn_hash = fn.hash(hash_size=self.hash_size)
-        hash_chain = self.name_hash[fn_hash]
+        fn_hash = self._get_hash_idx(fn)
+        hash_chain = self._get_hash_chain(fn_hash)
         if len(hash_chain) == 0:
             hash_chain_blk = 0
         else:
@@ -227,8 +268,9 @@ class ADFSDir(ADFSNode):
         self.block.write()
 
         # add node
-        self.name_hash[fn_hash].insert(0, node)
-        self.entries.append(node)
+        hash_chain.insert(0, node)
+        if self.entries is not None:
+            self.entries.append(node)
 
         # update time stamps
         if update_ts:
@@ -255,8 +297,31 @@ class ADFSDir(ADFSNode):
         self._create_node(node, name, meta_info, update_ts)
         return node
 
+    def create_file_stream(self, name, meta_info=None, update_ts=True, size_hint=None):
+        """create an empty file and return a writer for its contents"""
+        if not isinstance(name, FSString):
+            raise ValueError("create_file_stream's name must be a FSString")
+        node = ADFSFile(self.volume, self)
+        # make sure the file fits before creating it
+        if size_hint is not None:
+            node.data_size = size_hint
+            num_blks = (
+                1 + node.calc_number_of_data_blks() + node.calc_number_of_list_blks()
+            )
+            if num_blks > self.volume.bitmap.get_num_free():
+                raise FSError(
+                    NO_FREE_BLOCKS,
+                    node=self,
+                    file_name=name,
+                    extra="want %d" % num_blks,
+                )
+        node.set_file_data(b"")
+        self._create_node(node, name, meta_info, update_ts)
+        node.flush()
+        return ADFSFileWriter(node, size_hint)
+
     def _delete(self, node, wipe, update_ts):
-        self.ensure_entries()
+        self._ensure_dircache()
 
         # can we delete?
         if not node.can_delete():
@@ -264,11 +329,9 @@ class ADFSDir(ADFSNode):
         # make sure its a node of mine
         if node.parent != self:
             raise FSError(INTERNAL_ERROR, node=node, extra="node parent is not me")
-        if node not in self.entries:
-            raise FSError(INTERNAL_ERROR, node=node, extra="node not in entries")
         # get hash key
-        hash_key = node.name.hash(hash_size=self.hash_size)
-        names = self.name_hash[hash_key]
+        hash_key = self._get_hash_idx(node.name)
+        names = self._get_hash_chain(hash_key)
         # find my node
         pos = None
         for i in range(len(names)):
@@ -299,12 +362,15 @@ class ADFSDir(ADFSNode):
             prev.block.write()
 
         # remove from my lists
-        self.entries.remove(node)
+        if self.entries is not None:
+            self.entries.remove(node)
         names.remove(node)
 
         # remove blocks of node in bitmap
         blk_nums = node.get_block_nums()
         self.volume.bitmap.dealloc_n(blk_nums)
+        # drop decoded blocks as the block numbers will be reused
+        self.volume.block_cache.invalidate_n(blk_nums)
 
         # dircache?
         if self.volume.is_dircache:
@@ -352,30 +418,30 @@ class ADFSDir(ADFSNode):
     def get_path(self, pc, allow_file=True, allow_dir=True):
         if len(pc) == 0:
             return self
-        self.ensure_entries()
-        for e in self.entries:
-            if not isinstance(pc[0], FileName):
-                raise ValueError("get_path's pc must be a FileName array")
-            if e.name.get_upper_ami_str() == pc[0].get_upper_ami_str():
-                if len(pc) > 1:
-                    if isinstance(e, ADFSDir):
-                        return e.get_path(pc[1:], allow_file, allow_dir)
-                    else:
-                        return None
+        if not isinstance(pc[0], FileName):
+            raise ValueError("get_path's pc must be a FileName array")
+        # only follow the hash chain of the name
+        e = self._find_name(pc[0])
+        if e is None:
+            return None
+        if len(pc) > 1:
+            if isinstance(e, ADFSDir):
+                return e.get_path(pc[1:], allow_file, allow_dir)
+            else:
+                return None
+        else:
+            if isinstance(e, ADFSDir):
+                if allow_dir:
+                    return e
                 else:
-                    if isinstance(e, ADFSDir):
-                        if allow_dir:
-                            return e
-                        else:
-                            return None
-                    elif isinstance(e, ADFSFile):
-                        if allow_file:
-                            return e
-                        else:
-                            return None
-                    else:
-                        return None
-        return None
+                    return None
+            elif isinstance(e, ADFSFile):
+                if allow_file:
+                    return e
+                else:
+                    return None
+            else:
+                return None
 
     def draw_on_bitmap(self, bm, show_all=False, first=True):
         blk_num = self.block.blk_num
@@ -526,6 +592,7 @@ class ADFSDir(ADFSNode):
             return None
 
     def get_dircache_record(self, name):
+        self._ensure_dircache()
         if self.dcache_blks:
             for dcb in self.dcache_blks:
                 record = dcb.get_record_by_name(name)
@@ -534,6 +601,7 @@ class ADFSDir(ADFSNode):
         return None
 
     def update_dircache_record(self, record, rebuild):
+        self._ensure_dircache()
         if self.dcache_blks == None:
             return
         # update record
@@ -548,6 +616,7 @@ class ADFSDir(ADFSNode):
                     break
 
     def get_block_usage(self, all=False, first=True):
+        self._ensure_dircache()
         num_non_data = 1
         num_data = 0
         if self.dcache_blks != None:
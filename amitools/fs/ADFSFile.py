@@ -3,6 +3,7 @@ from .block.FileHeaderBlock import FileHeaderBlock
 from .block.FileListBlock import FileListBlock
 from .block.FileDataBlock import FileDataBlock
 from .ADFSNode import ADFSNode
+from .ADFSFileStream import ADFSFileReader
 from .FSError import *
 
 
@@ -27,11 +28,19 @@ class ADFSFile(ADFSNode):
         )
 
     def blocks_create_old(self, anon_blk):
-        # create file header block
-        fhb = FileHeaderBlock(self.blkdev, anon_blk.blk_num, self.volume.is_longname)
-        fhb.set(anon_blk.data)
-        if not fhb.valid:
-            raise FSError(INVALID_FILE_HEADER_BLOCK, block=anon_blk)
+        block_cache = self.volume.block_cache
+        # already decoded block from cache?
+        if isinstance(anon_blk, FileHeaderBlock):
+            fhb = anon_blk
+        else:
+            # create file header block
+            fhb = FileHeaderBlock(
+                self.blkdev, anon_blk.blk_num, self.volume.is_longname
+            )
+            fhb.set(anon_blk.data)
+            if not fhb.valid:
+                raise FSError(INVALID_FILE_HEADER_BLOCK, block=anon_blk)
+            block_cache.put(fhb)
         self.set_block(fhb)
 
         # retrieve data blocks and size from header
@@ -41,10 +50,13 @@ class ADFSFile(ADFSNode):
         # scan for extension blocks
         next_ext = self.block.extension
         while next_ext != 0:
-            ext_blk = FileListBlock(self.block.blkdev, next_ext)
-            ext_blk.read()
-            if not ext_blk.valid:
-                raise FSError(INVALID_FILE_LIST_BLOCK, block=ext_blk)
+            ext_blk = block_cache.get(next_ext, FileListBlock)
+            if ext_blk is None:
+                ext_blk = FileListBlock(self.block.blkdev, next_ext)
+                ext_blk.read()
+                if not ext_blk.valid:
+                    raise FSError(INVALID_FILE_LIST_BLOCK, block=ext_blk)
+                block_cache.put(ext_blk)
             self.ext_blk_nums.append(next_ext)
             self.ext_blks.append(ext_blk)
             self.data_blk_nums += ext_blk.data_blocks
@@ -77,56 +89,109 @@ class ADFSFile(ADFSNode):
 
         return fhb
 
+    # max number of blocks fetched with a single read
+    MAX_EXTENT_BLKS = 2048
+
+    def get_data_extents(self, max_blks=None):
+        """group the data blocks into runs of contiguous blocks
+        return: list of (first_blk_num, num_blks)
+        """
+        if max_blks is None:
+            max_blks = self.MAX_EXTENT_BLKS
+        extents = []
+        first = None
+        num = 0
+        for blk in self.data_blk_nums:
+            if first is not None and blk == first + num and num < max_blks:
+                num += 1
+            else:
+                if first is not None:
+                    extents.append((first, num))
+                first = blk
+                num = 1
+        if first is not None:
+            extents.append((first, num))
+        return extents
+
     def read(self):
         """read data blocks"""
         self.data_blks = []
-        want_seq_num = 1
-        total_size = 0
-        is_ffs = self.volume.is_ffs
         byte_size = self.block.byte_size
-        data = bytearray()
+        data = bytearray(byte_size)
+        pos = 0
+        # the iterator makes sure the size matches
+        for chunk in self.iter_data(store_blks=True):
+            end = pos + len(chunk)
+            data[pos:end] = chunk
+            pos = end
+        # store full contents of file
+        self.data = data
+
+    def iter_data(self, max_blks=None, store_blks=False):
+        """iterate over the file contents in chunks.
+        FFS returns a chunk per extent and OFS a chunk per data block.
+        Raises FSError after the last chunk if the data does not match
+        the file size.
+        """
+        if self.volume.is_ffs:
+            return self._iter_ffs(max_blks)
+        else:
+            return self._iter_ofs(store_blks)
+
+    def _iter_ffs(self, max_blks):
+        # ffs has raw data blocks: read contiguous runs at once
+        blkdev = self.volume.blkdev
+        left = self.block.byte_size
+        for blk, num in self.get_data_extents(max_blks):
+            if left == 0:
+                break
+            ext_data = blkdev.read_block(blk, num_blks=num)
+            # shrink last read if necessary
+            if len(ext_data) > left:
+                ext_data = ext_data[:left]
+            left -= len(ext_data)
+            yield ext_data
+        if left > 0:
+            self._raise_size_mismatch(self.block.byte_size - left)
+
+    def _iter_ofs(self, store_blks):
+        want_seq_num = 1
+        got_size = 0
         for blk in self.data_blk_nums:
-            if is_ffs:
-                # ffs has raw data blocks
-                dat_blk = self.volume.blkdev.read_block(blk)
-                total_size += len(dat_blk)
-                # shrink last read if necessary
-                if total_size > byte_size:
-                    shrink = total_size - byte_size
-                    dat_blk = dat_blk[:-shrink]
-                    total_size = byte_size
-                data += dat_blk
-            else:
-                # ofs
-                dat_blk = FileDataBlock(self.block.blkdev, blk)
-                dat_blk.read()
-                if not dat_blk.valid:
-                    raise FSError(INVALID_FILE_DATA_BLOCK, block=dat_blk, node=self)
-                # check sequence number
-                if dat_blk.seq_num != want_seq_num:
-                    raise FSError(
-                        INVALID_SEQ_NUM,
-                        block=dat_blk,
-                        node=self,
-                        extra="got=%d wanted=%d" % (dat_blk.seq_num, want_seq_num),
-                    )
-                # store data blocks
+            dat_blk = FileDataBlock(self.block.blkdev, blk)
+            dat_blk.read()
+            if not dat_blk.valid:
+                raise FSError(INVALID_FILE_DATA_BLOCK, block=dat_blk, node=self)
+            # check sequence number
+            if dat_blk.seq_num != want_seq_num:
+                raise FSError(
+                    INVALID_SEQ_NUM,
+                    block=dat_blk,
+                    node=self,
+                    extra="got=%d wanted=%d" % (dat_blk.seq_num, want_seq_num),
+                )
+            # store data blocks
+            if store_blks:
                 self.data_blks.append(dat_blk)
-                total_size += dat_blk.data_size
-                data += dat_blk.get_block_data()
+            blk_data = dat_blk.get_block_data()
+            got_size += len(blk_data)
+            yield blk_data
             want_seq_num += 1
-        # store full contents of file
-        self.data = data
-        # make sure all went well
-        got_size = len(data)
+        if got_size != self.block.byte_size:
+            self._raise_size_mismatch(got_size)
+
+    def _raise_size_mismatch(self, got_size):
         want_size = self.block.byte_size
-        if got_size != want_size:
-            raise FSError(
-                INTERNAL_ERROR,
-                block=self.block,
-                node=self,
-                extra="file size mismatch: got=%d want=%d" % (got_size, want_size),
-            )
+        raise FSError(
+            INTERNAL_ERROR,
+            block=self.block,
+            node=self,
+            extra="file size mismatch: got=%d want=%d" % (got_size, want_size),
+        )
+
+    def open_read(self, max_blks=None):
+        """open a file-like reader that streams the file contents"""
+        return ADFSFileReader(self, max_blks)
 
     def get_file_data(self):
         if self.data != None:
@@ -192,17 +257,10 @@ class ADFSFile(ADFSNode):
             self.data_blk_nums.append(free_blks[off])
             off += 1
 
-        ppb = self.volume.blkdev.block_longs - 56  # data pointer per block
-
         # create file header block
         fhb = FileHeaderBlock(self.blkdev, fhb_num, self.volume.is_longname)
         byte_size = len(self.data)
-        if self.num_data_blks > ppb:
-            hdr_blks = self.data_blk_nums[0:ppb]
-            hdr_ext = self.ext_blk_nums[0]
-        else:
-            hdr_blks = self.data_blk_nums
-            hdr_ext = 0
+        hdr_blks, hdr_ext = self._get_header_blk_list()
 
         fhb.create(
             parent_blk,
@@ -216,10 +274,32 @@ class ADFSFile(ADFSNode):
             hash_chain_blk,
         )
         fhb.write()
+        self.volume.block_cache.put(fhb)
         self.set_block(fhb)
 
         # create file list (=ext) blocks
+        self._write_list_blks()
+
+        # write data blocks
+        self.write()
+
+        self.valid = True
+        return fhb_num
+
+    def _get_header_blk_list(self):
+        """return the data block numbers and the extension stored in the header"""
+        ppb = self.volume.blkdev.block_longs - 56  # data pointer per block
+        if self.num_data_blks > ppb:
+            return self.data_blk_nums[0:ppb], self.ext_blk_nums[0]
+        else:
+            return self.data_blk_nums, 0
+
+    def _write_list_blks(self):
+        """create and write the file list (=ext) blocks"""
+        fhb_num = self.block.blk_num
+        ppb = self.volume.blkdev.block_longs - 56  # data pointer per block
         ext_off = ppb
+        self.ext_blks = []
         for i in range(self.num_ext_blks):
             flb = FileListBlock(self.blkdev, self.ext_blk_nums[i])
             if i == self.num_ext_blks - 1:
@@ -230,14 +310,26 @@ class ADFSFile(ADFSNode):
                 blks = self.data_blk_nums[ext_off : ext_off + ppb]
             flb.create(fhb_num, blks, ext_blk)
             flb.write()
+            self.volume.block_cache.put(flb)
             self.ext_blks.append(flb)
             ext_off += ppb
 
-        # write data blocks
-        self.write()
-
-        self.valid = True
-        return fhb_num
+    def update_blk_lists(self, data_blk_nums, ext_blk_nums, byte_size):
+        """update header and file list blocks for new data blocks"""
+        self.data_blk_nums = data_blk_nums
+        self.ext_blk_nums = ext_blk_nums
+        self.data_size = byte_size
+        self.num_data_blks = len(data_blk_nums)
+        self.num_ext_blks = len(ext_blk_nums)
+        hdr_blks, hdr_ext = self._get_header_blk_list()
+        fhb = self.block
+        fhb.data_blocks = hdr_blks
+        fhb.block_count = len(hdr_blks)
+        fhb.first_data = hdr_blks[0] if hdr_blks else 0
+        fhb.extension = hdr_ext
+        fhb.byte_size = byte_size
+        fhb.write()
+        self._write_list_blks()
 
     def write(self):
         self.data_blks = []
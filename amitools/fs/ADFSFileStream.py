@@ -0,0 +1,236 @@
+from .block.FileDataBlock import FileDataBlock
+from .FSError import *
+
+
+class ADFSFileReader:
+    """a file-like object that streams the contents of a file node.
+
+    Only a single chunk of the file (an extent in FFS or a data block in OFS)
+    is kept in memory. Iterating over the reader returns these chunks.
+    """
+
+    # number of blocks read at once
+    MAX_BLKS = 64
+
+    def __init__(self, node, max_blks=None):
+        if max_blks is None:
+            max_blks = self.MAX_BLKS
+        self.node = node
+        self.size = node.get_size()
+        self.pos = 0
+        self.chunks = node.iter_data(max_blks)
+        self.buf = b""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        if self.buf:
+            chunk = bytes(self.buf)
+            self.buf = b""
+            self.pos += len(chunk)
+            yield chunk
+        for chunk in self.chunks:
+            self.pos += len(chunk)
+            yield bytes(chunk)
+
+    def _next_chunk(self):
+        if not self.buf:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return False
+            self.buf = memoryview(chunk)
+        return True
+
+    def read(self, size=-1):
+        result = bytearray()
+        while size is None or size < 0 or len(result) < size:
+            if not self._next_chunk():
+                break
+            if size is None or size < 0:
+                n = len(self.buf)
+            else:
+                n = min(size - len(result), len(self.buf))
+            result += self.buf[:n]
+            self.buf = self.buf[n:]
+        self.pos += len(result)
+        return bytes(result)
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        n = len(data)
+        b[:n] = data
+        return n
+
+    def tell(self):
+        return self.pos
+
+    def close(self):
+        self.chunks = iter(())
+        self.buf = b""
+
+
+class ADFSFileWriter:
+    """a file-like object that writes the contents of a new file node.
+
+    Data blocks are allocated from the bitmap while the data arrives and
+    only a single block of data is buffered. The header and list blocks
+    are written on close(). If the final size is known then pass it as
+    size_hint to allocate all data blocks in a single run.
+
+    If writing fails then the file is removed again and all of its blocks
+    are returned to the bitmap.
+    """
+
+    # number of data blocks allocated at once
+    ALLOC_BLKS = 64
+
+    def __init__(self, node, size_hint=None):
+        self.node = node
+        self.volume = node.volume
+        self.blkdev = node.blkdev
+        self.bitmap = self.volume.bitmap
+        self.is_ffs = self.volume.is_ffs
+        self.bs = node.get_data_block_contents_bytes()
+        self.hdr_key = node.block.blk_num
+        self.size_hint = size_hint
+        self.size = 0
+        self.buf = bytearray()
+        self.data_blk_nums = []
+        self.free_blks = []
+        self.pending_blk = None
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("write to closed file")
+        bs = self.bs
+        buf = self.buf
+        buf += data
+        num = len(buf) - len(buf) % bs
+        if num > 0:
+            try:
+                with memoryview(buf) as view:
+                    for off in range(0, num, bs):
+                        self._write_blk(view[off : off + bs])
+            except Exception:
+                self.abort()
+                raise
+            del buf[:num]
+        return len(data)
+
+    def tell(self):
+        return self.size + len(self.buf)
+
+    def _alloc_blk(self):
+        if not self.free_blks:
+            # allocate next batch of blocks
+            num = self.ALLOC_BLKS
+            if self.size_hint is not None:
+                left = self.size_hint - self.size
+                if left > 0:
+                    num = (left + self.bs - 1) // self.bs
+            blks = self.bitmap.alloc_n(num)
+            if blks is None:
+                blks = self.bitmap.alloc_n(1)
+                if blks is None:
+                    raise FSError(NO_FREE_BLOCKS, node=self.node)
+            blks.reverse()
+            self.free_blks = blks
+        return self.free_blks.pop()
+
+    def _write_blk(self, data):
+        blk_num = self._alloc_blk()
+        self.data_blk_nums.append(blk_num)
+        size = len(data)
+        if self.is_ffs:
+            # pad block and write raw block data
+            if size < self.bs:
+                data = bytes(data) + bytes(self.bs - size)
+            self.blkdev.write_block(blk_num, data)
+        else:
+            # old FS: block is written once the next block is known
+            seq_num = len(self.data_blk_nums)
+            fdb = FileDataBlock(self.blkdev, blk_num)
+            fdb.create(self.hdr_key, seq_num, bytes(data), 0)
+            self._flush_pending_blk(blk_num)
+            self.pending_blk = fdb
+        self.size += size
+
+    def _flush_pending_blk(self, next_data=0):
+        if self.pending_blk is not None:
+            self.pending_blk.next_data = next_data
+            self.pending_blk.write()
+            self.pending_blk = None
+
+    def abort(self):
+        """remove the partially written file and free all its blocks"""
+        if self.closed:
+            return
+        self.closed = True
+        self.pending_blk = None
+        self.buf = bytearray()
+        node = self.node
+        # blocks not yet recorded in the node are freed here
+        node_blks = set(node.get_block_nums())
+        blks = [b for b in self.data_blk_nums + self.free_blks if b not in node_blks]
+        self.data_blk_nums = []
+        self.free_blks = []
+        if blks:
+            self.bitmap.dealloc_n(blks)
+            self.volume.block_cache.invalidate_n(blks)
+        # the parent frees the header and the blocks of the node
+        node.delete(update_ts=False)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._close()
+        except Exception:
+            self.abort()
+            raise
+        self.closed = True
+
+    def _close(self):
+        # write remainder
+        if len(self.buf) > 0:
+            self._write_blk(self.buf)
+            self.buf = bytearray()
+        self._flush_pending_blk()
+        # return unused blocks
+        if self.free_blks:
+            self.bitmap.dealloc_n(self.free_blks)
+            self.free_blks = []
+        # allocate list blocks
+        node = self.node
+        node.data_size = self.size
+        num_ext = node.calc_number_of_list_blks()
+        if num_ext > 0:
+            ext_blk_nums = self.bitmap.alloc_n(num_ext)
+            if ext_blk_nums is None:
+                raise FSError(NO_FREE_BLOCKS, node=node, extra="want list blocks")
+        else:
+            ext_blk_nums = []
+        # update header and list blocks
+        node.update_blk_lists(self.data_blk_nums, ext_blk_nums, self.size)
+        # dircache: update size in record
+        parent = node.parent
+        if self.volume.is_dircache and parent:
+            record = parent.get_dircache_record(node.name.get_name())
+            if not record:
+                raise FSError(INTERNAL_ERROR, node=node, extra="dc not found!")
+            record.size = self.size
+            parent.update_dircache_record(record, False)
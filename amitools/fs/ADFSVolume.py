@@ -1,5 +1,6 @@
 from .block.BootBlock import BootBlock
 from .block.RootBlock import RootBlock
+from .block.BlockCache import BlockCache
 from .ADFSVolDir import ADFSVolDir
 from .ADFSBitmap import ADFSBitmap
 from .FileName import FileName
@@ -19,6 +20,8 @@ class ADFSVolume:
         self.root = None
         self.root_dir = None
         self.bitmap = None
+        # decoded dir, file header and file list blocks
+        self.block_cache = BlockCache()
 
         self.valid = False
         self.is_ffs = None
@@ -29,6 +32,7 @@ class ADFSVolume:
         self.meta_info = None
 
     def open(self):
+        self.block_cache.clear()
         # read boot block
         self.boot = BootBlock(self.blkdev)
         self.boot.read()
@@ -49,9 +53,8 @@ class ADFSVolume:
                 self.meta_info = RootMetaInfo(
                     self.root.create_ts, self.root.disk_ts, self.root.mod_ts
                 )
-                # create root dir
+                # create root dir (entries are read on demand)
                 self.root_dir = ADFSVolDir(self, self.root)
-                self.root_dir.read()
                 # create bitmap
                 self.bitmap = ADFSBitmap(self.root)
                 self.bitmap.read()
@@ -96,6 +99,7 @@ class ADFSVolume:
         )  # Volumes don't support long names
         if not fn.is_valid():
             raise FSError(INVALID_VOLUME_NAME, file_name=name, node=self)
+        self.block_cache.clear()
         # create a boot block
         self.boot = BootBlock(self.blkdev)
         self.boot.create(dos_type=dos_type, boot_code=boot_code)
@@ -364,6 +368,23 @@ class ADFSVolume:
         if not cache:
             node.flush()
 
+    def open_write_file(self, ami_path, suggest_name=None, size_hint=None):
+        """Create a file and return a writer to stream its data"""
+        # get parent node and file_name
+        parent_node, file_name = self.get_create_path_name(ami_path, suggest_name)
+        if parent_node == None:
+            raise FSError(INVALID_PARENT_DIRECTORY, file_name=ami_path)
+        if file_name == None:
+            raise FSError(INVALID_FILE_NAME, file_name=file_name)
+        return parent_node.create_file_stream(file_name, size_hint=size_hint)
+
+    def open_read_file(self, ami_path):
+        """Return a reader to stream the data of a file"""
+        node = self.get_file_path_name(ami_path)
+        if node == None:
+            raise FSError(FILE_NOT_FOUND, file_name=ami_path)
+        return node.open_read()
+
     def read_file(self, ami_path, cache=False):
         """Read a file and return data"""
         # get node of file
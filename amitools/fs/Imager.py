@@ -1,5 +1,6 @@
 import os
 import os.path
+import shutil
 import sys
 import unicodedata
 
@@ -109,12 +110,11 @@ class Imager:
             node.flush()
         # file
         elif node.is_file():
-            data = node.get_file_data()
+            with node.open_read() as reader:
+                with open(file_path, "wb") as fh:
+                    shutil.copyfileobj(reader, fh)
+                self.total_bytes += reader.tell()
             node.flush()
-            fh = open(file_path, "wb")
-            fh.write(data)
-            fh.close()
-            self.total_bytes += len(data)
 
     # ----- pack -----
 
@@ -236,10 +236,13 @@ class Imager:
             node.flush()
         # pack file
         elif os.path.isfile(in_path):
-            # read file
-            fh = open(in_path, "rb")
-            data = fh.read()
-            fh.close()
-            node = parent_node.create_file(FSString(ami_name), data, meta_info, False)
-            node.flush()
-            self.total_bytes += len(data)
+            # stream file
+            size = os.path.getsize(in_path)
+            writer = parent_node.create_file_stream(
+                FSString(ami_name), meta_info, False, size_hint=size
+            )
+            with open(in_path, "rb") as fh:
+                with writer:
+                    shutil.copyfileobj(fh, writer)
+            writer.node.flush()
+            self.total_bytes += writer.size
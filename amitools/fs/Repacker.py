@@ -1,3 +1,4 @@
+import shutil
 from .ADFSVolume import ADFSVolume
 from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
 
@@ -82,7 +83,11 @@ class Repacker:
             sub_dir.flush()
         # file
         elif in_node.is_file():
-            data = in_node.get_file_data()
-            out_file = out_dir.create_file(name, data, meta_info, False)
-            out_file.flush()
+            writer = out_dir.create_file_stream(
+                name, meta_info, False, size_hint=in_node.get_size()
+            )
+            with in_node.open_read() as reader:
+                with writer:
+                    shutil.copyfileobj(reader, writer)
+            writer.node.flush()
         in_node.flush()
@@ -69,14 +69,14 @@ class ADFBlockDevice(BlockDevice):
         if self.fobj:
             self.fobj.close()
 
-    def read_block(self, blk_num):
-        if blk_num >= self.num_blocks:
+    def read_block(self, blk_num, num_blks=1):
+        if blk_num + num_blks > self.num_blocks:
             raise ValueError(
                 "Invalid ADF block num: got %d but max is %d"
-                % (blk_num, self.num_blocks)
+                % (blk_num + num_blks - 1, self.num_blocks)
             )
         off = self._blk_to_offset(blk_num)
-        return self.data[off : off + self.block_bytes]
+        return self.data[off : off + self.block_bytes * num_blks]
 
     def write_block(self, blk_num, data):
         if self.read_only:
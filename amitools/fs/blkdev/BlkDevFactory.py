@@ -5,6 +5,7 @@ import gzip
 from .ADFBlockDevice import ADFBlockDevice
 from .HDFBlockDevice import HDFBlockDevice
 from .RawBlockDevice import RawBlockDevice
+from .CachedBlockDevice import CachedBlockDevice
 from .DiskGeometry import DiskGeometry
 from amitools.fs.rdb.RDisk import RDisk
 import amitools.util.BlkDevTools as BlkDevTools
@@ -107,6 +108,22 @@ class BlkDevFactory:
         else:
             return 512
 
+    def _get_use_mmap(self, options, fobj):
+        # only real image files can be mapped
+        if fobj is None and options and "mmap" in options:
+            return bool(options["mmap"])
+        return False
+
+    def _wrap_cache(self, blkdev, options):
+        # optionally put a write-back block cache in front of the device
+        if options and "cache" in options:
+            cache = options["cache"]
+            if cache is True:
+                return CachedBlockDevice(blkdev)
+            elif cache:
+                return CachedBlockDevice(blkdev, int(cache))
+        return blkdev
+
     def open(
         self, img_file, read_only=False, options=None, fobj=None, none_if_missing=False
     ):
@@ -159,6 +176,7 @@ class BlkDevFactory:
 
         # get block size
         bs = self._get_block_size(options)
+        use_mmap = self._get_use_mmap(options, fobj)
 
         # now create blkdev
         if t in (self.TYPE_ADF, self.TYPE_ADF_HD):
@@ -176,10 +194,14 @@ class BlkDevFactory:
             geo = DiskGeometry(block_bytes=bs)
             if not geo.detect(size, options):
                 raise IOError("can't detect geometry of HDF image file")
-            blkdev = HDFBlockDevice(img_file, read_only, fobj=fobj, block_size=bs)
+            blkdev = HDFBlockDevice(
+                img_file, read_only, fobj=fobj, block_size=bs, use_mmap=use_mmap
+            )
             blkdev.open(geo)
         else:
-            rawdev = RawBlockDevice(img_file, read_only, fobj=fobj, block_bytes=bs)
+            rawdev = RawBlockDevice(
+                img_file, read_only, fobj=fobj, block_bytes=bs, use_mmap=use_mmap
+            )
             rawdev.open()
             # check block size stored in rdb
             rdisk = RDisk(rawdev)
@@ -188,7 +210,9 @@ class BlkDevFactory:
                 # adjust block size and re-open
                 rawdev.close()
                 bs = rdb_bs
-                rawdev = RawBlockDevice(img_file, read_only, fobj=fobj, block_bytes=bs)
+                rawdev = RawBlockDevice(
+                    img_file, read_only, fobj=fobj, block_bytes=bs, use_mmap=use_mmap
+                )
                 rawdev.open()
                 rdisk = RDisk(rawdev)
             if not rdisk.open():
@@ -202,7 +226,7 @@ class BlkDevFactory:
                 raise IOError("can't find partition in image file")
             blkdev = part.create_blkdev(True)  # auto_close rdisk
             blkdev.open()
-        return blkdev
+        return self._wrap_cache(blkdev, options)
 
     def create(self, img_file, force=True, options=None, fobj=None):
         if fobj is None:
@@ -225,6 +249,7 @@ class BlkDevFactory:
 
         # get block size
         bs = self._get_block_size(options)
+        use_mmap = self._get_use_mmap(options, fobj)
 
         # create blkdev
         if t == self.TYPE_ADF:
@@ -238,9 +263,11 @@ class BlkDevFactory:
             geo = DiskGeometry()
             if not geo.setup(options):
                 raise IOError("can't determine geometry of HDF image file")
-            blkdev = HDFBlockDevice(img_file, fobj=fobj, block_size=bs)
+            blkdev = HDFBlockDevice(
+                img_file, fobj=fobj, block_size=bs, use_mmap=use_mmap
+            )
             blkdev.create(geo)
-        return blkdev
+        return self._wrap_cache(blkdev, options)
 
 
 # --- mini test ---
@@ -43,7 +43,7 @@ class BlockDevice:
     def flush(self):
         pass
 
-    def read_block(self, blk_num):
+    def read_block(self, blk_num, num_blks=1):
         pass
 
     def write_block(self, blk_num, data):
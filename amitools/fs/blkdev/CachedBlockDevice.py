@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from .BlockDevice import BlockDevice
+
+
+class CachedBlockDevice(BlockDevice):
+    """a write-back block cache that wraps any other block device.
+
+    Up to capacity single blocks are kept in LRU order. Written blocks are
+    only marked dirty and reach the wrapped device when they are evicted or
+    on flush()/close(). Dirty blocks are then written in ascending order.
+    Multi block reads bypass the cache but see the dirty blocks.
+    """
+
+    DEFAULT_CAPACITY = 1024
+
+    def __init__(self, blkdev, capacity=None):
+        if capacity is None:
+            capacity = self.DEFAULT_CAPACITY
+        if capacity < 1:
+            raise ValueError("Invalid cache capacity: %d" % capacity)
+        self.blkdev = blkdev
+        self.capacity = capacity
+        # blk_num -> data in LRU order (oldest first)
+        self.cache = OrderedDict()
+        self.dirty = set()
+        # stats
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_writes = 0
+        self.num_write_backs = 0
+
+    def __getattr__(self, name):
+        # geometry and everything else is taken from the wrapped device
+        blkdev = self.__dict__.get("blkdev")
+        if blkdev is None:
+            raise AttributeError(name)
+        return getattr(blkdev, name)
+
+    def __repr__(self):
+        return "CachedBlockDevice(%r, capacity=%d)" % (self.blkdev, self.capacity)
+
+    def get_stats(self):
+        """return a dict with the cache counters"""
+        return {
+            "hits": self.num_hits,
+            "misses": self.num_misses,
+            "writes": self.num_writes,
+            "write_backs": self.num_write_backs,
+            "cached": len(self.cache),
+            "dirty": len(self.dirty),
+        }
+
+    def _evict(self):
+        while len(self.cache) > self.capacity:
+            blk_num, data = self.cache.popitem(last=False)
+            if blk_num in self.dirty:
+                self.dirty.remove(blk_num)
+                self.blkdev.write_block(blk_num, data)
+                self.num_write_backs += 1
+
+    def _put(self, blk_num, data):
+        self.cache[blk_num] = data
+        self.cache.move_to_end(blk_num)
+        self._evict()
+
+    # ----- API -----
+    def create(self, *args, **kw_args):
+        self.invalidate()
+        return self.blkdev.create(*args, **kw_args)
+
+    def open(self, *args, **kw_args):
+        self.invalidate()
+        return self.blkdev.open(*args, **kw_args)
+
+    def flush(self):
+        # write back all dirty blocks in block order
+        cache = self.cache
+        for blk_num in sorted(self.dirty):
+            self.blkdev.write_block(blk_num, cache[blk_num])
+            self.num_write_backs += 1
+        self.dirty.clear()
+        self.blkdev.flush()
+
+    def close(self):
+        self.flush()
+        self.cache.clear()
+        self.blkdev.close()
+
+    def invalidate(self):
+        """drop all cached blocks. dirty blocks are lost!"""
+        self.cache.clear()
+        self.dirty.clear()
+
+    def read_block(self, blk_num, num_blks=1):
+        cache = self.cache
+        if num_blks == 1:
+            data = cache.get(blk_num)
+            if data is not None:
+                cache.move_to_end(blk_num)
+                self.num_hits += 1
+                return data
+            self.num_misses += 1
+            data = bytes(self.blkdev.read_block(blk_num))
+            self._put(blk_num, data)
+            return data
+        # multi block read: do not pollute cache but honor dirty blocks
+        data = self.blkdev.read_block(blk_num, num_blks=num_blks)
+        dirty = [b for b in self.dirty if blk_num <= b < blk_num + num_blks]
+        if dirty:
+            data = bytearray(data)
+            bb = self.blkdev.block_bytes
+            for b in dirty:
+                off = (b - blk_num) * bb
+                data[off : off + bb] = cache[b]
+        return data
+
+    def write_block(self, blk_num, data):
+        if blk_num >= self.blkdev.num_blocks:
+            raise ValueError(
+                "Invalid block num: got %d but max is %d"
+                % (blk_num, self.blkdev.num_blocks)
+            )
+        if len(data) != self.blkdev.block_bytes:
+            raise ValueError(
+                "Invalid block size written: got %d but size is %d"
+                % (len(data), self.blkdev.block_bytes)
+            )
+        self.num_writes += 1
+        self.dirty.add(blk_num)
+        self._put(blk_num, bytes(data))
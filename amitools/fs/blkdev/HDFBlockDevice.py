@@ -3,8 +3,10 @@ from .ImageFile import ImageFile
 
 
 class HDFBlockDevice(BlockDevice):
-    def __init__(self, hdf_file, read_only=False, block_size=512, fobj=None):
-        self.img_file = ImageFile(hdf_file, read_only, block_size, fobj)
+    def __init__(
+        self, hdf_file, read_only=False, block_size=512, fobj=None, use_mmap=False
+    ):
+        self.img_file = ImageFile(hdf_file, read_only, block_size, fobj, use_mmap)
 
     def create(self, geo, reserved=2):
         self._set_geometry(
@@ -28,13 +30,13 @@ class HDFBlockDevice(BlockDevice):
         self.img_file.open()
 
     def flush(self):
-        pass
+        self.img_file.flush()
 
     def close(self):
         self.img_file.close()
 
-    def read_block(self, blk_num):
-        return self.img_file.read_blk(blk_num)
+    def read_block(self, blk_num, num_blks=1):
+        return self.img_file.read_blk(blk_num, num_blks)
 
     def write_block(self, blk_num, data):
         return self.img_file.write_blk(blk_num, data)
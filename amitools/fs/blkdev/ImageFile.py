@@ -1,14 +1,27 @@
 import os
 import stat
+import mmap
 import amitools.util.BlkDevTools as BlkDevTools
 
 
 class ImageFile:
-    def __init__(self, file_name, read_only=False, block_bytes=512, fobj=None):
+    """access an image file block-wise.
+
+    If use_mmap is set then the file is memory mapped and read_blk() hands out
+    zero-copy memoryview slices of the mapping. Writes go directly into the
+    mapping. The views stay valid until the image file is closed.
+    """
+
+    def __init__(
+        self, file_name, read_only=False, block_bytes=512, fobj=None, use_mmap=False
+    ):
         self.file_name = file_name
         self.read_only = read_only
         self.block_bytes = block_bytes
         self.fobj = fobj
+        self.use_mmap = use_mmap
+        self.mmap = None
+        self.view = None
         self.size = 0
         self.num_blocks = 0
 
@@ -50,14 +63,46 @@ class ImageFile:
             else:
                 flags = "r+b"
             self.fobj = open(self.file_name, flags)
+        # map file
+        if self.use_mmap:
+            self._map()
+
+    def _map(self):
+        self._unmap()
+        if self.read_only:
+            access = mmap.ACCESS_READ
+        else:
+            access = mmap.ACCESS_WRITE
+        self.mmap = mmap.mmap(self.fobj.fileno(), self.size, access=access)
+        self.view = memoryview(self.mmap)
+
+    def _unmap(self):
+        if self.mmap is None:
+            return
+        if not self.read_only:
+            self.mmap.flush()
+        self.view.release()
+        self.view = None
+        try:
+            self.mmap.close()
+        except BufferError:
+            # some views are still alive. the mapping is released with the last one
+            pass
+        self.mmap = None
+
+    def is_mapped(self):
+        return self.mmap is not None
 
     def read_blk(self, blk_num, num_blks=1):
-        if blk_num >= self.num_blocks:
+        if blk_num + num_blks > self.num_blocks:
             raise IOError(
                 "Invalid image file block num: got %d but max is %d"
-                % (blk_num, self.num_blocks)
+                % (blk_num + num_blks - 1, self.num_blocks)
             )
         off = blk_num * self.block_bytes
+        # mapped: return a view on the data
+        if self.view is not None:
+            return self.view[off : off + self.block_bytes * num_blks]
         if off != self.fobj.tell():
             self.fobj.seek(off, os.SEEK_SET)
         num = self.block_bytes * num_blks
@@ -67,10 +112,10 @@ class ImageFile:
     def write_blk(self, blk_num, data, num_blks=1):
         if self.read_only:
             raise IOError("Can't write block: image file is read-only")
-        if blk_num >= self.num_blocks:
+        if blk_num + num_blks > self.num_blocks:
             raise IOError(
                 "Invalid image file block num: got %d but max is %d"
-                % (blk_num, self.num_blocks)
+                % (blk_num + num_blks - 1, self.num_blocks)
             )
         if len(data) != (self.block_bytes * num_blks):
             raise IOError(
@@ -78,24 +123,40 @@ class ImageFile:
                 % (len(data), self.block_bytes)
             )
         off = blk_num * self.block_bytes
+        # mapped: store in mapping
+        if self.view is not None:
+            self.view[off : off + len(data)] = data
+            return
         if off != self.fobj.tell():
             self.fobj.seek(off, os.SEEK_SET)
         self.fobj.write(data)
 
     def flush(self):
+        if self.mmap is not None and not self.read_only:
+            self.mmap.flush()
         self.fobj.flush()
 
     def close(self):
+        self._unmap()
         self.fobj.close()
         self.fobj = None
 
+    def _set_size(self, size):
+        # an open image file is mapped again with its new size
+        self.size = size
+        self.num_blocks = size // self.block_bytes
+        if self.use_mmap and size > 0:
+            self._map()
+
     def create(self, num_blocks):
         if self.read_only:
             raise IOError("Can't create image file in read only mode")
         total_size = num_blocks * self.block_bytes
+        self._unmap()
         if self.fobj is not None:
             self.fobj.truncate(total_size)
             self.fobj.seek(0, 0)
+            self._set_size(total_size)
         else:
             fh = open(self.file_name, "wb")
             fh.truncate(total_size)
@@ -105,9 +166,12 @@ class ImageFile:
         if self.read_only:
             raise IOError("Can't grow image file in read only mode")
         total_size = new_blocks * self.block_bytes
+        # never truncate a mapped file
+        self._unmap()
         if self.fobj is not None:
             self.fobj.truncate(total_size)
             self.fobj.seek(0, 0)  # seek start
+            self._set_size(total_size)
         else:
             fh = open(self.file_name, "ab")
             fh.truncate(total_size)
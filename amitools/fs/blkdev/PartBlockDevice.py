@@ -42,15 +42,14 @@ class PartBlockDevice(BlockDevice):
         if self.auto_close:
             self.raw_blkdev.close()
 
-    def read_block(self, blk_num):
-        if blk_num >= self.num_blocks:
+    def read_block(self, blk_num, num_blks=1):
+        if blk_num + num_blks > self.num_blocks:
             raise ValueError(
                 "Invalid Part block num: got %d but max is %d"
-                % (blk_num, self.num_blocks)
+                % (blk_num + num_blks - 1, self.num_blocks)
             )
-        num_blks = self.sec_per_blk
-        off = self.blk_off + (blk_num * num_blks)
-        return self.raw_blkdev.read_block(off, num_blks=num_blks)
+        off = self.blk_off + (blk_num * self.sec_per_blk)
+        return self.raw_blkdev.read_block(off, num_blks=num_blks * self.sec_per_blk)
 
     def write_block(self, blk_num, data):
         if blk_num >= self.num_blocks:
@@ -3,8 +3,10 @@ from .ImageFile import ImageFile
 
 
 class RawBlockDevice(BlockDevice):
-    def __init__(self, raw_file, read_only=False, block_bytes=512, fobj=None):
-        self.img_file = ImageFile(raw_file, read_only, block_bytes, fobj)
+    def __init__(
+        self, raw_file, read_only=False, block_bytes=512, fobj=None, use_mmap=False
+    ):
+        self.img_file = ImageFile(raw_file, read_only, block_bytes, fobj, use_mmap)
 
     def create(self, num_blocks):
         self.img_file.create(num_blocks)
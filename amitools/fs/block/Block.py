@@ -1,4 +1,5 @@
 import struct
+from . import BlockChecksum
 from ..TimeStamp import TimeStamp
 from ..FSString import FSString
 
@@ -101,8 +102,8 @@ class Block:
                 "Invalid Block Data: size=%d but expected %d"
                 % (len(data), self.blkdev.block_bytes)
             )
-        self._create_data()
-        self.data[:] = data
+        # take a private copy. data may be a view of a mapped image
+        self.data = bytearray(data)
 
     def _write_data(self):
         if self.data != None:
@@ -164,11 +165,7 @@ class Block:
         self._put_long(self.chk_loc, self.calc_chksum)
 
     def _calc_chksum(self):
-        chksum = 0
-        for i in range(self.block_longs):
-            if i != self.chk_loc:
-                chksum += self._get_long(i)
-        return (-chksum) & 0xFFFFFFFF
+        return BlockChecksum.calc_chksum(self.data, self.chk_loc, self.block_longs)
 
     def _get_timestamp(self, loc):
         days = self._get_long(loc)
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+
+
+class BlockCache:
+    """keep decoded block objects of a volume by block number.
+
+    The cache holds up to capacity blocks in LRU order. Blocks are shared with
+    the nodes that use them, so in-place updates of a block are always seen.
+    Blocks that are freed must be invalidated before their block numbers are
+    reused (e.g. as data blocks).
+    """
+
+    DEFAULT_CAPACITY = 4096
+
+    def __init__(self, capacity=None):
+        if capacity is None:
+            capacity = self.DEFAULT_CAPACITY
+        self.capacity = capacity
+        self.blocks = OrderedDict()
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def get(self, blk_num, blk_type=None):
+        """return the cached block or None.
+        if blk_type is given then the block must be an instance of it"""
+        blk = self.blocks.get(blk_num)
+        if blk is None or (blk_type is not None and not isinstance(blk, blk_type)):
+            self.num_misses += 1
+            return None
+        self.blocks.move_to_end(blk_num)
+        self.num_hits += 1
+        return blk
+
+    def put(self, blk):
+        """store a decoded block. replaces an older block with same number"""
+        if self.capacity == 0:
+            return
+        blocks = self.blocks
+        blocks[blk.blk_num] = blk
+        blocks.move_to_end(blk.blk_num)
+        while len(blocks) > self.capacity:
+            blocks.popitem(last=False)
+
+    def invalidate(self, blk_num):
+        self.blocks.pop(blk_num, None)
+
+    def invalidate_n(self, blk_nums):
+        pop = self.blocks.pop
+        for blk_num in blk_nums:
+            pop(blk_num, None)
+
+    def clear(self):
+        self.blocks.clear()
+
+    def get_stats(self):
+        return {
+            "hits": self.num_hits,
+            "misses": self.num_misses,
+            "cached": len(self.blocks),
+        }
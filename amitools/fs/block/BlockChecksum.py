@@ -0,0 +1,61 @@
+"""Fast checksum calculation for AmigaDOS blocks.
+
+All longs of a block are decoded with a single precompiled struct call
+instead of unpacking them one by one. The bulk functions work on a buffer
+holding multiple contiguous blocks.
+"""
+
+import struct
+
+_struct_cache = {}
+
+
+def _get_struct(num_longs):
+    s = _struct_cache.get(num_longs)
+    if s is None:
+        s = struct.Struct(">%dI" % num_longs)
+        _struct_cache[num_longs] = s
+    return s
+
+
+def calc_chksum(data, chk_loc, num_longs=None, offset=0):
+    """calc the checksum of the block found at byte offset in data.
+    the long at chk_loc holds the checksum and is skipped.
+    """
+    if num_longs is None:
+        num_longs = (len(data) - offset) // 4
+    longs = _get_struct(num_longs).unpack_from(data, offset)
+    return (longs[chk_loc] - sum(longs)) & 0xFFFFFFFF
+
+
+def is_valid_chksum(data, num_longs=None, offset=0):
+    """check if the checksum stored in the block is valid.
+    this is the case if all longs including the checksum sum up to zero.
+    """
+    if num_longs is None:
+        num_longs = (len(data) - offset) // 4
+    longs = _get_struct(num_longs).unpack_from(data, offset)
+    return sum(longs) & 0xFFFFFFFF == 0
+
+
+def calc_chksums(data, block_bytes, chk_loc):
+    """calc the checksums of all blocks stored contiguously in data"""
+    s = _get_struct(block_bytes // 4)
+    return [(longs[chk_loc] - sum(longs)) & 0xFFFFFFFF for longs in s.iter_unpack(data)]
+
+
+def verify_chksums(data, block_bytes):
+    """return a list of bools telling for all blocks in data
+    if their stored checksum is valid"""
+    s = _get_struct(block_bytes // 4)
+    return [sum(longs) & 0xFFFFFFFF == 0 for longs in s.iter_unpack(data)]
+
+
+def calc_boot_chksum(data, chk_loc=1):
+    """calc the boot block checksum (with carry wrap) over all of data"""
+    longs = _get_struct(len(data) // 4).unpack_from(data)
+    chksum = sum(longs) - longs[chk_loc]
+    # fold carries back in
+    while chksum > 0xFFFFFFFF:
+        chksum = (chksum & 0xFFFFFFFF) + (chksum >> 32)
+    return (~chksum) & 0xFFFFFFFF
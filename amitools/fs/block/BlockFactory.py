@@ -10,7 +10,12 @@ from .DirCacheBlock import DirCacheBlock
 
 class BlockFactory:
     @classmethod
-    def create_block(cls, blkdev, blk_num, type, sub_type):
+    def create_block(cls, blkdev, blk_num, type, sub_type, cache=None):
+        # a decoded block of the volume's block cache is returned first
+        if cache is not None:
+            blk = cache.get(blk_num)
+            if blk is not None and blk.type == type and blk.sub_type == sub_type:
+                return blk
         if type == Block.T_SHORT:
             if sub_type == Block.ST_ROOT:
                 return RootBlock(blkdev, blk_num)
@@ -29,5 +34,7 @@ class BlockFactory:
             return DirCacheBlock(blkdev, blk_num)
 
     @classmethod
-    def create_specific_block(cls, block):
-        return cls.create_block(block.blkdev, block.blk_num, block.type, block.sub_type)
+    def create_specific_block(cls, block, cache=None):
+        return cls.create_block(
+            block.blkdev, block.blk_num, block.type, block.sub_type, cache
+        )
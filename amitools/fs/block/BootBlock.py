@@ -1,6 +1,7 @@
 import os.path
 
 from .Block import Block
+from . import BlockChecksum
 import amitools.fs.DosType as DosType
 
 
@@ -50,16 +51,8 @@ class BootBlock(Block):
 
     def _calc_chksum(self):
         all_blks = [self] + self.extra_blks
-        n = self.blkdev.block_longs
-        chksum = 0
-        for b, blk in enumerate(all_blks):
-            for i in range(n):
-                if not (b == 0 and i == 1):  # skip chksum
-                    chksum += blk._get_long(i)
-                    if chksum > 0xFFFFFFFF:
-                        chksum += 1
-                        chksum &= 0xFFFFFFFF
-        return (~chksum) & 0xFFFFFFFF
+        data = b"".join(blk.data for blk in all_blks)
+        return BlockChecksum.calc_boot_chksum(data)
 
     def read(self):
         self._read_data()
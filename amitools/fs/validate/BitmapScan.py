@@ -100,14 +100,8 @@ class BitmapScan:
             )
 
     def calc_lword(self, blk_num):
-        """calcuate the bitmap lword"""
-        value = 0
-        for i in range(32):
-            # set bit in lword if block is available
-            if not self.block_scan.is_block_available(blk_num + i):
-                mask = 1 << i
-                value |= mask
-        return value
+        """calcuate the bitmap lword: bits of unused blocks are set"""
+        return self.block_scan.get_free_bits(blk_num, 32)
 
     def read_bitmap_ptrs_and_blocks(self, root):
         """build the list of all file system bitmap blocks"""
@@ -1,6 +1,8 @@
-import time
+import struct
+from array import array
 
 from amitools.fs.block.Block import Block
+from amitools.fs.block import BlockChecksum
 from amitools.fs.block.UserDirBlock import UserDirBlock
 from amitools.fs.block.RootBlock import RootBlock
 from amitools.fs.block.FileHeaderBlock import FileHeaderBlock
@@ -30,7 +32,17 @@ class BlockInfo:
 
 
 class BlockScan:
-    """Scan a full volume and classify the blocks"""
+    """Scan a full volume and classify the blocks
+
+    The status and type of all blocks are kept in compact arrays. Only
+    blocks with a detected type store a BlockInfo with the decoded
+    details. Blocks are read in runs of RUN_BLOCKS: if a block is queried
+    then the aligned run around it is scanned. scan_blocks() scans the
+    whole volume.
+
+    Blocks that were visited by a scanner via get_block() or read_block()
+    are marked as used.
+    """
 
     # block status
     BS_UNKNOWN = 0  # undecided or unchecked
@@ -39,6 +51,7 @@ class BlockScan:
     BS_VALID = 3  # is a AmigaDOS block structure but type was not detected
     BS_TYPE = 4  # detected block type
     NUM_BS = 5
+    BS_NOT_SCANNED = 0xFF  # block was not read yet
 
     # block type
     BT_UNKNOWN = 0
@@ -52,196 +65,309 @@ class BlockScan:
     BT_COMMENT = 8
     NUM_BT = 9
 
+    # blocks read by a single I/O
+    RUN_BLOCKS = 256
+
+    # (type, sub type) of header blocks
+    _hdr_types = {
+        (Block.T_SHORT, Block.ST_ROOT): BT_ROOT,
+        (Block.T_SHORT, Block.ST_USERDIR): BT_DIR,
+        (Block.T_SHORT, Block.ST_FILE): BT_FILE_HDR,
+        (Block.T_LIST, Block.ST_FILE): BT_FILE_LIST,
+    }
+
     def __init__(self, blkdev, log, dos_type):
         self.blkdev = blkdev
         self.log = log
         self.dos_type = dos_type
 
-        self.map_status = None
-        self.map_type = None
-        self.block_map = [None] * self.blkdev.num_blocks
-        self.map_status = [[] for i in range(self.NUM_BS)]
-        self.map_type = [[] for i in range(self.NUM_BT)]
+        num_blocks = self.blkdev.num_blocks
+        self.blk_status = array("B", [self.BS_NOT_SCANNED]) * num_blocks
+        self.blk_type = array("B", bytes(num_blocks))
+        self.blk_used = bytearray(num_blocks)
+        # decoded details of typed blocks: blk_num -> BlockInfo
+        self.blk_infos = {}
 
-    def scan_all(self, progress=lambda x: x):
-        """Scan all blocks of the given block device
-        Return True if there is a chance that a file system will be found there
-        """
-        # range to scan
+    def scan_blocks(self, progress=None):
+        """read and classify all blocks of the volume that were not scanned"""
         begin_blk = self.blkdev.reserved
-        num_blk = self.blkdev.num_blocks - self.blkdev.reserved
+        end_blk = self.blkdev.num_blocks
         self.log.msg(
-            Log.DEBUG, "block: checking range: +%d num=%d" % (begin_blk, num_blk)
+            Log.DEBUG,
+            "block: checking range: +%d num=%d" % (begin_blk, end_blk - begin_blk),
         )
+        if progress != None:
+            progress.begin("block")
+        status = self.blk_status
+        run_blocks = self.RUN_BLOCKS
+        blk_num = begin_blk
+        while blk_num < end_blk:
+            if status[blk_num] != self.BS_NOT_SCANNED:
+                blk_num += 1
+                continue
+            # run of unscanned blocks
+            num = 1
+            max_num = min(run_blocks, end_blk - blk_num)
+            while num < max_num and status[blk_num + num] == self.BS_NOT_SCANNED:
+                num += 1
+            self._scan_run(blk_num, num)
+            blk_num += num
+            # account runs not blocks
+            if progress != None:
+                progress.add()
+        if progress != None:
+            progress.end()
+
+    def scan_all(self, progress=None):
+        """Scan all blocks of the given block device
+        Return True if there is a chance that a file system will be found there
+        """
+        self.scan_blocks(progress)
 
-        # scan all blocks
-        for n in range(num_blk):
-            blk_num = n + begin_blk
-
-            # read/get block
-            bi = self.get_block(blk_num)
-
-            # own key ok?
-            if bi != None:
-                if bi.blk_status == self.BS_TYPE:
-                    if bi.own_key != None and bi.own_key != blk_num:
-                        self.log.msg(
-                            Log.ERROR,
-                            "Own key is invalid: %d type: %d"
-                            % (bi.own_key, bi.blk_type),
-                            blk_num,
-                        )
-
-            # first summary after block scan
-            num_error_blocks = len(self.map_status[self.BS_READ_ERROR])
-            if num_error_blocks > 0:
+        # own key ok?
+        for blk_num, bi in self.blk_infos.items():
+            if bi.own_key != None and bi.own_key != blk_num:
                 self.log.msg(
-                    Log.ERROR, "%d unreadable error blocks found" % num_error_blocks
+                    Log.ERROR,
+                    "Own key is invalid: %d type: %d" % (bi.own_key, bi.blk_type),
+                    blk_num,
                 )
-            num_valid_blocks = len(self.map_status[self.BS_VALID])
-            if num_valid_blocks > 0:
+
+        # summary after block scan
+        num_error_blocks = self.get_num_blocks_of_status(self.BS_READ_ERROR)
+        if num_error_blocks > 0:
+            self.log.msg(
+                Log.ERROR, "%d unreadable error blocks found" % num_error_blocks
+            )
+        num_valid_blocks = self.get_num_blocks_of_status(self.BS_VALID)
+        if num_valid_blocks > 0:
+            self.log.msg(
+                Log.INFO, "%d valid but unknown blocks found" % num_valid_blocks
+            )
+        num_invalid_blocks = self.get_num_blocks_of_status(self.BS_INVALID)
+        if num_invalid_blocks > 0:
+            self.log.msg(Log.INFO, "%d invalid blocks found" % num_invalid_blocks)
+        return self.any_chance_of_fs()
+
+    def _scan_on_demand(self, num):
+        """scan the run of blocks containing the given block"""
+        run_blocks = self.RUN_BLOCKS
+        begin_blk = max(num - num % run_blocks, self.blkdev.reserved)
+        end_blk = min(num - num % run_blocks + run_blocks, self.blkdev.num_blocks)
+        if num < begin_blk:
+            # reserved blocks are scanned one by one
+            self._scan_run(num, 1)
+        else:
+            self._scan_run(begin_blk, end_blk - begin_blk)
+
+    def _scan_run(self, blk_num, num):
+        """read a run of blocks and classify the ones not scanned yet"""
+        status = self.blk_status
+        try:
+            data = self.blkdev.read_block(blk_num, num_blks=num)
+        except (IOError, ValueError):
+            if num == 1:
+                self.log.msg(Log.ERROR, "Can't read block", blk_num)
+                status[blk_num] = self.BS_READ_ERROR
+            else:
+                # find the bad blocks
+                for i in range(num):
+                    if status[blk_num + i] == self.BS_NOT_SCANNED:
+                        self._scan_run(blk_num + i, 1)
+            return
+        block_bytes = self.blkdev.block_bytes
+        last_off = block_bytes - 4
+        types = self.blk_type
+        hdr_types = self._hdr_types
+        unpack_from = struct.unpack_from
+        # valid blocks sum up to zero. most data blocks are ruled out here
+        valid = BlockChecksum.verify_chksums(data, block_bytes)
+        for i in range(num):
+            n = blk_num + i
+            if status[n] != self.BS_NOT_SCANNED:
+                continue
+            if not valid[i]:
+                status[n] = self.BS_UNKNOWN
+                continue
+            off = i * block_bytes
+            blk_type = unpack_from(">I", data, off)[0]
+            if blk_type == Block.T_DATA:
+                bt = self.BT_FILE_DATA
+            elif blk_type == Block.T_COMMENT:
+                bt = self.BT_COMMENT
+            else:
+                sub_type = unpack_from(">I", data, off + last_off)[0]
+                bt = hdr_types.get((blk_type, sub_type), self.BT_UNKNOWN)
+            if bt == self.BT_UNKNOWN:
+                status[n] = self.BS_VALID
+                continue
+            bi = self._decode_block(n, bt, bytearray(data[off : off + block_bytes]))
+            status[n] = bi.blk_status
+            types[n] = bi.blk_type
+            self.blk_infos[n] = bi
+
+    def _decode_block(self, blk_num, blk_type, data):
+        """decode a block of detected type and return its block info"""
+        bi = BlockInfo(blk_num)
+        bi.blk_status = self.BS_TYPE
+        bi.blk_type = blk_type
+        # --- root block ---
+        if blk_type == self.BT_ROOT:
+            root = RootBlock(self.blkdev, blk_num)
+            root.set(data)
+            bi.name = root.name
+            bi.hash_table = root.hash_table
+            bi.parent_blk = 0
+            self.log.msg(Log.DEBUG, "Found Root: '%s'" % bi.name, blk_num)
+            # chech hash size
+            nht = len(root.hash_table)
+            if root.hash_size != nht:
+                self.log.msg(Log.ERROR, "Root block hash table size mismatch", blk_num)
+            eht = self.blkdev.block_longs - 56
+            if nht != eht:
                 self.log.msg(
-                    Log.INFO, "%d valid but unknown blocks found" % num_valid_blocks
+                    Log.WARN,
+                    "Root block does not have normal hash size: %d != %d" % (nht, eht),
+                    blk_num,
                 )
-            num_invalid_blocks = len(self.map_status[self.BS_INVALID])
-            if num_invalid_blocks > 0:
-                self.log.msg(Log.INFO, "%d invalid blocks found" % num_invalid_blocks)
+        # --- user dir block ---
+        elif blk_type == self.BT_DIR:
+            user = UserDirBlock(
+                self.blkdev, blk_num, DosType.is_longname(self.dos_type)
+            )
+            user.set(data)
+            bi.name = user.name
+            bi.parent_blk = user.parent
+            bi.next_blk = user.hash_chain
+            bi.hash_table = user.hash_table
+            bi.own_key = user.own_key
+            self.log.msg(Log.DEBUG, "Found Dir : '%s'" % bi.name, blk_num)
+        # --- filter header block ---
+        elif blk_type == self.BT_FILE_HDR:
+            fh = FileHeaderBlock(
+                self.blkdev, blk_num, DosType.is_longname(self.dos_type)
+            )
+            fh.set(data)
+            bi.name = fh.name
+            bi.parent_blk = fh.parent
+            bi.next_blk = fh.hash_chain
+            bi.own_key = fh.own_key
+            bi.byte_size = fh.byte_size
+            bi.data_blocks = fh.data_blocks
+            bi.extension = fh.extension
+            self.log.msg(Log.DEBUG, "Found File: '%s'" % bi.name, blk_num)
+        # --- file list block ---
+        elif blk_type == self.BT_FILE_LIST:
+            fl = FileListBlock(self.blkdev, blk_num)
+            fl.set(data)
+            bi.ext_blk = fl.extension
+            bi.blk_list = fl.data_blocks
+            bi.own_key = fl.own_key
+            bi.data_blocks = fl.data_blocks
+            bi.extension = fl.extension
+            bi.parent_blk = fl.parent
+        # --- file data block (OFS) ---
+        elif blk_type == self.BT_FILE_DATA:
+            fd = FileDataBlock(self.blkdev, blk_num)
+            fd.set(data)
+            bi.data_size = fd.data_size
+            bi.hdr_key = fd.hdr_key
+            bi.seq_num = fd.seq_num
+        elif blk_type == self.BT_COMMENT:
+            cblk = CommentBlock(self.blkdev, blk_num)
+            cblk.set(data)
+            bi.hdr_key = cblk.header_key
+            bi.own_key = cblk.own_key
+        return bi
 
-    def read_block(self, blk_num, is_bm=False, is_bm_ext=False):
-        """read block from device, decode it, and return block info instance"""
+    def _read_bitmap_block(self, blk_num, is_bm):
+        """bitmap blocks have no type and are only decoded if referenced"""
         try:
-            # read block from device
             if is_bm:
                 blk = BitmapBlock(self.blkdev, blk_num)
-            elif is_bm_ext:
-                blk = BitmapExtBlock(self.blkdev, blk_num)
             else:
-                blk = Block(self.blkdev, blk_num)
+                blk = BitmapExtBlock(self.blkdev, blk_num)
             blk.read()
-            data = blk.data
-            # create block info
-            bi = BlockInfo(blk_num)
-            # --- classify block ---
-            if blk.valid:
-                # block is valid AmigaDOS
-                bi.blk_status = self.BS_VALID
-                # --- bitmap block ---
-                if is_bm:
-                    bi.blk_type = self.BT_BITMAP
-                    bi.blk_status = self.BS_TYPE
-                    bi.bitmap = blk.get_bitmap_data()
-                # --- bitmap ext block ---
-                elif is_bm_ext:
-                    bi.blk_type = self.BT_BITMAP_EXT
-                    bi.blk_status = self.BS_TYPE
-                    bi.bitmap_ptrs = blk.bitmap_ptrs
-                    bi.next_blk = blk.bitmap_ext_blk
-                # --- root block ---
-                elif blk.is_root_block():
-                    bi.blk_type = self.BT_ROOT
-                    bi.blk_status = self.BS_TYPE
-                    root = RootBlock(self.blkdev, blk_num)
-                    root.set(data)
-                    bi.name = root.name
-                    bi.hash_table = root.hash_table
-                    bi.parent_blk = 0
-                    self.log.msg(Log.DEBUG, "Found Root: '%s'" % bi.name, blk_num)
-                    # chech hash size
-                    nht = len(root.hash_table)
-                    if root.hash_size != nht:
-                        self.log.msg(
-                            Log.ERROR, "Root block hash table size mismatch", blk_num
-                        )
-                    eht = self.blkdev.block_longs - 56
-                    if nht != eht:
-                        self.log.msg(
-                            Log.WARN,
-                            "Root block does not have normal hash size: %d != %d"
-                            % (nht, eht),
-                            blk_num,
-                        )
-                # --- user dir block ---
-                elif blk.is_user_dir_block():
-                    bi.blk_type = self.BT_DIR
-                    bi.blk_status = self.BS_TYPE
-                    user = UserDirBlock(
-                        self.blkdev, blk_num, DosType.is_longname(self.dos_type)
-                    )
-                    user.set(data)
-                    bi.name = user.name
-                    bi.parent_blk = user.parent
-                    bi.next_blk = user.hash_chain
-                    bi.hash_table = user.hash_table
-                    bi.own_key = user.own_key
-                    self.log.msg(Log.DEBUG, "Found Dir : '%s'" % bi.name, blk_num)
-                # --- filter header block ---
-                elif blk.is_file_header_block():
-                    bi.blk_type = self.BT_FILE_HDR
-                    bi.blk_status = self.BS_TYPE
-                    fh = FileHeaderBlock(
-                        self.blkdev, blk_num, DosType.is_longname(self.dos_type)
-                    )
-                    fh.set(data)
-                    bi.name = fh.name
-                    bi.parent_blk = fh.parent
-                    bi.next_blk = fh.hash_chain
-                    bi.own_key = fh.own_key
-                    bi.byte_size = fh.byte_size
-                    bi.data_blocks = fh.data_blocks
-                    bi.extension = fh.extension
-                    self.log.msg(Log.DEBUG, "Found File: '%s'" % bi.name, blk_num)
-                # --- file list block ---
-                elif blk.is_file_list_block():
-                    bi.blk_type = self.BT_FILE_LIST
-                    fl = FileListBlock(self.blkdev, blk_num)
-                    fl.set(data)
-                    bi.blk_status = self.BS_TYPE
-                    bi.ext_blk = fl.extension
-                    bi.blk_list = fl.data_blocks
-                    bi.own_key = fl.own_key
-                    bi.data_blocks = fl.data_blocks
-                    bi.extension = fl.extension
-                    bi.parent_blk = fl.parent
-                # --- file data block (OFS) ---
-                elif blk.is_file_data_block():
-                    bi.blk_type = self.BT_FILE_DATA
-                    bi.blk_status = self.BS_TYPE
-                    fd = FileDataBlock(self.blkdev, blk_num)
-                    fd.set(data)
-                    bi.data_size = fd.data_size
-                    bi.hdr_key = fd.hdr_key
-                    bi.seq_num = fd.seq_num
-                elif blk.is_comment_block():
-                    bi.blk_type = self.BT_COMMENT
-                    bi.blk_status = self.BS_TYPE
-                    cblk = CommentBlock(self.blkdev, blk_num)
-                    bi.hdr_key = cblk.hdr_key
-                    bi.own_key = cblk.own_key
-
-        except IOError as e:
+        except IOError:
             self.log.msg(Log.ERROR, "Can't read block", blk_num)
-            bi = BlockInfo(blk_num)
-            bi.blk_status = BS_READ_ERROR
+            self.blk_status[blk_num] = self.BS_READ_ERROR
+            return self._get_info(blk_num)
+        bi = BlockInfo(blk_num)
+        if blk.valid:
+            bi.blk_status = self.BS_TYPE
+            if is_bm:
+                bi.blk_type = self.BT_BITMAP
+                bi.bitmap = blk.get_bitmap_data()
+            else:
+                bi.blk_type = self.BT_BITMAP_EXT
+                bi.bitmap_ptrs = blk.bitmap_ptrs
+                bi.next_blk = blk.bitmap_ext_blk
+            self.blk_infos[blk_num] = bi
+            self.blk_type[blk_num] = bi.blk_type
+        elif self.blk_status[blk_num] == self.BS_NOT_SCANNED:
+            bi.blk_status = self.BS_UNKNOWN
+        else:
+            bi.blk_status = self.blk_status[blk_num]
+        self.blk_status[blk_num] = bi.blk_status
+        return bi
 
-        # sort block info into map and arrays assigned by status/type
-        self.block_map[blk_num] = bi
-        self.map_status[bi.blk_status].append(bi)
-        self.map_type[bi.blk_type].append(bi)
+    def _get_info(self, num):
+        """return block info of a block and scan it if necessary"""
+        if self.blk_status[num] == self.BS_NOT_SCANNED:
+            self._scan_on_demand(num)
+        bi = self.blk_infos.get(num)
+        if bi is None:
+            bi = BlockInfo(num)
+            bi.blk_status = self.blk_status[num]
         return bi
 
+    def _in_range(self, num):
+        return 0 <= num < len(self.blk_used)
+
+    def read_block(self, blk_num, is_bm=False, is_bm_ext=False):
+        """get block info and mark the block as used.
+        return None if the block number is out of range
+        """
+        if not self._in_range(blk_num):
+            return None
+        self.blk_used[blk_num] = 1
+        if is_bm or is_bm_ext:
+            return self._read_bitmap_block(blk_num, is_bm)
+        return self._get_info(blk_num)
+
     def any_chance_of_fs(self):
         """is there any chance to find a FS on this block device?"""
-        num_dirs = len(self.map_type[self.BT_DIR])
-        num_files = len(self.map_type[self.BT_FILE_HDR])
-        num_roots = len(self.map_type[self.BT_ROOT])
+        num_dirs = self.get_num_blocks_of_type(self.BT_DIR)
+        num_files = self.get_num_blocks_of_type(self.BT_FILE_HDR)
+        num_roots = self.get_num_blocks_of_type(self.BT_ROOT)
         return (num_files > 0) or ((num_roots + num_dirs) > 0)
 
+    def get_num_blocks_of_status(self, s):
+        return self.blk_status.count(s)
+
+    def get_num_blocks_of_type(self, t):
+        return self.blk_type.count(t)
+
+    def get_block_status(self, num):
+        """return status of a block without marking it used"""
+        if not self._in_range(num):
+            return None
+        if self.blk_status[num] == self.BS_NOT_SCANNED:
+            self._scan_on_demand(num)
+        return self.blk_status[num]
+
+    def get_block_type(self, num):
+        """return type of a block without marking it used"""
+        if self.get_block_status(num) is None:
+            return None
+        return self.blk_type[num]
+
     def get_blocks_of_type(self, t):
-        return self.map_type[t]
+        return [bi for bi in self.blk_infos.values() if bi.blk_type == t]
 
     def get_blocks_with_key_value(self, key, value):
         res = []
-        for bi in self.block_map:
+        for bi in self.blk_infos.values():
             if hasattr(bi, key):
                 v = getattr(bi, key)
                 if v == value:
@@ -249,21 +375,42 @@ class BlockScan:
         return res
 
     def is_block_available(self, num):
-        if num >= 0 and num < len(self.block_map):
-            return self.block_map[num] != None
+        """was the block already used by a scanner?"""
+        if self._in_range(num):
+            return self.blk_used[num] == 1
         else:
             return False
 
+    def use_block(self, num):
+        """mark block as used without decoding it.
+        return False if the block number is out of range
+        """
+        if not self._in_range(num):
+            return False
+        self.blk_used[num] = 1
+        return True
+
+    def get_free_bits(self, blk_num, num=32):
+        """return a bit mask with bit i set if block blk_num+i is not used.
+        blocks beyond the volume are not used.
+        """
+        used = self.blk_used[blk_num : blk_num + num]
+        # as binary digits: used blocks are '0' and lowest block is last
+        bits = used.translate(_free_digits)[::-1]
+        value = int(bits, 2) if bits else 0
+        missing = num - len(used)
+        if missing > 0:
+            value |= ((1 << missing) - 1) << len(used)
+        return value
+
     def get_block(self, num):
-        if num >= 0 and num < len(self.block_map):
-            bi = self.block_map[num]
-            if bi == None:
-                bi = self.read_block(num)
-            return bi
-        else:
-            return None
+        return self.read_block(num)
 
     def dump(self):
-        for b in self.block_map:
-            if b != None:
-                print(b)
+        for n in range(len(self.blk_status)):
+            if self.blk_used[n]:
+                print(self._get_info(n))
+
+
+# translate table to convert used flags into free bits
+_free_digits = bytes([ord("1"), ord("0")]) + bytes(254)
@@ -139,15 +139,22 @@ class DirScan:
 
     def build_chain(self, chain, dir_blk_info, blk_num, progress):
         """build a block chain"""
+        # follow the chain in a loop: chains of large dirs may be long
+        while blk_num != 0:
+            blk_num = self.build_chain_entry(chain, dir_blk_info, blk_num, progress)
+
+    def build_chain_entry(self, chain, dir_blk_info, blk_num, progress):
+        """add the entry block to the chain and return the next block or 0"""
         dir_blk_num = dir_blk_info.blk_num
         dir_name = dir_blk_info.name
         hash_val = chain.hash_val
+        block_scan = self.block_scan
 
         # make sure entry block is first used
-        block_used = self.block_scan.is_block_available(blk_num)
+        block_used = block_scan.is_block_available(blk_num)
 
         # get entry block
-        blk_info = self.block_scan.read_block(blk_num)
+        blk_info = block_scan.read_block(blk_num)
 
         # create dir chain entry
         dce = DirChainEntry(blk_info)
@@ -166,7 +173,7 @@ class DirScan:
                 blk_num,
             )
             dce.end = True
-            return
+            return 0
 
         # self reference?
         if blk_num == dir_blk_num:
@@ -177,7 +184,7 @@ class DirScan:
                 blk_num,
             )
             dce.end = True
-            return
+            return 0
 
         # not a block in range
         if blk_info == None:
@@ -188,11 +195,11 @@ class DirScan:
                 blk_num,
             )
             dce.end = True
-            return
+            return 0
 
         # check type of entry block
-        b_type = blk_info.blk_type
-        if b_type not in (BlockScan.BT_DIR, BlockScan.BT_FILE_HDR):
+        blk_type = blk_info.blk_type
+        if blk_type not in (BlockScan.BT_DIR, BlockScan.BT_FILE_HDR):
             self.log.msg(
                 Log.ERROR,
                 "invalid block terminates chain #%d of dir '%s' (%d)"
@@ -200,23 +207,7 @@ class DirScan:
                 blk_num,
             )
             dce.end = True
-            return
-
-        # check referenceed block type in chain
-        blk_type = blk_info.blk_type
-        if blk_type in (
-            BlockScan.BT_ROOT,
-            BlockScan.BT_FILE_LIST,
-            BlockScan.BT_FILE_DATA,
-        ):
-            self.log.msg(
-                Log.ERROR,
-                "invalid block type %d terminates chain #%d of dir '%s' (%d)"
-                % (blk_type, hash_val, dir_name, dir_blk_num),
-                blk_num,
-            )
-            dce.end = True
-            return
+            return 0
 
         # all following are ok
         dce.valid = True
@@ -250,12 +241,11 @@ class DirScan:
         elif blk_type == BlockScan.BT_FILE_HDR:
             self.files.append(dce)
 
-        # check next block in chain
+        # next block in chain
         next_blk = blk_info.next_blk
-        if next_blk != 0:
-            self.build_chain(chain, dir_blk_info, next_blk, progress)
-        else:
+        if next_blk == 0:
             dce.end = True
+        return next_blk
 
     def get_all_file_hdr_blk_infos(self):
         """return all file chain entries"""
@@ -5,11 +5,6 @@ from amitools.fs.validate.Log import Log
 import amitools.fs.DosType as DosType
 
 
-class FileData:
-    def __init__(self, bi):
-        self.bi = bi
-
-
 class FileInfo:
     def __init__(self, bi):
         self.bi = bi
@@ -95,41 +90,36 @@ class FileScan:
             sbi = ebi
             num += 1
 
-        # transform the data block numbers to file data
-        file_datas = []
+        # check the data blocks
+        block_scan = self.block_scan
         seq_num = 1
         for data_blk in linked_data_blocks:
-            # get block
-            block_used = self.block_scan.is_block_available(data_blk)
-            dbi = self.block_scan.get_block(data_blk)
-            fd = FileData(dbi)
-            file_datas.append(fd)
             # check usage of block
+            block_used = block_scan.is_block_available(data_blk)
             # is block available
-            if dbi == None:
+            if not block_scan.use_block(data_blk):
                 self.log.msg(
                     Log.ERROR,
                     "File data block #%d of %s not found" % (seq_num, info),
                     data_blk,
                 )
-            if block_used:
+            elif block_used:
                 self.log.msg(
                     Log.ERROR,
                     "File data block #%d of %s already used" % (seq_num, info),
                     data_blk,
                 )
-                fd.bi = None
             # in ofs check data blocks
-            if not self.ffs:
+            elif not self.ffs:
                 # check block type
-                if dbi.blk_type != BlockScan.BT_FILE_DATA:
+                if block_scan.get_block_type(data_blk) != BlockScan.BT_FILE_DATA:
                     self.log.msg(
                         Log.ERROR,
                         "File data block #%d of %s is no data block" % (seq_num, info),
                         data_blk,
                     )
-                    fd.bi = None
                 else:
+                    dbi = block_scan.get_block(data_blk)
                     # check header ref: must point to file header
                     if dbi.hdr_key != blk_num:
                         self.log.msg(
@@ -0,0 +1,197 @@
+import os
+import hashlib
+import sqlite3
+
+
+class CacheEntry:
+    """stored validation result of an image file"""
+
+    def __init__(
+        self, path, size, mtime_ns, level, debug, digest, regions, result, lines
+    ):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.level = level
+        self.debug = debug
+        self.digest = digest
+        self.regions = regions
+        self.result = result
+        self.lines = lines
+
+
+class ValidateCache:
+    """Keep validation results of image files in a SQLite database.
+
+    An image is identified by its path. If its size and mtime are unchanged
+    the stored result is used without reading the image. Otherwise the
+    image is hashed region by region and only images with changed contents
+    need to be validated again.
+
+    The stat and hashes of an image are taken once in lookup() before it is
+    validated and stored with its result. An image modified while it is
+    validated is therefore detected in the next run.
+    """
+
+    DB_NAME = "xdfscan.db"
+    # bump to drop all entries if validator results change
+    VERSION = 2
+    REGION_SIZE = 64 * 1024
+    DIGEST_SIZE = 8
+    # commit after this many updates
+    COMMIT_INTERVAL = 100
+
+    def __init__(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, self.DB_NAME)
+        self.db = sqlite3.connect(self.db_path)
+        self._setup_db()
+        self.num_updates = 0
+        # (stat, digest, regions) taken in lookup() and used in store()
+        self.snapshots = {}
+        # stats
+        self.num_hits = 0
+        self.num_rehashed = 0
+        self.num_changed = 0
+        self.num_changed_regions = 0
+        self.num_new = 0
+
+    def _setup_db(self):
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version != self.VERSION:
+            self.db.execute("DROP TABLE IF EXISTS images")
+            self.db.execute("PRAGMA user_version = %d" % self.VERSION)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+            "level INTEGER, debug INTEGER, digest BLOB, regions BLOB, "
+            "result TEXT, lines TEXT)"
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def hash_file(self, path):
+        """return (digest, regions) of the file contents.
+        regions is the concatenation of the hashes of all regions.
+        """
+        size = self.DIGEST_SIZE
+        region_hashes = []
+        with open(path, "rb") as fh:
+            while True:
+                data = fh.read(self.REGION_SIZE)
+                if not data:
+                    break
+                region_hashes.append(hashlib.blake2b(data, digest_size=size).digest())
+        regions = b"".join(region_hashes)
+        digest = hashlib.blake2b(regions, digest_size=size).digest()
+        return digest, regions
+
+    def get_changed_regions(self, old_regions, new_regions):
+        """return list of region numbers that differ"""
+        size = self.DIGEST_SIZE
+        num = max(len(old_regions), len(new_regions)) // size
+        changed = []
+        for i in range(num):
+            pos = i * size
+            if old_regions[pos : pos + size] != new_regions[pos : pos + size]:
+                changed.append(i)
+        return changed
+
+    def get_entry(self, path):
+        """return stored entry of image or None"""
+        row = self.db.execute(
+            "SELECT size, mtime_ns, level, debug, digest, regions, result, lines "
+            "FROM images WHERE path = ?",
+            (os.path.abspath(path),),
+        ).fetchone()
+        if row is None:
+            return None
+        size, mtime_ns, level, debug, digest, regions, result, lines = row
+        lines = lines.split("\n") if lines else []
+        return CacheEntry(
+            path, size, mtime_ns, level, bool(debug), digest, regions, result, lines
+        )
+
+    def lookup(self, path, level, debug=False):
+        """return the entry of an unchanged image or None if it needs to be
+        validated. the result must be given later with store().
+        the validator options level and debug must match the stored entry.
+        """
+        st = os.stat(path)
+        entry = self.get_entry(path)
+        if entry is None or entry.level != level or entry.debug != debug:
+            self.num_new += 1
+            self._take_snapshot(path, st)
+            return None
+        if entry.size == st.st_size and entry.mtime_ns == st.st_mtime_ns:
+            self.num_hits += 1
+            return entry
+        # file was touched: compare contents
+        digest, regions = self._take_snapshot(path, st)
+        if digest == entry.digest:
+            del self.snapshots[path]
+            self.num_hits += 1
+            self.num_rehashed += 1
+            entry.size = st.st_size
+            entry.mtime_ns = st.st_mtime_ns
+            self._update(entry)
+            return entry
+        self.num_changed += 1
+        self.num_changed_regions += len(
+            self.get_changed_regions(entry.regions, regions)
+        )
+        return None
+
+    def _take_snapshot(self, path, st):
+        digest, regions = self.hash_file(path)
+        self.snapshots[path] = (st, digest, regions)
+        return digest, regions
+
+    def discard(self, path):
+        """drop the snapshot of an image whose result is not stored"""
+        self.snapshots.pop(path, None)
+
+    def store(self, path, level, result, lines, debug=False):
+        """store the validation result of an image with the snapshot taken
+        in lookup()
+        """
+        snapshot = self.snapshots.pop(path, None)
+        if snapshot is None:
+            st = os.stat(path)
+            digest, regions = self.hash_file(path)
+        else:
+            st, digest, regions = snapshot
+        entry = CacheEntry(
+            path,
+            st.st_size,
+            st.st_mtime_ns,
+            level,
+            debug,
+            digest,
+            regions,
+            result,
+            lines,
+        )
+        self._update(entry)
+
+    def _update(self, entry):
+        self.db.execute(
+            "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                os.path.abspath(entry.path),
+                entry.size,
+                entry.mtime_ns,
+                entry.level,
+                int(entry.debug),
+                entry.digest,
+                entry.regions,
+                entry.result,
+                "\n".join(entry.lines),
+            ),
+        )
+        self.num_updates += 1
+        if self.num_updates % self.COMMIT_INTERVAL == 0:
+            self.db.commit()
@@ -103,6 +103,7 @@ class Validator:
     def scan_dir_tree(self):
         """Step 3: scan directory structure
         Return false if structure is not healthy"""
+        # blocks are read on demand in runs
         self.block_scan = BlockScan(self.blkdev, self.log, self.dos_type)
         self.dir_scan = DirScan(self.block_scan, self.log)
         ok = self.dir_scan.scan_tree(self.root.blk_num, progress=self.progress)
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+#
+# vamosc [vamos options] <amiga binary> [args ...]
+#
+# run an m68k AmigaOS binary on a vamos server (see vamosd)
+# falls back to a regular vamos run if no server is reachable
+#
+
+import sys
+
+from amitools.vamos.remote import run_remote, RemoteError, ConnectError
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    try:
+        return run_remote(args)
+    except RemoteError as e:
+        print("vamosc: server error: %s" % e, file=sys.stderr)
+        return 1
+    except ConnectError:
+        # no server: run vamos here
+        from amitools.tools.vamos import main as vamos_main
+
+        return vamos_main(args)
+    except OSError as e:
+        # the server may already run the command: do not run it again
+        print("vamosc: connection failed: %s" % e, file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
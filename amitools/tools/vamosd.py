@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+#
+# vamosd [options]
+#
+# run a vamos server that executes the commands of vamosc clients
+#
+
+import sys
+import argparse
+
+from amitools.vamos.remote import get_default_socket_path, stop_server
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="vamos server that runs the commands of vamosc clients"
+    )
+    parser.add_argument(
+        "-s",
+        "--socket",
+        default=None,
+        help="path of Unix socket (default: $VAMOS_SOCKET or %s)"
+        % get_default_socket_path(),
+    )
+    parser.add_argument(
+        "-q", "--quit", action="store_true", help="stop a running server"
+    )
+    opts = parser.parse_args(args)
+
+    if opts.quit:
+        try:
+            stop_server(opts.socket)
+        except OSError as e:
+            print("vamosd: no server found: %s" % e, file=sys.stderr)
+            return 1
+        return 0
+
+    # only the server needs the emulator
+    from amitools.vamos.server import VamosServer
+
+    with VamosServer(opts.socket) as server:
+        print("vamosd: listening on %s" % server.socket_path)
+        sys.stdout.flush()
+        try:
+            server.serve()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
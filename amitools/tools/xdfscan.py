@@ -7,10 +7,12 @@ import sys
 import argparse
 import os.path
 import time
+import multiprocessing
 
 from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
 from amitools.fs.validate.Validator import Validator
 from amitools.fs.validate.Progress import Progress
+from amitools.fs.validate.ValidateCache import ValidateCache
 
 # ----- logging -----
 
@@ -87,16 +89,34 @@ def check_extension(path, args):
 def scan_file(path, args):
     if not check_extension(path, args):
         return 0
-    try:
-        pre_log_path(path, "scan")
-        ret_code = 0
+    # already scanned in a previous run?
+    if args.done is not None and path in args.done:
+        args.stats.skipped += 1
+        return 0
+    entry = lookup_cache(path, args)
+    if entry:
+        report_result(path, entry.result, entry.lines, args, cached=True)
+        return 0
+    pre_log_path(path, "scan")
+    progress = MyProgress()
+    result, lines = validate_image(path, args.level, args.debug, progress)
+    report_result(path, result, lines, args)
+    return 0
+
 
+def validate_image(path, level, debug=False, progress=None):
+    """run the validator on a single image file.
+    return (result, log_lines)
+    """
+    try:
         # create a block device for image file
         blkdev = factory.open(path, read_only=True)
+    except IOError as e:
+        return "BLKDEV?", [str(e)]
 
+    try:
         # create validator
-        progress = MyProgress()
-        v = Validator(blkdev, min_level=args.level, debug=args.debug, progress=progress)
+        v = Validator(blkdev, min_level=level, debug=debug, progress=progress)
 
         # 1. check boot block
         res = []
@@ -144,16 +164,145 @@ def scan_file(path, args):
         # report result
         if len(res) == 0:
             res.append("done")
-        log_path(path, " ".join(res))
-        # summary
-        if args.verbose:
-            v.log.dump()
-        return ret_code
+        return " ".join(res), [str(e) for e in v.log.entries]
     except IOError as e:
-        log_path(path, "BLKDEV?")
-        if args.verbose:
-            print(e)
-        return 0
+        return "BLKDEV?", [str(e)]
+    finally:
+        blkdev.close()
+
+
+def validate_image_job(job):
+    """worker function of the parallel scan"""
+    path, level, debug = job
+    result, lines = validate_image(path, level, debug)
+    return path, result, lines
+
+
+def lookup_cache(path, args):
+    """return the cache entry of an unchanged image or None"""
+    if args.cache is None:
+        return None
+    return args.cache.lookup(path, args.level, args.debug)
+
+
+def report_result(path, result, lines, args, cached=False):
+    log_path(path, result)
+    if args.verbose:
+        for line in lines:
+            print(line)
+    # cached results are counted by the cache and not in the throughput
+    if not cached:
+        stats = args.stats
+        stats.num_images += 1
+        try:
+            stats.num_bytes += os.path.getsize(path)
+        except OSError:
+            pass
+        # remember result for next run. block device errors are not kept
+        if args.cache:
+            if result != "BLKDEV?":
+                args.cache.store(path, args.level, result, lines, args.debug)
+            else:
+                args.cache.discard(path)
+    # store in results file
+    if args.results_file:
+        args.results_file.write("%s\t%s\n" % (result, path))
+        args.results_file.flush()
+
+
+# ----- parallel scan -----
+
+
+def find_images(path, args):
+    """yield all image files to scan below path in scan order"""
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            yield from find_images(os.path.join(path, name), args)
+    elif os.path.isfile(path) and check_extension(path, args):
+        if args.done is not None and path in args.done:
+            args.stats.skipped += 1
+        else:
+            yield path
+
+
+def scan_parallel(paths, args):
+    """scan the images with a pool of worker processes.
+    results are reported in the same order as in a serial scan.
+    """
+    if args.cache:
+        # the pool consumes the jobs in a thread: use the cache up front
+        images = [(path, lookup_cache(path, args)) for path in paths]
+        paths = [path for path, entry in images if not entry]
+    jobs = ((path, args.level, args.debug) for path in paths)
+    with multiprocessing.Pool(args.jobs) as pool:
+        results = pool.imap(validate_image_job, jobs, chunksize=4)
+        if not args.cache:
+            for path, result, lines in results:
+                report_result(path, result, lines, args)
+            return
+        # merge cached and new results in scan order
+        for path, entry in images:
+            if entry:
+                report_result(path, entry.result, entry.lines, args, cached=True)
+            else:
+                report_result(*next(results), args)
+
+
+# ----- results -----
+
+
+class ScanStats:
+    def __init__(self):
+        self.num_images = 0
+        self.num_bytes = 0
+        self.skipped = 0
+        self.start = time.perf_counter()
+
+    def report(self):
+        delta = time.perf_counter() - self.start
+        if delta <= 0:
+            delta = 1e-9
+        print(
+            "%d images in %.2fs: %.1f images/s, %.2f MB/s"
+            % (
+                self.num_images,
+                delta,
+                self.num_images / delta,
+                self.num_bytes / (delta * 1024 * 1024),
+            )
+        )
+        if self.skipped > 0:
+            print("%d images skipped (already in results file)" % self.skipped)
+
+    def report_cache(self, cache):
+        print(
+            "%d images skipped (unchanged), %d revalidated (%d regions changed), %d new"
+            % (
+                cache.num_hits,
+                cache.num_changed,
+                cache.num_changed_regions,
+                cache.num_new,
+            )
+        )
+
+
+def load_results(file_name):
+    """return the set of image paths already stored in a results file.
+    a partially written last line of an interrupted scan is removed.
+    """
+    done = set()
+    if os.path.exists(file_name):
+        with open(file_name, "r+b") as fh:
+            valid = 0
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break
+                valid += len(line)
+                pos = line.find(b"\t")
+                if pos > 0:
+                    done.add(line[pos + 1 : -1].decode("utf-8"))
+            fh.truncate(valid)
+    return done
 
 
 # ----- main -----
@@ -196,14 +345,64 @@ def main(args=None):
         default=False,
         help="do not scan hard disk images",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        default=None,
+        type=int,
+        help="scan images with the given number of worker processes",
+    )
+    parser.add_argument(
+        "-r",
+        "--results",
+        default=None,
+        help="append results to this file and skip images already found in it",
+    )
+    parser.add_argument(
+        "-c",
+        "--cache",
+        default=None,
+        help="keep results in a cache in this directory and skip unchanged images",
+    )
     args = parser.parse_args(args=args)
 
-    # main scan loop
-    ret = 0
-    for i in args.input:
-        ret = scan(i, args)
-        if ret != 0:
-            break
+    # resume from results file
+    args.stats = ScanStats()
+    args.done = None
+    args.results_file = None
+    if args.results:
+        args.done = load_results(args.results)
+        args.results_file = open(args.results, "a", encoding="utf-8")
+    # cache of previous results
+    cache_dir = args.cache
+    args.cache = None
+    if cache_dir:
+        args.cache = ValidateCache(cache_dir)
+
+    try:
+        # main scan loop
+        ret = 0
+        for i in args.input:
+            if args.jobs is not None and args.jobs > 1:
+                if not os.path.exists(i):
+                    log_path(i, "DOES NOT EXIST")
+                    ret = 1
+                else:
+                    scan_parallel(find_images(i, args), args)
+            else:
+                ret = scan(i, args)
+            if ret != 0:
+                break
+        # report throughput
+        if args.jobs is not None or args.results or args.cache:
+            args.stats.report()
+        if args.cache:
+            args.stats.report_cache(args.cache)
+    finally:
+        if args.results_file:
+            args.results_file.close()
+        if args.cache:
+            args.cache.close()
     return ret
 
 
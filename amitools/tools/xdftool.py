@@ -6,6 +6,7 @@
 import sys
 import argparse
 import os.path
+import shutil
 
 from amitools.fs.ADFSVolume import ADFSVolume
 from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
@@ -361,8 +362,8 @@ class TypeCmd(Command):
             return 1
         else:
             name = make_fsstr(p[0])
-            data = vol.read_file(name)
-            sys.stdout.buffer.write(data)
+            with vol.open_read_file(name) as reader:
+                shutil.copyfileobj(reader, sys.stdout.buffer)
             return 0
 
 
@@ -394,11 +395,10 @@ class ReadCmd(Command):
             return 2
         # its a file
         if node.is_file():
-            data = node.get_file_data()
-            # write data to file
-            fh = open(out_name, "wb")
-            fh.write(data)
-            fh.close()
+            # stream data to file
+            with node.open_read() as reader:
+                with open(out_name, "wb") as fh:
+                    shutil.copyfileobj(reader, fh)
         # its a dir
         elif node.is_dir():
             img = Imager(meta_mode=Imager.META_MODE_NONE)
@@ -462,10 +462,11 @@ class WriteCmd(Command):
         file_name = make_fsstr(file_name)
         # handle file
         if os.path.isfile(sys_file):
-            fh = open(sys_file, "rb")
-            data = fh.read()
-            fh.close()
-            vol.write_file(data, ami_path, file_name)
+            size = os.path.getsize(sys_file)
+            with open(sys_file, "rb") as fh:
+                with vol.open_write_file(ami_path, file_name, size) as writer:
+                    shutil.copyfileobj(fh, writer)
+            writer.node.flush()
         # handle dir
         elif os.path.isdir(sys_file):
             parent_node, dir_name = vol.get_create_path_name(ami_path, file_name)
@@ -631,7 +632,7 @@ class BlockCmd(Command):
                 blk = Block(vol.blkdev, block_no)
                 blk.read()
                 if blk.valid:
-                    dec_blk = BlockFactory.create_specific_block(blk)
+                    dec_blk = BlockFactory.create_specific_block(blk, vol.block_cache)
                     if dec_blk:
                         dec_blk.read()
                         dec_blk.dump()
@@ -7,9 +7,22 @@ class AccessStruct(object):
 
     def __init__(self, mem, struct_def, struct_addr):
         self.mem = mem
-        self.struct = struct_def(mem, struct_addr)
+        self.struct_def = struct_def
+        self.struct_addr = struct_addr
+        self._struct = None
+
+    @property
+    def struct(self):
+        # only create the struct instance with all its fields if needed
+        if self._struct is None:
+            self._struct = self.struct_def(self.mem, self.struct_addr)
+        return self._struct
 
     def w_s(self, name, val):
+        acc = self._find_accessor(name)
+        if acc is not None:
+            acc.write(self.mem, self.struct_addr, val)
+            return
         field, field_def = self._get_field_for_name(name)
         # BPTR auto conversion
         if issubclass(field_def.type, BCPLPointerType):
@@ -18,6 +31,9 @@ class AccessStruct(object):
             field.set(val)
 
     def r_s(self, name):
+        acc = self._find_accessor(name)
+        if acc is not None:
+            return acc.read(self.mem, self.struct_addr)
         field, field_def = self._get_field_for_name(name)
         # BPTR auto conversion
         if issubclass(field_def.type, BCPLPointerType):
@@ -26,23 +42,43 @@ class AccessStruct(object):
             val = field.get()
         return val
 
+    def r_fields(self, *names):
+        """read multiple scalar fields at once and return a list of values"""
+        group = self.struct_def.sdef.get_field_group(names)
+        return group.read(self.mem, self.struct_addr)
+
+    def w_fields(self, fields):
+        """write a dict of scalar field names and values at once"""
+        group = self.struct_def.sdef.get_field_group(fields.keys())
+        group.write(self.mem, self.struct_addr, list(fields.values()))
+
     def s_get_addr(self, name):
-        field, _ = self._get_field_for_name(name)
-        return field.get_addr()
+        offset, _ = self._find_field_path(name)
+        return self.struct_addr + offset
 
     def get_size(self):
-        return self.struct.get_byte_size()
+        return self.struct_def.get_byte_size()
+
+    def _find_accessor(self, name):
+        try:
+            return self.struct_def.sdef.find_accessor(name)
+        except KeyError:
+            raise KeyError(self, name)
+
+    def _find_field_path(self, name):
+        try:
+            return self.struct_def.sdef.find_field_path(name)
+        except KeyError:
+            raise KeyError(self, name)
 
     def _get_field_for_name(self, name):
+        # make sure the path is valid
+        self._find_field_path(name)
         struct = self.struct
-        field_def = None
         field = None
         # walk along fields in name "bla.foo.bar"
         for field_name in name.split("."):
-            assert struct is not None
             field_def = struct.sdef.find_field_def_by_name(field_name)
-            if not field_def:
-                raise KeyError(self, name)
             field = struct.sfields.get_field_by_index(field_def.index)
             # find potential next struct
             if isinstance(field, AmigaStruct):
@@ -0,0 +1,172 @@
+import struct
+from .scalar import ScalarType
+from .pointer import PointerType, BCPLPointerType
+from .enum import Enum
+from .bitfield import BitField
+
+# struct module formats for (mem width, signed)
+_formats = {
+    (0, False): "B",
+    (0, True): "b",
+    (1, False): "H",
+    (1, True): "h",
+    (2, False): "I",
+    (2, True): "i",
+}
+
+
+def _enum_value(cls, val):
+    # same checks as Enum.set()
+    if val in cls._values:
+        return val
+    elif val in cls._names:
+        return cls.from_str(val)
+    else:
+        raise ValueError("Invalid enum value: " + val)
+
+
+class FieldAccessor:
+    """read and write a scalar field of a struct with a precompiled offset.
+
+    The accessor is created once for a dotted field path of a struct type
+    and then works on any address of a struct of this type. It behaves like
+    AccessStruct: pointers are read as addresses and BPTRs are converted
+    to and from byte addresses.
+    """
+
+    __slots__ = ("path", "offset", "width", "signed", "bptr", "conv")
+
+    def __init__(self, path, offset, width, signed=False, bptr=False, conv=None):
+        self.path = path
+        self.offset = offset
+        self.width = width
+        self.signed = signed
+        self.bptr = bptr
+        # optional conversion of written values, e.g. enum names
+        self.conv = conv
+
+    @classmethod
+    def from_type(cls, path, offset, field_type):
+        """create accessor for a field type or return None if not a scalar"""
+        if issubclass(field_type, BCPLPointerType):
+            return cls(path, offset, 2, bptr=True)
+        elif issubclass(field_type, PointerType):
+            return cls(path, offset, 2)
+        elif issubclass(field_type, ScalarType):
+            conv = None
+            if issubclass(field_type, Enum):
+                conv = lambda val: _enum_value(field_type, val)
+            elif issubclass(field_type, BitField):
+                conv = field_type._get_bit_mask
+            width = field_type.get_mem_width()
+            return cls(path, offset, width, field_type.is_signed(), conv=conv)
+
+    def __repr__(self):
+        return "FieldAccessor(%s, offset=%d, width=%d, signed=%s, bptr=%s)" % (
+            self.path,
+            self.offset,
+            self.width,
+            self.signed,
+            self.bptr,
+        )
+
+    def get_byte_size(self):
+        return 1 << self.width
+
+    def get_format(self):
+        """return the struct module format char of the field"""
+        return _formats[(self.width, self.signed)]
+
+    def read(self, mem, addr):
+        if self.signed:
+            val = mem.reads(self.width, addr + self.offset)
+        else:
+            val = mem.read(self.width, addr + self.offset)
+        if self.bptr:
+            return val << 2
+        return val
+
+    def write(self, mem, addr, val):
+        if self.conv:
+            val = self.conv(val)
+        elif self.bptr:
+            val >>= 2
+        if self.signed:
+            mem.writes(self.width, addr + self.offset, val)
+        else:
+            mem.write(self.width, addr + self.offset, val)
+
+
+class FieldGroup:
+    """read and write several scalar fields of a struct in one go.
+
+    The memory range covering all fields is read or written with a single
+    block access and the values are converted with a precompiled format.
+    Gaps between the fields are kept untouched on write.
+    """
+
+    def __init__(self, accessors):
+        accessors = tuple(accessors)
+        assert accessors
+        self.accessors = accessors
+        # fields in memory order
+        order = sorted(range(len(accessors)), key=lambda i: accessors[i].offset)
+        start = accessors[order[0]].offset
+        pos = start
+        fmt = [">"]
+        for i in order:
+            acc = accessors[i]
+            if acc.offset < pos:
+                raise ValueError("overlapping fields: " + acc.path)
+            fmt.append("x" * (acc.offset - pos))
+            fmt.append(acc.get_format())
+            pos = acc.offset + acc.get_byte_size()
+        self.start = start
+        self.size = pos - start
+        self.order = order
+        self.fmt = struct.Struct("".join(fmt))
+        # fields with gaps in between are packed one by one on write
+        self.has_gaps = self.fmt.size != sum(a.get_byte_size() for a in accessors)
+        self.field_fmts = [
+            (
+                struct.Struct(">" + accessors[i].get_format()),
+                accessors[i].offset - start,
+            )
+            for i in order
+        ]
+
+    def get_paths(self):
+        return [acc.path for acc in self.accessors]
+
+    def read(self, mem, addr):
+        """return a list of values in the order of the accessors"""
+        data = mem.r_block(addr + self.start, self.size)
+        mem_vals = self.fmt.unpack(data)
+        accessors = self.accessors
+        vals = [None] * len(accessors)
+        for i, val in zip(self.order, mem_vals):
+            if accessors[i].bptr:
+                val <<= 2
+            vals[i] = val
+        return vals
+
+    def write(self, mem, addr, vals):
+        """write the values given in the order of the accessors"""
+        accessors = self.accessors
+        mem_vals = []
+        for i in self.order:
+            acc = accessors[i]
+            val = vals[i]
+            if acc.conv:
+                val = acc.conv(val)
+            elif acc.bptr:
+                val >>= 2
+            mem_vals.append(val)
+        base = addr + self.start
+        if self.has_gaps:
+            data = bytearray(mem.r_block(base, self.size))
+            for (fmt, off), val in zip(self.field_fmts, mem_vals):
+                fmt.pack_into(data, off, val)
+            mem.w_block(base, bytes(data))
+        else:
+            mem.w_block(base, self.fmt.pack(*mem_vals))
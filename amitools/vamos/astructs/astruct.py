@@ -1,6 +1,7 @@
 import re
 import collections
 from .typebase import TypeBase
+from .accessor import FieldAccessor, FieldGroup
 
 
 class APTR_SELF:
@@ -104,6 +105,10 @@ class AmigaStructFieldDefs:
         self._total_size = 0
         self._alias_names = {}
         self._alias_type = None
+        # compiled field paths
+        self._paths = {}
+        self._accessors = {}
+        self._groups = {}
 
     def get_num_field_defs(self):
         return len(self._field_defs)
@@ -199,6 +204,62 @@ class AmigaStructFieldDefs:
                 cur_cls = field_def.type.sdef
         return field_defs
 
+    def find_field_path(self, path):
+        """resolve a dotted field path, e.g. "tc_Node.ln_Name".
+
+        return offset, field_def of the last field or raise KeyError
+        """
+        res = self._paths.get(path)
+        if res is None:
+            sdef = self
+            offset = 0
+            field_def = None
+            for name in path.split("."):
+                if sdef is None:
+                    raise KeyError(path)
+                field_def = sdef.find_field_def_by_name(name)
+                if not field_def:
+                    raise KeyError(path)
+                offset += field_def.offset
+                if issubclass(field_def.type, AmigaStruct):
+                    sdef = field_def.type.sdef
+                else:
+                    sdef = None
+            res = offset, field_def
+            self._paths[path] = res
+        return res
+
+    def find_accessor(self, path):
+        """return FieldAccessor for the dotted path of a field.
+
+        None is returned if the field is no scalar or pointer
+        and KeyError is raised if the path is invalid.
+        """
+        try:
+            return self._accessors[path]
+        except KeyError:
+            pass
+        offset, field_def = self.find_field_path(path)
+        acc = FieldAccessor.from_type(path, offset, field_def.type)
+        self._accessors[path] = acc
+        return acc
+
+    def get_accessor(self, path):
+        """return FieldAccessor for the dotted path of a scalar field"""
+        acc = self.find_accessor(path)
+        if acc is None:
+            raise ValueError("no scalar field: " + path)
+        return acc
+
+    def get_field_group(self, paths):
+        """return FieldGroup to access the scalar fields given by paths"""
+        paths = tuple(paths)
+        group = self._groups.get(paths)
+        if group is None:
+            group = FieldGroup([self.get_accessor(path) for path in paths])
+            self._groups[paths] = group
+        return group
+
     def get_alias_name(self, name):
         return self._alias_names.get(name)
 
@@ -340,6 +401,16 @@ class AmigaStruct(TypeBase):
             return alias_type
         return cls
 
+    @classmethod
+    def get_accessor(cls, path):
+        """return compiled accessor for a scalar field given by dotted path"""
+        return cls.sdef.get_accessor(path)
+
+    @classmethod
+    def get_field_group(cls, *paths):
+        """return compiled accessor for multiple scalar fields"""
+        return cls.sdef.get_field_group(paths)
+
     @classmethod
     def _alloc(cls, alloc, tag, **kwargs):
         if tag is None:
@@ -18,16 +18,21 @@ class MachineParser(Parser):
             "40",
         )
         hw_access = ("emu", "ignore", "abort", "disable")
+        mem_alloc = ("first_fit", "bins")
+        slicing = ("fixed", "adaptive")
         def_cfg = {
             "machine": {
                 "cpu": Value(str, "68000", enum=cpus),
                 "max_cycles": 0,
                 "cycles_per_run": 1000,
+                "slicing": Value(str, "fixed", enum=slicing),
+                "max_cycles_per_run": 256000,
                 "ram_size": 1024,
             },
             "memmap": {
                 "hw_access": Value(str, "emu", enum=hw_access),
                 "old_dos_guard": False,
+                "mem_alloc": Value(str, "first_fit", enum=mem_alloc),
             },
         }
         arg_cfg = {
@@ -50,6 +55,18 @@ class MachineParser(Parser):
                     type=int,
                     help="cycles per block",
                 ),
+                "slicing": Argument(
+                    "--slicing",
+                    action="store",
+                    help="Run blocks of fixed size or grow them while no traps "
+                    "are called (fixed, adaptive)",
+                ),
+                "max_cycles_per_run": Argument(
+                    "--max-cycles-per-block",
+                    action="store",
+                    type=int,
+                    help="max cycles per block with adaptive slicing",
+                ),
                 "ram_size": Argument(
                     "-m",
                     "--ram-size",
@@ -70,6 +87,11 @@ class MachineParser(Parser):
                     action="store_true",
                     help="Reserve memory range to track access to BCPL addrs",
                 ),
+                "mem_alloc": Argument(
+                    "--mem-alloc",
+                    action="store",
+                    help="Memory allocator: first_fit or bins (size-class bins)",
+                ),
             },
         }
         ini_trafo = {
@@ -77,9 +99,15 @@ class MachineParser(Parser):
                 "cpu": "cpu",
                 "max_cycles": "max_cycles",
                 "cycles_per_run": "cycles_per_run",
+                "slicing": "slicing",
+                "max_cycles_per_run": "max_cycles_per_run",
                 "ram_size": "ram_size",
             },
-            "memmap": {"hw_access": "hw_access", "old_dos_guard": "old_dos_guard"},
+            "memmap": {
+                "hw_access": "hw_access",
+                "old_dos_guard": "old_dos_guard",
+                "mem_alloc": "mem_alloc",
+            },
         }
         Parser.__init__(
             self,
@@ -7,6 +7,12 @@ class ProfileParser(Parser):
             "profile": {
                 "enabled": False,
                 "libs": {"names": ValueList(str), "calls": False},
+                "cpu": {
+                    "enabled": False,
+                    "interval": 10000,
+                    "depth": 16,
+                    "collapsed": Value(str),
+                },
                 "output": {"file": Value(str), "append": False, "dump": False},
             }
         }
@@ -27,6 +33,30 @@ class ProfileParser(Parser):
                         help="store each lib call individually",
                     ),
                 },
+                "cpu": {
+                    "enabled": Argument(
+                        "--profile-cpu",
+                        action="store_true",
+                        help="sample the m68k code running on the CPU",
+                    ),
+                    "interval": Argument(
+                        "--profile-cpu-interval",
+                        action="store",
+                        type=int,
+                        help="cycles between two CPU samples",
+                    ),
+                    "depth": Argument(
+                        "--profile-cpu-depth",
+                        action="store",
+                        type=int,
+                        help="max number of callers per CPU sample (0=flat)",
+                    ),
+                    "collapsed": Argument(
+                        "--profile-cpu-collapsed",
+                        action="store",
+                        help="write CPU samples as collapsed stacks to file",
+                    ),
+                },
                 "output": {
                     "file": Argument(
                         "--profile-file",
@@ -1,87 +1,152 @@
 import logging
+from bisect import bisect_left, bisect_right
+from itertools import count
 from amitools.vamos.log import *
 
 
 class LabelManager:
     def __init__(self):
-        self.first = None
-        self.last = None
+        # The labels are kept in parallel lists sorted by start address.
+        # Equal start addresses keep their insertion order.
+        self.starts = []
+        self.ends = []
+        self.ranges = []
+        self.seqs = []
+        self.seq = count()
+        # max_ends[i] is the max end address of all labels up to index i
+        self.max_ends = []
 
-    # This is now all done manually with doubly linked
-    # lists. The reason for this is that the python built-in
-    # lists are ill-performing as the list grows larger,
-    # and this is a heavy-duty class.
+    # Lookups bisect the start addresses and then use the max end addresses
+    # to find labels that started before but still cover the address.
+    # Python lists move their entries in C on insert and delete and so keep
+    # up with a large number of labels.
     def add_label(self, range):
-        assert range.next == None
-        assert range.prev == None
-        if self.last == None:
-            assert self.first == None
-            self.last = range
-            self.first = range
-        else:
-            self.last.next = range
-            range.prev = self.last
-            self.last = range
+        pos = bisect_right(self.starts, range.addr)
+        self.starts.insert(pos, range.addr)
+        self.ends.insert(pos, range.end)
+        self.ranges.insert(pos, range)
+        self.seqs.insert(pos, next(self.seq))
+        # update max ends: only the following labels ending before are raised
+        max_ends = self.max_ends
+        end = range.end
+        if pos > 0 and max_ends[pos - 1] > end:
+            end = max_ends[pos - 1]
+        max_ends.insert(pos, end)
+        pos += 1
+        num = len(max_ends)
+        while pos < num and max_ends[pos] < end:
+            max_ends[pos] = end
+            pos += 1
+
+    def _find_label(self, range):
+        starts = self.starts
+        ranges = self.ranges
+        pos = bisect_left(starts, range.addr)
+        num = len(starts)
+        while pos < num and starts[pos] == range.addr:
+            if ranges[pos] is range:
+                return pos
+            pos += 1
+        return -1
+
+    def _remove_pos(self, pos):
+        del self.starts[pos]
+        del self.ends[pos]
+        del self.ranges[pos]
+        del self.seqs[pos]
+        del self.max_ends[pos]
+
+    def _fix_max_ends(self, pos, last_pos=0):
+        # recalc max ends after removal until they match again
+        # (but at least up to last_pos)
+        max_ends = self.max_ends
+        ends = self.ends
+        end = max_ends[pos - 1] if pos > 0 else -1
+        for pos in range(pos, len(ends)):
+            if ends[pos] > end:
+                end = ends[pos]
+            if max_ends[pos] == end and pos >= last_pos:
+                break
+            max_ends[pos] = end
 
     def remove_label(self, range):
-        if range.prev != None:
-            range.prev.next = range.next
-        if range.next != None:
-            range.next.prev = range.prev
-        if self.last == range:
-            self.last = range.prev
-        if self.first == range:
-            self.first = range.next
-        range.next = None
-        range.prev = None
+        pos = self._find_label(range)
+        if pos >= 0:
+            self._remove_pos(pos)
+            self._fix_max_ends(pos)
 
     def delete_labels_within(self, addr, size):
         # try to find compatible: release all labels within the given range
         # this is necessary because the label could be part of a puddle
         # that is released in one go.
-        r = self.first
-        while r != None:
-            if r.addr >= addr and r.addr + r.size <= addr + size:
-                s = r.next
-                self.remove_label(r)
-                r = s
-            else:
-                r = r.next
+        end = addr + size
+        begin_pos = bisect_left(self.starts, addr)
+        end_pos = bisect_right(self.starts, end)
+        ends = self.ends
+        num_removed = 0
+        for pos in range(end_pos - 1, begin_pos - 1, -1):
+            if ends[pos] <= end:
+                self._remove_pos(pos)
+                num_removed += 1
+        if num_removed > 0:
+            self._fix_max_ends(begin_pos, end_pos - num_removed)
+
+    def _get_labels_in_order(self, ranges_seqs):
+        # return labels in the order they were added
+        return [r for _, r in sorted(ranges_seqs, key=lambda x: x[0])]
 
     def get_all_labels(self):
-        ranges = []
-        r = self.first
-        while r != None:
-            ranges.append(r)
-            r = r.next
-        return ranges
+        return self._get_labels_in_order(zip(self.seqs, self.ranges))
 
     def dump(self):
-        r = self.first
-        while r != None:
+        for r in self.get_all_labels():
             print(r)
-            r = r.next
 
     # This is called quite often and hence
     # a bit speed critical. It finds the
     # range within which the given address
-    # lies.
+    # lies. If labels overlap then the first
+    # one added is returned.
     def get_label(self, addr):
-        r = self.first
-        while r != None:
-            if r.addr <= addr and addr < r.end:
-                return r
-            r = r.next
-        return None
+        pos = bisect_right(self.starts, addr) - 1
+        if pos < 0:
+            return None
+        max_ends = self.max_ends
+        ends = self.ends
+        # fast path: last label starting before addr
+        if ends[pos] > addr and (pos == 0 or max_ends[pos - 1] <= addr):
+            return self.ranges[pos]
+        # walk left while labels still may cover addr
+        seqs = self.seqs
+        result = None
+        result_seq = None
+        while pos >= 0 and max_ends[pos] > addr:
+            if ends[pos] > addr:
+                seq = seqs[pos]
+                if result_seq is None or seq < result_seq:
+                    result = self.ranges[pos]
+                    result_seq = seq
+            pos -= 1
+        return result
 
     def get_intersecting_labels(self, addr, size):
-        result = []
-        r = self.first
-        while r != None:
-            if r.does_intersect(addr, size):
-                result.append(r)
-            r = r.next
-        return result
+        end = addr + size
+        starts = self.starts
+        ends = self.ends
+        seqs = self.seqs
+        ranges = self.ranges
+        # all labels starting within [addr, end]
+        begin_pos = bisect_left(starts, addr)
+        end_pos = bisect_right(starts, end)
+        result = [(seqs[pos], ranges[pos]) for pos in range(begin_pos, end_pos)]
+        # labels starting before and reaching addr
+        max_ends = self.max_ends
+        pos = begin_pos - 1
+        while pos >= 0 and max_ends[pos] >= addr:
+            if ends[pos] >= addr:
+                result.append((seqs[pos], ranges[pos]))
+            pos -= 1
+        return self._get_labels_in_order(result)
 
     def get_label_offset(self, addr):
         r = self.get_label(addr)
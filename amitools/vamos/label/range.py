@@ -4,8 +4,6 @@ class LabelRange:
         self.addr = addr
         self.size = size
         self.end = addr + size
-        self.next = None
-        self.prev = None
 
     def __str__(self):
         return "<@%06x +%06x %06x> [%s]" % (
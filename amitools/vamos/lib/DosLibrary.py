@@ -24,6 +24,7 @@ from amitools.vamos.libstructs import (
     CLIStruct,
     DosPacketStruct,
     PathStruct,
+    ExAllControlStruct,
 )
 from amitools.vamos.error import *
 from amitools.vamos.log import log_dos
@@ -39,6 +40,7 @@ from .dos.CommandLine import CommandLine
 from .dos.Process import Process
 from .dos.DosList import DosList
 from .dos.LockManager import LockManager
+from .dos.Lock import ED_NAME, ED_OWNER
 from .dos.FileManager import FileManager
 from .dos.CSource import *
 from .dos.Item import *
@@ -589,8 +591,13 @@ class DosLibrary(LibImpl):
         fh_b_addr = ctx.cpu.r_reg(REG_D1)
         if fh_b_addr != 0:
             fh = self.file_mgr.get_by_b_addr(fh_b_addr)
-            self.file_mgr.close(fh)
+            ok = self.file_mgr.close(fh)
             log_dos.info("Close: %s" % fh)
+            if not ok:
+                # writing the buffered data failed
+                log_dos.warning("Close: %s: buffered data could not be written", fh)
+                self.setioerr(ctx, ERROR_DISK_FULL)
+                return self.DOSFALSE
             self.setioerr(ctx, 0)
         return self.DOSTRUE
 
@@ -600,10 +607,14 @@ class DosLibrary(LibImpl):
         size = ctx.cpu.r_reg(REG_D3)
 
         fh = self.file_mgr.get_by_b_addr(fh_b_addr, False)
+        # transfer the host data to memory in a single block
         data = fh.read(size)
-        ctx.mem.w_block(buf_ptr, data)
-        got = len(data)
-        log_dos.info("Read(%s, %06x, %d) -> %d" % (fh, buf_ptr, size, got))
+        if data == -1:
+            got = -1
+        else:
+            ctx.mem.w_block(buf_ptr, data)
+            got = len(data)
+        log_dos.info("Read(%s, %06x, %d) -> %d", fh, buf_ptr, size, got)
         return got
 
     def Write(self, ctx):
@@ -613,10 +624,9 @@ class DosLibrary(LibImpl):
 
         fh = self.file_mgr.get_by_b_addr(fh_b_addr, True)
         data = ctx.mem.r_block(buf_ptr, size)
-        fh.write(data)
-        got = len(data)
-        log_dos.info("Write(%s, %06x, %d) -> %d" % (fh, buf_ptr, size, got))
-        return size
+        got = fh.write(data, buffered=False)
+        log_dos.info("Write(%s, %06x, %d) -> %d", fh, buf_ptr, size, got)
+        return got
 
     def FWrite(self, ctx):
         fh_b_addr = ctx.cpu.r_reg(REG_D1)
@@ -626,12 +636,16 @@ class DosLibrary(LibImpl):
         # Actually, this is buffered I/O, not unbuffered IO. For the
         # time being, keep it unbuffered.
         fh = self.file_mgr.get_by_b_addr(fh_b_addr, True)
-        data = ctx.mem.r_block(buf_ptr, size * number)
-        fh.write(data)
-        got = len(data) // size
-        log_dos.info(
-            "FWrite(%s, %06x, %d, %d) -> %d" % (fh, buf_ptr, size, number, got)
-        )
+        total = size * number
+        if total == 0:
+            got = 0
+        else:
+            data = ctx.mem.r_block(buf_ptr, total)
+            if fh.write(data, buffered=False) < 0:
+                got = 0
+            else:
+                got = number
+        log_dos.info("FWrite(%s, %06x, %d, %d) -> %d", fh, buf_ptr, size, number, got)
         return got
 
     def FRead(self, ctx):
@@ -643,13 +657,17 @@ class DosLibrary(LibImpl):
         # go through all the buffer logic. However, for the time
         # being, keep it unbuffered.
         fh = self.file_mgr.get_by_b_addr(fh_b_addr, True)
-        data = fh.read(size * number)
-        if data == -1:
-            got = 0  # simple error handling
+        total = size * number
+        if total == 0:
+            got = 0
         else:
-            got = len(data) // size
-            ctx.mem.w_block(buf_ptr, data)
-        log_dos.info("FRead(%s, %06x, %d, %d) -> %d" % (fh, buf_ptr, size, number, got))
+            data = fh.read(total)
+            if data == -1:
+                got = 0  # simple error handling
+            else:
+                got = len(data) // size
+                ctx.mem.w_block(buf_ptr, data)
+        log_dos.info("FRead(%s, %06x, %d, %d) -> %d", fh, buf_ptr, size, number, got)
         return got
 
     def Seek(self, ctx):
@@ -690,16 +708,16 @@ class DosLibrary(LibImpl):
         fh = self.file_mgr.get_by_b_addr(fh_b_addr, False)
         ch = fh.getc()
         if ch == -1:
-            log_dos.info("FGetC(%s) -> EOF (%d)" % (fh, ch))
+            log_dos.info("FGetC(%s) -> EOF (%d)", fh, ch)
         else:
-            log_dos.info("FGetC(%s) -> '%c' (%d)" % (fh, ch, ch))
+            log_dos.info("FGetC(%s) -> '%c' (%d)", fh, ch, ch)
         return ch
 
     def FPutC(self, ctx):
         fh_b_addr = ctx.cpu.r_reg(REG_D1)
         val = ctx.cpu.r_reg(REG_D2)
         fh = self.file_mgr.get_by_b_addr(fh_b_addr, True)
-        log_dos.info("FPutC(%s, '%c' (%d))" % (fh, val, val))
+        log_dos.info("FPutC(%s, '%c' (%d))", fh, val, val)
         fh.write(bytes((val,)))
         return val
 
@@ -710,7 +728,7 @@ class DosLibrary(LibImpl):
         # write to stdout
         fh = self.file_mgr.get_by_b_addr(fh_b_addr, True)
         ok = fh.write(str_dat)
-        log_dos.info("FPuts(%s,'%s')" % (fh, str_dat))
+        log_dos.info("FPuts(%s,'%s')", fh, str_dat)
         return 0  # ok
 
     def UnGetC(self, ctx):
@@ -718,7 +736,7 @@ class DosLibrary(LibImpl):
         val = ctx.cpu.r_reg(REG_D2)
         fh = self.file_mgr.get_by_b_addr(fh_b_addr, False)
         ch = fh.ungetc(val)
-        log_dos.info("UnGetC(%s, %d) -> ch=%d (%d)" % (fh, val, ch, ch))
+        log_dos.info("UnGetC(%s, %d) -> ch=%d (%d)", fh, val, ch, ch)
         return ch
 
     # ----- StdOut -----
@@ -746,7 +764,7 @@ class DosLibrary(LibImpl):
         fh = ctx.process.get_output()
         log_dos.info("VPrintf: format='%s' argv=%06x" % (fmt, argv_ptr))
         # now decode printf
-        ps = Printf.printf_parse_string(fmt)
+        ps = Printf.printf_parse_cached(fmt)
         Printf.printf_read_data(ps, ctx.mem, argv_ptr)
         log_dos.debug("VPrintf: parsed format: %s", ps)
         result = Printf.printf_generate_output(ps)
@@ -763,7 +781,7 @@ class DosLibrary(LibImpl):
         # write on output
         log_dos.info("VFPrintf: format='%s' argv=%06x" % (fmt, argv_ptr))
         # now decode printf
-        ps = Printf.printf_parse_string(fmt)
+        ps = Printf.printf_parse_cached(fmt)
         Printf.printf_read_data(ps, ctx.mem, argv_ptr)
         log_dos.debug("VFPrintf: parsed format: %s", ps)
         result = Printf.printf_generate_output(ps)
@@ -857,10 +875,11 @@ class DosLibrary(LibImpl):
             return 0
 
         fh = self.file_mgr.get_by_b_addr(fh_b_addr, False)
-        line = fh.gets(buflen)
+        # at most buflen-1 chars are read to keep room for the terminator
+        line = fh.gets(max(buflen - 1, 0))
         # Bummer! FIXME: There is currently no way this can communicate an I/O error
         self.setioerr(ctx, 0)
-        log_dos.info("FGetS(%s,%d) -> '%s'" % (fh, buflen, line))
+        log_dos.info("FGetS(%s,%d) -> '%s'", fh, buflen, line)
         ctx.mem.w_cstr(bufaddr, line)
         if line == "":
             return 0
@@ -1066,6 +1085,56 @@ class DosLibrary(LibImpl):
             self.setioerr(ctx, err)
             return self.DOSFALSE
 
+    def ExAll(self, ctx):
+        lock_b_addr = ctx.cpu.r_reg(REG_D1)
+        buf_ptr = ctx.cpu.r_reg(REG_D2)
+        size = ctx.cpu.r_reg(REG_D3)
+        data_type = ctx.cpu.r_reg(REG_D4)
+        ctrl_ptr = ctx.cpu.r_reg(REG_D5)
+        lock = self.lock_mgr.get_by_b_addr(lock_b_addr)
+        ctrl = AccessStruct(ctx.mem, ExAllControlStruct, struct_addr=ctrl_ptr)
+        if data_type < ED_NAME or data_type > ED_OWNER:
+            log_dos.warning("ExAll: %s invalid data type %d", lock, data_type)
+            self.setioerr(ctx, ERROR_BAD_NUMBER)
+            return self.DOSFALSE
+        # optional pattern parsed with ParsePatternNoCase()
+        pattern = None
+        match_ptr = ctrl.r_s("eac_MatchString")
+        if match_ptr != 0:
+            pattern = Pattern(None, ctx.mem.r_cstr(match_ptr), True, True)
+        if ctrl.r_s("eac_MatchFunc") != 0:
+            log_dos.warning("ExAll: eac_MatchFunc hook is not supported. ignored")
+        last_key = ctrl.r_s("eac_LastKey")
+        num, last_key, err = lock.ex_all(
+            ctx.mem, buf_ptr, size, data_type, last_key, pattern
+        )
+        ctrl.w_s("eac_Entries", num)
+        ctrl.w_s("eac_LastKey", last_key)
+        log_dos.info(
+            "ExAll: %s buf=%06x size=%d type=%d -> entries=%d last_key=%d err=%d",
+            lock,
+            buf_ptr,
+            size,
+            data_type,
+            num,
+            last_key,
+            err,
+        )
+        self.setioerr(ctx, err)
+        if err == NO_ERROR:
+            return self.DOSTRUE
+        else:
+            return self.DOSFALSE
+
+    def ExAllEnd(self, ctx):
+        lock_b_addr = ctx.cpu.r_reg(REG_D1)
+        ctrl_ptr = ctx.cpu.r_reg(REG_D5)
+        lock = self.lock_mgr.get_by_b_addr(lock_b_addr)
+        log_dos.info("ExAllEnd: %s", lock)
+        lock.ex_all_end()
+        ctrl = AccessStruct(ctx.mem, ExAllControlStruct, struct_addr=ctrl_ptr)
+        ctrl.w_s("eac_LastKey", 0)
+
     def ParentDir(self, ctx):
         lock_b_addr = ctx.cpu.r_reg(REG_D1)
         lock = self.lock_mgr.get_by_b_addr(lock_b_addr)
@@ -1733,7 +1802,7 @@ class DosLibrary(LibImpl):
             struct_def = FileHandleStruct
         elif obj_type == 1:  # DOS_EXALLCONTROL
             name = "DOS_EXALLCONTROL"
-            struct_def = None
+            struct_def = ExAllControlStruct
         elif obj_type == 2:  # DOS_FIB
             name = "DOS_FIB"
             struct_def = FileInfoBlockStruct
@@ -1768,6 +1837,8 @@ class DosLibrary(LibImpl):
         if obj_type == 0:
             dos_obj.access.w_s("fh_Pos", 0xFFFFFFFF)
             dos_obj.access.w_s("fh_End", 0xFFFFFFFF)
+        elif obj_type == 1:
+            ctx.mem.clear_block(ptr, ExAllControlStruct.get_size(), 0)
         elif obj_type == 4:
             raise UnsupportedFeatureError("AllocDosObject: DOS_CLI fill TBD")
         return ptr
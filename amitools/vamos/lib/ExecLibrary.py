@@ -18,7 +18,7 @@ from amitools.vamos.error import VamosInternalError, UnsupportedFeatureError
 from .lexec.PortManager import PortManager
 from .lexec.SemaphoreManager import SemaphoreManager
 from .lexec.Pool import Pool
-from .lexec.RawDoFmt import raw_do_fmt
+from .lexec.RawDoFmt import RawDoFmt
 from .lexec import Alloc
 
 
@@ -50,6 +50,10 @@ class ExecLibrary(LibImpl):
         self.port_mgr = PortManager(ctx.alloc)
         self.semaphore_mgr = SemaphoreManager(ctx.alloc, ctx.mem)
         self.mem = ctx.mem
+        self.raw_do_fmt = RawDoFmt(ctx.alloc)
+
+    def finish_lib(self, ctx):
+        self.raw_do_fmt.cleanup()
 
     def set_this_task(self, process):
         self.exec_lib.this_task.aptr = process.this_task.addr
@@ -597,21 +601,17 @@ class ExecLibrary(LibImpl):
             return 0
 
     def CopyMem(self, ctx):
-        source = ctx.cpu.r_reg(REG_A0)
-        dest = ctx.cpu.r_reg(REG_A1)
-        length = ctx.cpu.r_reg(REG_D0)
-        log_exec.info(
-            "CopyMem: source=%06x dest=%06x len=%06x" % (source, dest, length)
-        )
-        ctx.mem.copy_block(source, dest, length)
+        self._copy_mem(ctx, "CopyMem")
 
     def CopyMemQuick(self, ctx):
+        self._copy_mem(ctx, "CopyMemQuick")
+
+    def _copy_mem(self, ctx, name):
         source = ctx.cpu.r_reg(REG_A0)
         dest = ctx.cpu.r_reg(REG_A1)
         length = ctx.cpu.r_reg(REG_D0)
-        log_exec.info(
-            "CopyMemQuick: source=%06x dest=%06x len=%06x" % (source, dest, length)
-        )
+        log_exec.info("%s: source=%06x dest=%06x len=%06x", name, source, dest, length)
+        # copy the whole block in one go. overlapping blocks are moved.
         ctx.mem.copy_block(source, dest, length)
 
     def TypeOfMem(self, ctx):
@@ -631,12 +631,15 @@ class ExecLibrary(LibImpl):
         dataStream = ctx.cpu.r_reg(REG_A1)
         putProc = ctx.cpu.r_reg(REG_A2)
         putData = ctx.cpu.r_reg(REG_A3)
-        dataStream, fmt, resultstr, known = raw_do_fmt(
+        dataStream, fmt, resultstr, known = self.raw_do_fmt.do_fmt(
             ctx, fmtString, dataStream, putProc, putData
         )
         log_exec.info(
-            "RawDoFmt: fmtString=%s -> %s (known=%s, dataStream=%06x)"
-            % (fmt, resultstr, known, dataStream)
+            "RawDoFmt: fmtString=%s -> %s (known=%s, dataStream=%06x)",
+            fmt,
+            resultstr,
+            known,
+            dataStream,
         )
         return dataStream
 
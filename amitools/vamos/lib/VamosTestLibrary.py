@@ -42,11 +42,11 @@ class VamosTestLibrary(LibImpl):
         print("VamosTest: PrintString('%s')" % txt.str)
         return 0
 
-    def Add(self, ctx, a, b):
+    def Add(self, ctx, a, b) -> int:
         """define input values directly as function arguments"""
         return a + b
 
-    def Swap(self, ctx, a, b):
+    def Swap(self, ctx, a, b) -> tuple:
         """define input values directly as function arguments"""
         return b, a
 
@@ -68,16 +68,10 @@ class FileLineCSource(CSource):
         self.fh = fh
 
     def append_line(self):
-        res = []
         if self.fh is not None:
-            while True:
-                ch = self.fh.getc()
-                if ch == -1:
-                    break
-                res.append(ch)
-                if ch == 10:
-                    break
-        line = bytes(res)
+            line = self.fh.getline()
+        else:
+            line = b""
         if self.buf is None:
             self.buf = line
         else:
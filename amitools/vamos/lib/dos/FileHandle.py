@@ -4,10 +4,27 @@ from amitools.vamos.libstructs import FileHandleStruct
 
 
 class FileHandle:
-    """represent an AmigaOS file handle (FH) in vamos"""
+    """represent an AmigaOS file handle (FH) in vamos
+
+    Like the buffered I/O of AmigaDOS, reads are served from a readahead
+    buffer that is filled with larger chunks of the host file and small
+    writes are combined in a write buffer. Handles with auto_flush (the
+    console) write through immediately. Pushed back chars (UnGetC or the
+    command line of a process) are kept separately in unch.
+    """
+
+    # size of readahead and write buffer
+    buf_size = 4096
 
     def __init__(
-        self, obj, ami_path, sys_path, need_close=True, is_nil=False, auto_flush=False
+        self,
+        obj,
+        ami_path,
+        sys_path,
+        need_close=True,
+        is_nil=False,
+        auto_flush=False,
+        buf_size=None,
     ):
         self.obj = obj
         self.name = os.path.basename(sys_path)
@@ -16,10 +33,24 @@ class FileHandle:
         self.b_addr = 0
         self.need_close = need_close
         self.auto_flush = auto_flush
-        # buffering
+        if buf_size is not None:
+            self.buf_size = buf_size
+        self.is_nil = is_nil
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        # pushed back chars
         self.unch = bytearray()
         self.ch = -1
-        self.is_nil = is_nil
+        # readahead and write buffer
+        self.rbuf = b""
+        self.rpos = 0
+        self.wbuf = bytearray()
+
+    def set_obj(self, obj):
+        """use a new host file object and drop all buffered data"""
+        self.obj = obj
+        self._reset_buffers()
 
     def __str__(self):
         return "[FH:'%s'(ami='%s',sys='%s',nc=%s)@%06x=B@%06x]" % (
@@ -32,8 +63,15 @@ class FileHandle:
         )
 
     def close(self):
+        """close the handle. return False if buffered data was not written"""
+        ok = True
+        try:
+            self._flush_wbuf()
+        except IOError:
+            ok = False
         if self.need_close:
             self.obj.close()
+        return ok
 
     def alloc_fh(self, alloc, fs_handler_port):
         name = "File:" + self.name
@@ -53,63 +91,151 @@ class FileHandle:
 
     # --- file ops ---
 
-    def write(self, data):
+    def _fill(self):
+        """refill the readahead buffer and return True if data is available"""
+        if self.wbuf:
+            self._flush_wbuf()
+        obj = self.obj
+        # read1 returns what is available and does not block on a console
+        read1 = getattr(obj, "read1", None)
+        if read1 is not None:
+            data = read1(self.buf_size)
+        else:
+            data = obj.read(self.buf_size)
+        self.rbuf = data
+        self.rpos = 0
+        return len(data) > 0
+
+    def _drop_rbuf(self):
+        """move the file position back to the first unread byte of readahead"""
+        unread = len(self.rbuf) - self.rpos
+        if unread > 0:
+            self.obj.seek(-unread, 1)
+        self.rbuf = b""
+        self.rpos = 0
+
+    def _flush_wbuf(self):
+        wbuf = self.wbuf
+        if wbuf:
+            self.wbuf = bytearray()
+            self.obj.write(wbuf)
+
+    def write(self, data, buffered=True):
+        """write data and return its size or -1 on error.
+
+        Buffered writes are combined and errors may only show on a later
+        flush. Unbuffered writes pass the data directly to the host file.
+        """
         assert isinstance(data, (bytes, bytearray))
         try:
-            self.obj.write(data)
+            # keep file position in sync if we read ahead
+            if self.rpos < len(self.rbuf) and self.obj.seekable():
+                self._drop_rbuf()
             if self.auto_flush:
+                self.obj.write(data)
                 self.obj.flush()
+            elif not buffered:
+                if self.wbuf:
+                    self._flush_wbuf()
+                self.obj.write(data)
+            else:
+                # combine small writes
+                wbuf = self.wbuf
+                wbuf += data
+                if len(wbuf) >= self.buf_size:
+                    self._flush_wbuf()
             return len(data)
         except IOError:
             return -1
 
-    def read(self, len):
+    def read(self, size):
+        # unbuffered read: pushed back chars are not returned
         try:
-            d = self.obj.read(len)
-            return d
+            if self.wbuf:
+                self._flush_wbuf()
+            rbuf = self.rbuf
+            rpos = self.rpos
+            avail = len(rbuf) - rpos
+            if avail <= 0:
+                return self.obj.read(size)
+            if size <= avail:
+                self.rpos = rpos + size
+                return rbuf[rpos : rpos + size]
+            self.rbuf = b""
+            self.rpos = 0
+            return rbuf[rpos:] + self.obj.read(size - avail)
         except IOError:
             return -1
 
     def getc(self):
-        if len(self.unch) > 0:
-            self.ch = self.unch[0]
-            del self.unch[0]
+        unch = self.unch
+        if unch:
+            ch = unch[0]
+            del unch[0]
         else:
-            if self.is_nil:
-                return -1
-            try:
-                d = self.obj.read(1)
-                if d == b"":
+            rpos = self.rpos
+            if rpos >= len(self.rbuf):
+                if self.is_nil:
+                    return -1
+                try:
+                    if not self._fill():
+                        return -1
+                except IOError:
                     return -1
-                self.ch = d[0]
-            except IOError:
-                return -1
-        return self.ch
+                rpos = 0
+            ch = self.rbuf[rpos]
+            self.rpos = rpos + 1
+        self.ch = ch
+        return ch
 
-    def gets(self, len):
+    @staticmethod
+    def _line_end(buf, pos, size):
+        """return end of line in buf starting at pos with at most size bytes"""
+        end = len(buf)
+        if 0 <= size < end - pos:
+            end = pos + size
+        nl = buf.find(b"\n", pos, end)
+        if nl >= 0:
+            return nl + 1
+        return end
+
+    def getline(self, size=-1):
+        """return bytes of the next line including newline.
+
+        At most size bytes are returned if size is not negative.
+        The rest of a longer line is kept for the next call.
+        """
         res = bytearray()
-        ch = -1
-        # print "fgets from %s" % self
-        while len > 0:
-            len -= 1
-            ch = self.getc()
-            if ch < 0:
-                return res.decode("latin-1")
-            res.append(ch)
-            if ch == 10:
-                return res.decode("latin-1")
-        # apparently, python-I/O does not keep the unread
-        # part of a line in a buffer, so we have to (bummer!)
-        # Do that now so that the next read gets the rest
-        # of the line.
-        remains = bytearray()
-        while ch != 10:
-            ch = self.getc()
-            if ch == -1:
-                break
-            remains.append(ch)
-        self.unch = remains + self.unch
-        return res.decode("latin-1")
+        if size == 0:
+            return bytes(res)
+        unch = self.unch
+        if unch:
+            end = self._line_end(unch, 0, size)
+            res += unch[:end]
+            del unch[:end]
+        while not res or (res[-1] != 10 and len(res) != size):
+            rpos = self.rpos
+            rbuf = self.rbuf
+            if rpos >= len(rbuf):
+                if self.is_nil:
+                    break
+                try:
+                    if not self._fill():
+                        break
+                except IOError:
+                    break
+                rpos = 0
+                rbuf = self.rbuf
+            left = -1 if size < 0 else size - len(res)
+            end = self._line_end(rbuf, rpos, left)
+            res += memoryview(rbuf)[rpos:end]
+            self.rpos = end
+        if res:
+            self.ch = res[-1]
+        return bytes(res)
+
+    def gets(self, len):
+        return self.getline(len).decode("latin-1")
 
     def ungetc(self, var):
         if var == 0xFFFFFFFF:
@@ -118,7 +244,12 @@ class FileHandle:
             var = self.ch
             self.ch = -1
         if var >= 0:
-            self.unch.insert(0, var)
+            # step back in readahead if the char was just read from there
+            rpos = self.rpos
+            if not self.unch and rpos > 0 and self.rbuf[rpos - 1] == var:
+                self.rpos = rpos - 1
+            else:
+                self.unch.insert(0, var)
         return var
 
     def ungets(self, s):
@@ -135,15 +266,27 @@ class FileHandle:
         return self.unch
 
     def tell(self):
-        return self.obj.tell()
+        if self.wbuf:
+            self._flush_wbuf()
+        return self.obj.tell() - (len(self.rbuf) - self.rpos)
 
     def seek(self, pos, whence):
         try:
+            if self.wbuf:
+                self._flush_wbuf()
+            # the host file is ahead by the unread part of the buffer
+            if whence == 1:
+                pos -= len(self.rbuf) - self.rpos
             self.obj.seek(pos, whence)
         except IOError:
             return -1
+        # keep the readahead if the seek failed
+        self.rbuf = b""
+        self.rpos = 0
 
     def flush(self):
+        if self.wbuf:
+            self._flush_wbuf()
         self.obj.flush()
 
     def is_interactive(self):
@@ -44,6 +44,12 @@ class FileManager:
         self._register_file(self.std_output)
 
     def finish(self):
+        # write out buffered data of files not closed by the program
+        for fh in self.files_by_b_addr.values():
+            try:
+                fh.flush()
+            except IOError:
+                log_file.warning("flush failed: %s", fh.ami_path)
         self._unregister_file(self.std_input)
         self._unregister_file(self.std_output)
         # free ports
@@ -62,6 +68,11 @@ class FileManager:
             auto_flush=True,
         )
 
+    def rebind_std_files(self):
+        """let std input/output use the current (redirected) sys streams"""
+        self.std_input.set_obj(sys.stdin.buffer)
+        self.std_output.set_obj(sys.stdout.buffer)
+
     def get_fs_handler_port(self):
         return self.fs_handler_port
 
@@ -132,6 +143,8 @@ class FileManager:
                     % (ami_path, sys_path, f_mode)
                 )
                 fobj = open(sys_path, f_mode)
+                if f_mode[0] in "wa":
+                    self.path_mgr.invalidate_sys_path(sys_path)
                 fh = FileHandle(fobj, ami_path, sys_path)
 
             self._register_file(fh)
@@ -144,10 +157,12 @@ class FileManager:
             return None
 
     def close(self, fh):
-        fh.close()
+        """close a file handle. return False if its buffered data was lost"""
+        ok = fh.close()
         # do not unregister stdin/stdout. it will be done in finish()
         if fh not in (self.std_input, self.std_output):
             self._unregister_file(fh)
+        return ok
 
     def get_by_b_addr(self, b_addr, for_writing=None):
         if b_addr == 0:
@@ -175,6 +190,7 @@ class FileManager:
                 os.rmdir(sys_path)
             else:
                 os.remove(sys_path)
+            self.path_mgr.invalidate_sys_path(sys_path)
             return 0
         except OSError as e:
             if e.errno == errno.ENOTEMPTY:  # Directory not empty
@@ -195,6 +211,8 @@ class FileManager:
             return ERROR_OBJECT_NOT_FOUND
         try:
             os.rename(old_sys_path, new_sys_path)
+            self.path_mgr.invalidate_sys_path(old_sys_path)
+            self.path_mgr.invalidate_sys_path(new_sys_path)
             return 0
         except OSError as e:
             log_file.info(
@@ -244,6 +262,7 @@ class FileManager:
         sys_path = self.path_mgr.ami_to_sys_path(lock, ami_path)
         try:
             os.mkdir(sys_path)
+            self.path_mgr.invalidate_sys_path(sys_path)
             return NO_ERROR
         except OSError:
             return ERROR_OBJECT_EXISTS
@@ -290,7 +309,7 @@ class FileManager:
             size = dos_pkt.r_s("dp_Arg3")
             fh = self.get_by_b_addr(fh_b_addr)
             data = self.mem.r_block(buf_ptr, size)
-            fh.write(data)
+            fh.write(data, buffered=False)
             put = len(data)
             log_file.info(
                 "DosPacket: Write fh=%06x buf=%06x len=%06x -> put=%06x fh=%s",
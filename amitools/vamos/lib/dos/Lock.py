@@ -1,5 +1,7 @@
+import functools
 import os
 import stat
+import struct
 import uuid
 
 from amitools.vamos.log import log_lock
@@ -7,9 +9,52 @@ from amitools.vamos.log import log_lock
 from amitools.vamos.astructs import AccessStruct
 from amitools.vamos.libstructs import FileLockStruct, DateStampStruct
 from .DosProtection import DosProtection
+from .PatternMatch import pattern_match
 from .AmiTime import *
 from .Error import *
 
+# ExAll() data types
+ED_NAME = 1
+ED_TYPE = 2
+ED_SIZE = 3
+ED_PROTECTION = 4
+ED_DATE = 5
+ED_COMMENT = 6
+ED_OWNER = 7
+
+# size of ExAllData record up to the field of a data type
+ed_sizes = {
+    ED_NAME: 8,
+    ED_TYPE: 12,
+    ED_SIZE: 16,
+    ED_PROTECTION: 20,
+    ED_DATE: 32,
+    ED_COMMENT: 36,
+    ED_OWNER: 40,
+}
+
+ST_USERDIR = 2
+ST_FILE = -3
+
+
+def _stat_prot(mode):
+    """return Amiga protection mask for a host file mode"""
+    prot = DosProtection(0)
+    if mode & stat.S_IXUSR == 0:
+        prot.clr(DosProtection.FIBF_EXECUTE)
+    if mode & stat.S_IRUSR == 0:
+        prot.clr(DosProtection.FIBF_READ)
+    if mode & stat.S_IWUSR == 0:
+        prot.clr(DosProtection.FIBF_WRITE)
+    return prot
+
+
+def _stat_size(st):
+    """return the size of a file limited to 32 bit or None for dirs"""
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return min(st.st_size, 0xFFFFFFFF)
+
 
 class Lock:
     """represent an AmigaOS Lock in vamos"""
@@ -23,7 +68,9 @@ class Lock:
         self.b_addr = 0
         self.vol_addr = 0
         self.key = 0
+        # dir snapshots of ExNext() and ExAll()
         self.dirent = None
+        self.exall_dirent = None
 
     def __repr__(self):
         addr = 0
@@ -54,7 +101,19 @@ class Lock:
 
     # --- lock ops ---
 
-    def _examine_file(self, fib_mem, name, sys_path, key):
+    def _scan_dir(self):
+        """return a snapshot of the dir entries of the lock.
+
+        The entries of a scandir() pass cache their stat result so the
+        examination of an entry needs at most one system call.
+        """
+        try:
+            with os.scandir(self.sys_path) as it:
+                return list(it)
+        except OSError:
+            return []
+
+    def _examine_file(self, fib_mem, name, stat_func, key):
         # name
         name_addr = fib_mem.s_get_addr("fib_FileName")
         # clear 32 name bytes
@@ -67,67 +126,54 @@ class Lock:
         # create the "inode" information
         fib_mem.w_s("fib_DiskKey", key)
         log_lock.debug("examine key: %08x", key)
+        # a single stat gives all infos
+        try:
+            os_stat = stat_func()
+        except OSError:
+            os_stat = None
         # type
-        if os.path.isdir(sys_path):
-            dirEntryType = 2
+        if os_stat is not None and stat.S_ISDIR(os_stat.st_mode):
+            dirEntryType = ST_USERDIR
         else:
-            dirEntryType = -3
+            dirEntryType = ST_FILE
         fib_mem.w_s("fib_DirEntryType", dirEntryType)
         fib_mem.w_s("fib_EntryType", dirEntryType)
-        # protection
-        prot = DosProtection(0)
-        try:
-            os_stat = os.stat(sys_path)
-            mode = os_stat.st_mode
-            if mode & stat.S_IXUSR == 0:
-                prot.clr(DosProtection.FIBF_EXECUTE)
-            if mode & stat.S_IRUSR == 0:
-                prot.clr(DosProtection.FIBF_READ)
-            if mode & stat.S_IWUSR == 0:
-                prot.clr(DosProtection.FIBF_WRITE)
-            log_lock.debug("examine lock: '%s' mode=%03o: prot=%s", name, mode, prot)
-        except OSError:
+        if os_stat is None:
             return ERROR_OBJECT_IN_USE
+        # protection
+        mode = os_stat.st_mode
+        prot = _stat_prot(mode)
+        log_lock.debug("examine lock: '%s' mode=%03o: prot=%s", name, mode, prot)
         fib_mem.w_s("fib_Protection", prot.mask)
         # size
-        if os.path.isfile(sys_path):
-            size = os.path.getsize(sys_path)
-            # limit to 32bit
-            if size > 0xFFFFFFFF:
-                size = 0xFFFFFFFF
+        size = _stat_size(os_stat)
+        if size is not None:
             fib_mem.w_s("fib_Size", size)
             blocks = (size + 511) // 512
             fib_mem.w_s("fib_NumBlocks", blocks)
-            log_lock.debug(
-                "examine lock: '%s' size=%d, blocks=%d", sys_path, size, blocks
-            )
+            log_lock.debug("examine lock: '%s' size=%d, blocks=%d", name, size, blocks)
         else:
+            fib_mem.w_s("fib_Size", 0)
             fib_mem.w_s("fib_NumBlocks", 1)
-            log_lock.debug("examine lock: '%s' no file", sys_path)
+            log_lock.debug("examine lock: '%s' no file", name)
         # date (use mtime here)
         date_addr = fib_mem.s_get_addr("fib_Date")
         date = AccessStruct(fib_mem.mem, DateStampStruct, date_addr)
-        t = os.path.getmtime(sys_path)
-        at = sys_to_ami_time(t)
-        date.w_s("ds_Days", at.tday)
-        date.w_s("ds_Minute", at.tmin)
-        date.w_s("ds_Tick", at.tick)
+        at = sys_to_ami_time(os_stat.st_mtime)
+        date.w_fields({"ds_Days": at.tday, "ds_Minute": at.tmin, "ds_Tick": at.tick})
         # fill in UID/GID
-        fib_mem.w_s("fib_OwnerUID", 0)
-        fib_mem.w_s("fib_OwnerGID", 0)
+        fib_mem.w_fields({"fib_OwnerUID": 0, "fib_OwnerGID": 0})
         return NO_ERROR
 
     def examine_lock(self, fib_mem):
-        return self._examine_file(fib_mem, self.name, self.sys_path, self.key)
+        stat_func = functools.partial(os.stat, self.sys_path)
+        return self._examine_file(fib_mem, self.name, stat_func, self.key)
 
     def examine_next(self, fib_mem):
         # start scan
         if self.dirent is None:
-            # scan real dir
-            if os.path.isdir(self.sys_path):
-                self.dirent = os.listdir(self.sys_path)
-            else:
-                self.dirent = []
+            # take a snapshot of the real dir
+            self.dirent = self._scan_dir()
             # assume that key stored in given FIB is my own one
             # (otherwise no Examine() on my lock was done before..., aka broken code!)
             self._check_disk_key(fib_mem)
@@ -137,12 +183,100 @@ class Lock:
 
         if index < len(self.dirent):
             entry = self.dirent[index]
-            e_path = os.path.join(self.sys_path, entry)
-            return self._examine_file(fib_mem, entry, e_path, index + 1)
+            return self._examine_file(fib_mem, entry.name, entry.stat, index + 1)
         else:
             self.dirent = None
             return ERROR_NO_MORE_ENTRIES
 
+    def ex_all(self, mem, buf_ptr, size, data_type, last_key, pattern=None):
+        """fill ExAllData records of the dir entries into a buffer.
+
+        last_key is the number of entries already scanned (0 on first call).
+        Entries not matching the optional pattern are skipped.
+
+        Return number of records, new last key and error: NO_ERROR if more
+        entries are left or ERROR_NO_MORE_ENTRIES if the scan is done.
+        """
+        if last_key == 0 or self.exall_dirent is None:
+            self.exall_dirent = self._scan_dir()
+        entries = self.exall_dirent
+        num_entries = len(entries)
+        index = last_key
+        fixed_size = ed_sizes[data_type]
+        with_comment = data_type >= ED_COMMENT
+        # build all records in a host buffer and write it in one go
+        data = bytearray()
+        last_rec = None
+        num = 0
+        while index < num_entries:
+            entry = entries[index]
+            name = entry.name
+            if pattern is not None and not pattern_match(pattern, name):
+                index += 1
+                continue
+            try:
+                os_stat = entry.stat()
+            except OSError:
+                # entry vanished
+                index += 1
+                continue
+            name_data = name.encode("latin-1", "replace") + b"\0"
+            rec_size = fixed_size + len(name_data)
+            if with_comment:
+                rec_size += 1
+            # keep records long aligned
+            rec_size = (rec_size + 3) & ~3
+            offset = len(data)
+            if offset + rec_size > size:
+                break
+            # record
+            rec_addr = buf_ptr + offset
+            name_addr = rec_addr + fixed_size
+            comment_addr = name_addr + len(name_data)
+            mode = os_stat.st_mode
+            if stat.S_ISDIR(mode):
+                ed_type = ST_USERDIR
+            else:
+                ed_type = ST_FILE
+            ed_size = _stat_size(os_stat) or 0
+            at = sys_to_ami_time(os_stat.st_mtime)
+            rec = struct.pack(
+                ">IIiIIIIIIHH",
+                0,
+                name_addr,
+                ed_type,
+                ed_size,
+                _stat_prot(mode).mask,
+                at.tday,
+                at.tmin,
+                at.tick,
+                comment_addr,
+                0,
+                0,
+            )
+            data += rec[:fixed_size]
+            data += name_data
+            # empty comment and padding
+            data += bytes(rec_size - fixed_size - len(name_data))
+            # link previous record
+            if last_rec is not None:
+                struct.pack_into(">I", data, last_rec, rec_addr)
+            last_rec = offset
+            index += 1
+            num += 1
+        if data:
+            mem.w_block(buf_ptr, bytes(data))
+        if index >= num_entries:
+            self.exall_dirent = None
+            return num, index, ERROR_NO_MORE_ENTRIES
+        if num == 0:
+            # buffer too small for a single record
+            return 0, index, ERROR_NO_FREE_STORE
+        return num, index, NO_ERROR
+
+    def ex_all_end(self):
+        self.exall_dirent = None
+
     def _check_disk_key(self, fib_mem):
         # make sure its a dir entry
         dirEntryType = fib_mem.r_s("fib_DirEntryType")
@@ -1,3 +1,6 @@
+import re
+from functools import lru_cache
+
 # pattern match constants
 P_ANY = 0x80
 P_SINGLE = 0x81
@@ -27,6 +30,9 @@ p_txt = {
     P_STOP: "P_STOP",
 }
 
+# number of parsed patterns and compiled matchers kept
+PATTERN_CACHE_SIZE = 256
+
 
 class Pattern:
     def __init__(self, src_str, pat_str, ignore_case, has_wildcard):
@@ -55,8 +61,12 @@ def _pop_non_or(blocks, dst):
             return dst
 
 
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
 def pattern_parse(src_str, ignore_case=True, star_is_wild=False):
-    """tokenize pattern. return tokenized pattern or None if an error occurred"""
+    """tokenize pattern. return tokenized pattern or None if an error occurred
+
+    Results are cached. Do not modify the returned pattern.
+    """
     dst = ""
     n_src = len(src_str)
 
@@ -336,8 +346,8 @@ def _scan_or_block(pat, pat_pos, str_pos, markers):
         pat_pos += 1
 
 
-def pattern_match(pattern, in_str, debug=False):
-    """match pattern pat against str and return True/False"""
+def pattern_interp(pattern, in_str, debug=False):
+    """match pattern pat against str with the interpreter and return True/False"""
     if pattern.ignore_case:
         tr = lambda x: x.lower()
     else:
@@ -572,6 +582,123 @@ def pattern_match(pattern, in_str, debug=False):
                 markers.push(Marker(True, pat_pos, str_pos + 1))
 
 
+# ----- pattern compiler -----
+
+
+def _class_to_regex(pat, pos, negate):
+    """translate class starting after P_CLASS/P_NOTCLASS at pos.
+
+    return regex and position after the closing P_CLASS
+    """
+    n = len(pat)
+    ranges = []
+    while True:
+        cmd = ord(pat[pos])
+        pos += 1
+        if cmd == P_CLASS:
+            break
+        begin = cmd
+        end = cmd
+        # range: the end char is also read as next entry like the interpreter
+        if pat[pos] == "-":
+            pos += 1
+            end = ord(pat[pos])
+            if end == P_CLASS:
+                end = 255
+        if begin <= end:
+            ranges.append("\\U%08x-\\U%08x" % (begin, end))
+    if ranges:
+        return "[%s%s]" % ("^" if negate else "", "".join(ranges)), pos
+    # empty classes match no or any char
+    return "." if negate else "(?!)", pos
+
+
+def pattern_to_regex(pat_str):
+    """translate a tokenized pattern to a regex for re.fullmatch().
+
+    A NOT block is only supported as the last element on the top level and
+    after a prefix of fixed length: the interpreter lets the NOT consume an
+    odd number of chars otherwise. Return None if the pattern can't be
+    translated.
+    """
+    res = []
+    pos = 0
+    depth = 0
+    n = len(pat_str)
+    try:
+        while pos < n:
+            ch = pat_str[pos]
+            cmd = ord(ch)
+            pos += 1
+            if cmd == P_ANY:
+                res.append(".*")
+            elif cmd == P_SINGLE:
+                res.append(".")
+            elif cmd in (P_ORSTART, P_REPBEG):
+                res.append("(?:")
+                depth += 1
+            elif cmd == P_ORNEXT:
+                res.append("|")
+            elif cmd == P_OREND:
+                res.append(")")
+                depth -= 1
+            elif cmd == P_REPEND:
+                res.append(")*")
+                depth -= 1
+            elif cmd == P_NOT:
+                # ~x at the end: rest of string must not match x
+                if depth != 0 or ord(pat_str[-1]) != P_NOTEND:
+                    return None
+                for ch in pat_str[: pos - 1]:
+                    if ord(ch) in (P_ANY, P_ORSTART, P_REPBEG):
+                        return None
+                body = pattern_to_regex(pat_str[pos:-1])
+                if body is None:
+                    return None
+                res.append("(?!(?:%s)\\Z).*" % body)
+                break
+            elif cmd == P_NOTEND:
+                return None
+            elif cmd in (P_CLASS, P_NOTCLASS):
+                regex, pos = _class_to_regex(pat_str, pos, cmd == P_NOTCLASS)
+                res.append(regex)
+            else:
+                res.append(re.escape(ch))
+    except IndexError:
+        return None
+    if depth != 0:
+        return None
+    return "".join(res)
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def pattern_compile(pat_str, ignore_case):
+    """return a function that matches a string against a tokenized pattern.
+
+    Patterns are translated to host regexps. If this is not possible
+    then the interpreter is used.
+    """
+    regex = pattern_to_regex(pat_str)
+    if regex is not None:
+        try:
+            match = re.compile(regex, re.DOTALL).fullmatch
+        except re.error:
+            match = None
+        if match is not None:
+            if ignore_case:
+                return lambda in_str: match(in_str.lower()) is not None
+            return lambda in_str: match(in_str) is not None
+    pattern = Pattern(None, pat_str, ignore_case, True)
+    return lambda in_str: pattern_interp(pattern, in_str)
+
+
+def pattern_match(pattern, in_str, debug=False):
+    """match pattern pat against str and return True/False"""
+    if debug:
+        return pattern_interp(pattern, in_str, debug)
+    return pattern_compile(pattern.pat_str, pattern.ignore_case)(in_str)
+
+
 # ----- test -----
 if __name__ == "__main__":
     import sys
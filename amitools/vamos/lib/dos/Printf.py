@@ -1,8 +1,12 @@
 """Handle printf like Functions including VPrintf and RawDoFmt"""
 
 import re
+import functools
 from amitools.util.Math import *
 
+# number of parsed format strings kept in the cache
+PRINTF_CACHE_SIZE = 256
+
 
 class printf_element:
     def __init__(
@@ -122,6 +126,16 @@ def printf_parse_string(string):
     return printf_state(elements, fragments)
 
 
+@functools.lru_cache(maxsize=PRINTF_CACHE_SIZE)
+def printf_parse_cached(string):
+    """parse a format string and reuse the result for the same string.
+
+    Only the data of the elements is changed by printf_read_data() so the
+    state can be shared by all calls with the same format.
+    """
+    return printf_parse_string(string)
+
+
 def printf_read_data(state, mem_access, data_ptr):
     elements = state.elements
     for e in elements:
@@ -168,23 +182,26 @@ def printf_read_data(state, mem_access, data_ptr):
 
 
 def printf_generate_output(state):
+    # keep state untouched as it may be reused from the cache
     result = []
     pos = 0
     f = state.fragments
+    fi = 0
     for e in state.elements:
         begin = e.begin
         if pos < begin:
-            result.append(f.pop(0))
+            result.append(f[fi])
+            fi += 1
         val = e.gen_value()
         result.append(val)
         pos = e.end
-    if len(f) > 0:
-        result.append(f[0])
+    if fi < len(f):
+        result.append(f[fi])
     return "".join(result)
 
 
 def printf(string, mem_access, data_ptr):
-    ps = printf_parse_string(string)
+    ps = printf_parse_cached(string)
     printf_read_data(ps, mem_access, data_ptr)
     return printf_generate_output(ps)
 
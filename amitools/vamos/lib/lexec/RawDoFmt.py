@@ -15,6 +15,9 @@ from amitools.vamos.lib.dos.Printf import *
 code_hex = (0x243C, 0, 0, 0x49F9, 0, 0, 0x101C, 0x4EB9, 0, 0, 0x51CA, 0xFFF6, 0x4E75)
 code_bin = b"".join([struct.pack(">H", x) for x in code_hex])
 
+# max bytes of output passed to an unknown put proc in one run
+CHUNK_SIZE = 1024
+
 
 def _setup_fragment(ctx, fmt_str, put_proc):
     fmt_len = len(fmt_str)
@@ -32,29 +35,153 @@ def _setup_fragment(ctx, fmt_str, put_proc):
     return mem_obj
 
 
+# ----- known put procs -----
+# each handler does the work of the put proc for all chars of the output
+# (including the trailing NUL) at once
+
+
+def _put_store(mem, put_data, data):
+    """store chars in the buffer given by putData"""
+    mem.w_block(put_data, data)
+
+
+def _put_count(mem, put_data, data):
+    """only count chars in the ULONG at putData"""
+    mem.w32(put_data, (mem.r32(put_data) + len(data)) & 0xFFFFFFFF)
+
+
+def _put_store_ptr(mem, put_data, data):
+    """putData points to the buffer pointer: store chars and advance it"""
+    ptr = mem.r32(put_data)
+    mem.w_block(ptr, data)
+    mem.w32(put_data, (ptr + len(data)) & 0xFFFFFFFF)
+
+
+def _put_store_limit(mem, put_data, data):
+    """putData points to buffer pointer and LONG of chars left.
+    the left count is decremented for every char but only chars with
+    a non-negative count are stored.
+    """
+    ptr = mem.r32(put_data)
+    left = mem.r32s(put_data + 4)
+    num = len(data)
+    if left > 0:
+        n = min(left, num)
+        mem.w_block(ptr, data[:n])
+        mem.w32(put_data, (ptr + n) & 0xFFFFFFFF)
+    mem.w32s(put_data + 4, max(left - num, -0x80000000))
+
+
+def _code(*words):
+    return struct.pack(">%dH" % len(words), *words)
+
+
+# list of (name, code, handler) of common put procs
+put_proc_idioms = [
+    # move.b d0,(a3)+ / rts
+    ("store", _code(0x16C0, 0x4E75), _put_store),
+    # link a5,#-4 / move.l d0,-4(a5) / move.b d0,(a3)+ / unlk a5 / rts (SAS/C)
+    (
+        "store_link",
+        _code(0x4E55, 0xFFFC, 0x2B40, 0xFFFC, 0x16C0, 0x4E5D, 0x4E75),
+        _put_store,
+    ),
+    # link a5,#0 / move.b d0,(a3)+ / unlk a5 / rts (gcc with frame pointer)
+    ("store_frame", _code(0x4E55, 0x0000, 0x16C0, 0x4E5D, 0x4E75), _put_store),
+    # addq.l #1,(a3) / rts
+    ("count", _code(0x5293, 0x4E75), _put_count),
+    # move.l (a3),a0 / move.b d0,(a0)+ / move.l a0,(a3) / rts
+    ("store_ptr", _code(0x2053, 0x10C0, 0x2688, 0x4E75), _put_store_ptr),
+    # subq.l #1,4(a3) / bmi.s +6 / move.l (a3),a0 / move.b d0,(a0)+
+    # move.l a0,(a3) / rts
+    (
+        "store_limit",
+        _code(0x53AB, 0x0004, 0x6B06, 0x2053, 0x10C0, 0x2688, 0x4E75),
+        _put_store_limit,
+    ),
+]
+put_proc_max_code = max(len(x[1]) for x in put_proc_idioms)
+
+
+def find_put_proc(mem, put_proc):
+    """return (name, handler) of a known put proc or None"""
+    code = mem.r_block(put_proc, put_proc_max_code)
+    for name, idiom, handler in put_proc_idioms:
+        if code.startswith(idiom):
+            return name, handler
+
+
+class RawDoFmt:
+    """format strings and pass the result to a put proc.
+
+    Known put procs are replaced by Python handlers. Unknown ones are
+    called from a loop fragment that is reused for all calls and passes
+    up to CHUNK_SIZE chars in a single run of the machine.
+    """
+
+    def __init__(self, alloc, chunk_size=CHUNK_SIZE):
+        self.alloc = alloc
+        self.chunk_size = chunk_size
+        self.frag = None
+        self.busy = False
+
+    def cleanup(self):
+        if self.frag:
+            self.alloc.free_memory(self.frag)
+            self.frag = None
+
+    def do_fmt(self, ctx, fmtString, dataStream, putProc, putData):
+        fmt = ctx.mem.r_cstr(fmtString)
+        ps = printf_parse_cached(fmt)
+        dataStream = printf_read_data(ps, ctx.mem, dataStream)
+        resultstr = printf_generate_output(ps)
+        data = resultstr.encode("latin-1") + b"\0"
+        # Try to use a shortcut to avoid an unnecessary slow-down
+        known = find_put_proc(ctx.mem, putProc)
+        if known:
+            known[1](ctx.mem, putData, data)
+        elif self.busy:
+            # called from a put proc: use a temporary fragment
+            mem_obj = _setup_fragment(ctx, resultstr + "\0", putProc)
+            set_regs = {REG_A2: putProc, REG_A3: putData}
+            ctx.machine.run(mem_obj.addr, set_regs=set_regs, name="RawDoFmt")
+            ctx.alloc.free_memory(mem_obj)
+        else:
+            self.busy = True
+            try:
+                self._run_chunks(ctx, data, putProc, putData)
+            finally:
+                self.busy = False
+        return dataStream, fmt, resultstr, known is not None
+
+    def _run_chunks(self, ctx, data, put_proc, put_data):
+        mem = ctx.mem
+        frag = self.frag
+        if frag is None:
+            size = len(code_bin) + self.chunk_size
+            frag = self.alloc.alloc_memory(size, "RawDoFmtFrag")
+            self.frag = frag
+            mem.w_block(frag.addr, code_bin)
+            mem.w32(frag.addr + 8, frag.addr + 0x1A)
+        addr = frag.addr
+        mem.w32(addr + 16, put_proc)
+        # the put proc may advance A3: keep it for the next chunk
+        set_regs = {REG_A2: put_proc, REG_A3: put_data}
+        get_regs = [REG_A3]
+        chunk_size = self.chunk_size
+        for pos in range(0, len(data), chunk_size):
+            chunk = data[pos : pos + chunk_size]
+            mem.w32(addr + 2, len(chunk) - 1)
+            mem.w_block(addr + 0x1A, chunk)
+            rs = ctx.machine.run(
+                addr, set_regs=set_regs, get_regs=get_regs, name="RawDoFmt"
+            )
+            set_regs[REG_A3] = rs.regs[REG_A3]
+
+
 def raw_do_fmt(ctx, fmtString, dataStream, putProc, putData):
-    fmt = ctx.mem.r_cstr(fmtString)
-    ps = printf_parse_string(fmt)
-    dataStream = printf_read_data(ps, ctx.mem, dataStream)
-    resultstr = printf_generate_output(ps)
-    fmtstr = resultstr + "\0"
-    # Try to use a shortcut to avoid an unnecessary slow-down
-    known = False
-    putcode = ctx.mem.r32(putProc)
-    if putcode == 0x16C04E75:
-        known = True
-    elif putcode == 0x4E55FFFC:  # link #-4,a5
-        putcode2 = ctx.mem.r32(putProc + 4)
-        putcode3 = ctx.mem.r32(putProc + 8)
-        putcode4 = ctx.mem.r16(putProc + 12)
-        if putcode2 == 0x2B40FFFC and putcode3 == 0x16C04E5D and putcode4 == 0x4E75:
-            known = True
-    if known:
-        ctx.mem.w_cstr(putData, fmtstr)
-    else:
-        mem_obj = _setup_fragment(ctx, fmtstr, putProc)
-        set_regs = {REG_A2: putProc, REG_A3: putData}
-        addr = mem_obj.addr
-        ctx.machine.run(addr, set_regs=set_regs, name="RawDoFmt")
-        ctx.alloc.free_memory(mem_obj)
-    return dataStream, fmt, resultstr, known
+    fmt = RawDoFmt(ctx.alloc)
+    try:
+        return fmt.do_fmt(ctx, fmtString, dataStream, putProc, putData)
+    finally:
+        fmt.cleanup()
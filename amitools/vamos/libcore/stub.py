@@ -4,6 +4,9 @@ import traceback
 
 from amitools.vamos.machine.regs import REG_D0, REG_D1, REG_A7
 
+# marker for methods without return annotation
+_NO_RET = object()
+
 
 class LibStub(object):
     """a lib stub is a frontend object instance that wraps all calls into
@@ -58,12 +61,21 @@ class LibStub(object):
 
 class LibStubGen(object):
     """the lib stub generator scans a lib impl and creates stubs for all
-    methods found there"""
+    methods found there
+
+    By default (codegen=True) the stub function of each valid impl method
+    is generated as Python source: the register reads of the arguments are
+    unrolled, the return value handling is selected by the return annotation
+    of the method and profiling is done inline.
+    """
 
-    def __init__(self, log_missing=None, log_valid=None, ignore_invalid=True):
+    def __init__(
+        self, log_missing=None, log_valid=None, ignore_invalid=True, codegen=True
+    ):
         self.log_missing = log_missing
         self.log_valid = log_valid
         self.ignore_invalid = ignore_invalid
+        self.codegen = codegen
 
     def gen_fake_stub(self, name, fd, ctx, profile=None):
         """a fake stub exists without an implementation and only contains
@@ -241,6 +253,68 @@ class LibStubGen(object):
 
         return base_func
 
+    def _gen_code_func(self, fd_func, method, ctx, extra_args, prof=None):
+        """generate the source of a specialized stub function and compile it.
+        if prof is given then the call is profiled, too."""
+        cpu = ctx.cpu
+        env = {
+            "method": method,
+            "ctx": ctx,
+            "cpu": cpu,
+            "mem": ctx.mem,
+            "r_reg": cpu.r_reg,
+            "w_reg": cpu.w_reg,
+            "prof": prof,
+            "perf_counter": time.perf_counter,
+        }
+        # unroll argument fetching
+        call_args = ["ctx"]
+        if extra_args:
+            for num, arg in enumerate(extra_args):
+                if arg.type is int:
+                    call_args.append("r_reg(%d)" % arg.reg)
+                else:
+                    type_name = "arg_type%d" % num
+                    env[type_name] = arg.type
+                    call_args.append(
+                        "%s(cpu=cpu, reg=%d, mem=mem)" % (type_name, arg.reg)
+                    )
+        call = "method(%s)" % ", ".join(call_args)
+
+        lines = ["def stub_func(this, *args, **kwargs):"]
+        if prof:
+            lines.append("    start = perf_counter()")
+        lines.append("    res = " + call)
+        # return handling depends on annotation of method
+        ret_type = getattr(method, "__annotations__", {}).get("return", _NO_RET)
+        if ret_type is None:
+            pass
+        elif ret_type is int:
+            lines.append("    w_reg(%d, res & 0xFFFFFFFF)" % REG_D0)
+        elif ret_type in (list, tuple):
+            lines.append("    w_reg(%d, res[0] & 0xFFFFFFFF)" % REG_D0)
+            lines.append("    w_reg(%d, res[1] & 0xFFFFFFFF)" % REG_D1)
+        else:
+            lines += [
+                "    if res is not None:",
+                "        if type(res) in (list, tuple):",
+                "            w_reg(%d, res[0] & 0xFFFFFFFF)" % REG_D0,
+                "            w_reg(%d, res[1] & 0xFFFFFFFF)" % REG_D1,
+                "        else:",
+                "            w_reg(%d, res & 0xFFFFFFFF)" % REG_D0,
+            ]
+        if prof:
+            lines.append("    prof.count(perf_counter() - start)")
+        lines.append("    return res")
+
+        name = fd_func.get_name()
+        code = compile("\n".join(lines), "<stub %s>" % name, "exec")
+        exec(code, env)
+        func = env["stub_func"]
+        func.__name__ = name
+        func.__qualname__ = name
+        return func
+
     def _gen_log_func(selgf, stub, fd_func, base_func, ctx, log):
         """wrap the base function with logging."""
         name = fd_func.get_name()
@@ -292,13 +366,28 @@ class LibStubGen(object):
         # do we need to read some registers into extra args?
         method = impl_func.method
         extra_args = impl_func.extra_args
+        log = self.log_valid
+
+        # generate specialized code
+        if self.codegen:
+            if log:
+                func = self._gen_code_func(fd_func, method, ctx, extra_args)
+                func = self._gen_log_func(stub, fd_func, func, ctx, log)
+                if profile:
+                    func = self._gen_profile_func(fd_func, profile, func)
+            else:
+                prof = None
+                if profile:
+                    prof = profile.get_func_by_index(fd_func.get_index())
+                func = self._gen_code_func(fd_func, method, ctx, extra_args, prof)
+            return func
+
         if extra_args:
             func = self._gen_base_extra_args_func(method, ctx, extra_args)
         else:
             func = self._gen_base_func(method, ctx)
 
         # wrap around logging method?
-        log = self.log_valid
         if log:
             func = self._gen_log_func(stub, fd_func, func, ctx, log)
 
@@ -12,6 +12,7 @@ from .regs import *
 from .opcodes import *
 from .error import ErrorReporter
 from .cpustate import CPUState
+from .traps import CountingTraps
 from amitools.vamos.error import *
 from amitools.vamos.log import log_machine
 from amitools.vamos.label import LabelManager
@@ -28,11 +29,16 @@ class RunState(object):
         self.cycles = 0
         self.time_delta = 0
         self.regs = None
+        # slice stats
+        self.slices = 0
+        self.trap_slices = 0
+        self.max_slice = 0
 
     def __str__(self):
         return (
             "RunState('%s', pc=%06x,sp=%06x,ret_addr=%06x,error=%s,done=%s,"
-            "cycles=%s,time_delta=%s,regs=%s)"
+            "cycles=%s,time_delta=%s,regs=%s,slices=%s,trap_slices=%s,"
+            "max_slice=%s)"
             % (
                 self.name,
                 self.pc,
@@ -43,6 +49,9 @@ class RunState(object):
                 self.cycles,
                 self.time_delta,
                 self.regs,
+                self.slices,
+                self.trap_slices,
+                self.max_slice,
             )
         )
 
@@ -86,6 +95,8 @@ class Machine(object):
     scratch_begin = 0x600
     quick_trap_begin = 0x500
     quick_trap_num = 128
+    # adaptive slicing: grow slice after this many slices without traps
+    slice_grow_after = 4
 
     def __init__(
         self,
@@ -96,6 +107,8 @@ class Machine(object):
         cycles_per_run=1000,
         max_cycles=0,
         cpu_name=None,
+        slicing="fixed",
+        max_cycles_per_run=256000,
     ):
         if cpu_name is None:
             cpu_name = machine68k.cpu_type_to_str(cpu_type)
@@ -106,6 +119,14 @@ class Machine(object):
         self.cpu = self.machine.cpu
         self.mem = self.machine.mem
         self.traps = self.machine.traps
+        # adaptive slicing needs to know if traps were called in a slice
+        if slicing == "adaptive":
+            self.traps = CountingTraps(self.traps)
+            self.adaptive_slicing = True
+        elif slicing == "fixed":
+            self.adaptive_slicing = False
+        else:
+            raise ValueError("invalid slicing: %s" % slicing)
         # internal state
         if use_labels:
             self.label_mgr = LabelManager()
@@ -117,7 +138,9 @@ class Machine(object):
         self.error_reporter = ErrorReporter(self)
         self.run_states = []
         self.instr_hook = None
+        self.run_hook = None
         self.cycles_per_run = cycles_per_run
+        self.max_cycles_per_run = max(cycles_per_run, max_cycles_per_run)
         self.max_cycles = max_cycles
         self.bail_out = False
         # call init
@@ -151,14 +174,19 @@ class Machine(object):
         ram_size = machine_cfg.ram_size
         cycles_per_run = machine_cfg.cycles_per_run
         max_cycles = machine_cfg.max_cycles
+        slicing = machine_cfg.slicing
+        max_cycles_per_run = machine_cfg.max_cycles_per_run
         log_machine.info(
-            "cpu=%s(%d), ram_size=%d, labels=%s, " "cycles_per_run=%d, max_cycles=%d",
+            "cpu=%s(%d), ram_size=%d, labels=%s, "
+            "cycles_per_run=%d, max_cycles=%d, slicing=%s, max_cycles_per_run=%d",
             cpu_name,
             cpu_type,
             ram_size,
             use_labels,
             cycles_per_run,
             max_cycles,
+            slicing,
+            max_cycles_per_run,
         )
         return cls(
             cpu_type,
@@ -168,6 +196,8 @@ class Machine(object):
             cycles_per_run=cycles_per_run,
             max_cycles=max_cycles,
             cpu_name=cpu_name,
+            slicing=slicing,
+            max_cycles_per_run=max_cycles_per_run,
         )
 
     @classmethod
@@ -314,10 +344,26 @@ class Machine(object):
 
     def set_cycles_per_run(self, num):
         self.cycles_per_run = num
+        if self.max_cycles_per_run < num:
+            self.max_cycles_per_run = num
+
+    def set_adaptive_slicing(self, on):
+        """adaptive slicing can only be enabled if the machine was created
+        with it. It can be disabled to always run slices of cycles_per_run.
+        """
+        if on and not isinstance(self.traps, CountingTraps):
+            raise ValueError("machine was not created with adaptive slicing")
+        self.adaptive_slicing = on
 
     def set_instr_hook(self, func):
         self.cpu.set_instr_hook_callback(func)
 
+    def set_run_hook(self, func):
+        """set a function that is called after each slice of cycles executed
+        in a run with the number of cycles of the slice. e.g. for sampling.
+        """
+        self.run_hook = func
+
     def show_instr(self, show_regs=False):
         if show_regs:
             state = CPUState()
@@ -493,14 +539,57 @@ class Machine(object):
         if not max_cycles:
             max_cycles = self.max_cycles
 
+        # adaptive slicing: start with small slices to stay responsive for
+        # trap heavy code and grow them while the code runs without traps
+        adaptive = self.adaptive_slicing
+        if adaptive:
+            traps = self.traps
+            trap_count = traps.count
+            max_slice = self.max_cycles_per_run
+            grow_after = self.slice_grow_after
+            quiet_slices = 0
+        slice_cycles = cycles_per_run
+        max_slice_used = 0
+        num_slices = 0
+        trap_slices = 0
+        do_debug = log_machine.isEnabledFor(logging.DEBUG)
+
         # main execution loop of run
         total_cycles = 0
+        run_hook = self.run_hook
         start_time = time.perf_counter()
         try:
             while not run_state.done:
-                log_machine.debug("+ cpu.execute")
-                total_cycles += cpu.execute(cycles_per_run)
-                log_machine.debug("- cpu.execute")
+                # do not run past max cycles with large slices
+                if adaptive and max_cycles > 0:
+                    left = max_cycles - total_cycles
+                    if slice_cycles > left:
+                        slice_cycles = left
+                if do_debug:
+                    log_machine.debug("+ cpu.execute(%d)", slice_cycles)
+                cycles = cpu.execute(slice_cycles)
+                if do_debug:
+                    log_machine.debug("- cpu.execute: %d cycles", cycles)
+                total_cycles += cycles
+                num_slices += 1
+                if slice_cycles > max_slice_used:
+                    max_slice_used = slice_cycles
+                if adaptive:
+                    count = traps.count
+                    if count != trap_count:
+                        # python was called: back to small slices
+                        trap_count = count
+                        trap_slices += 1
+                        quiet_slices = 0
+                        slice_cycles = cycles_per_run
+                    else:
+                        quiet_slices += 1
+                        if quiet_slices == grow_after:
+                            quiet_slices = 0
+                            slice_cycles = min(slice_cycles * 2, max_slice)
+                # the cpu is stopped between slices: hook can inspect it
+                if run_hook and not run_state.done:
+                    run_hook(cycles)
                 # end after enough cycles
                 if max_cycles > 0 and total_cycles >= max_cycles:
                     break
@@ -525,6 +614,9 @@ class Machine(object):
         # update run state
         run_state.time_delta = end_time - start_time
         run_state.cycles = total_cycles
+        run_state.slices = num_slices
+        run_state.trap_slices = trap_slices
+        run_state.max_slice = max_slice_used
         # pop
         self.run_states.pop()
 
@@ -2,10 +2,13 @@ from machine68k import CPUType
 from .hwaccess import HWAccess
 from amitools.vamos.log import log_mem_map
 from amitools.vamos.label import LabelRange
-from amitools.vamos.mem import MemoryAlloc
+from amitools.vamos.mem import MemoryAlloc, BinMemoryAlloc
 
 
 class MemoryMap(object):
+    # allocator engines selectable with 'mem_alloc'
+    ALLOC_MAP = {"first_fit": MemoryAlloc, "bins": BinMemoryAlloc}
+
     def __init__(self, machine):
         self.machine = machine
         self.label_mgr = machine.get_label_mgr()
@@ -40,7 +43,8 @@ class MemoryMap(object):
             self.setup_old_dos_guard()
         if not self.validate():
             return False
-        self.setup_ram_allocator()
+        mem_alloc = cfg.get("mem_alloc", "first_fit")
+        self.setup_ram_allocator(mem_alloc)
         return True
 
     def validate(self):
@@ -58,6 +62,7 @@ class MemoryMap(object):
 
     def cleanup(self):
         if self.alloc:
+            self.alloc.dump_stats()
             self.alloc.dump_orphans()
 
     def setup_hw_access(self, mode_str):
@@ -73,12 +78,15 @@ class MemoryMap(object):
             self.label_mgr.add_label(label)
             log_mem_map.info(label)
 
-    def setup_ram_allocator(self):
+    def setup_ram_allocator(self, mem_alloc="first_fit"):
         mem = self.machine.get_mem()
         mem_begin = 0x1000
         mem_size = self.ram_total - mem_begin
-        log_mem_map.info("setup ram allocator: @%06x +%06x", mem_begin, mem_size)
-        self.alloc = MemoryAlloc(mem, mem_begin, mem_size, self.label_mgr)
+        log_mem_map.info(
+            "setup ram allocator: @%06x +%06x (%s)", mem_begin, mem_size, mem_alloc
+        )
+        alloc_cls = self.ALLOC_MAP[mem_alloc]
+        self.alloc = alloc_cls(mem, mem_begin, mem_size, self.label_mgr)
 
     def get_old_dos_guard_base(self):
         return self.dos_guard_base
@@ -0,0 +1,42 @@
+class CountingTraps(object):
+    """wrap the traps API and count the calls of all trap functions.
+
+    The machine uses the count to see if a run slice did call into Python.
+    """
+
+    def __init__(self, traps):
+        self.traps = traps
+        self.count = 0
+        self.funcs = {}
+
+    def setup(self, py_func, auto_rts=False, one_shot=False):
+        """setup trap and return trap id"""
+
+        def count_func(op, pc):
+            self.count += 1
+            return py_func(op, pc)
+
+        tid = self.traps.setup(count_func, auto_rts, one_shot)
+        if tid >= 0:
+            self.funcs[tid] = py_func
+        return tid
+
+    def free(self, tid):
+        self.traps.free(tid)
+        self.funcs.pop(tid, None)
+
+    def get_func(self, tid):
+        func = self.funcs.get(tid)
+        if func is None:
+            func = self.traps.get_func(tid)
+        return func
+
+    def set_exc_func(self, func):
+        self.traps.set_exc_func(func)
+
+    def trigger(self, *args):
+        return self.traps.trigger(*args)
+
+    def cleanup(self):
+        self.funcs = {}
+        self.traps.cleanup()
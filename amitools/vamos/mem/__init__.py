@@ -1,2 +1,3 @@
 from .alloc import MemoryAlloc
+from .binalloc import BinMemoryAlloc
 from .cache import MemoryCache
@@ -63,7 +63,14 @@ class MemoryAlloc:
 
         # init free list
         self.free_bytes = size
-        self.free_first = MemoryChunk(addr, self.free_bytes)
+        self._init_free(addr, size)
+
+        # stats
+        self.peak_used_bytes = 0
+        self.num_allocs = 0
+
+    def _init_free(self, addr, size):
+        self.free_first = MemoryChunk(addr, size)
         self.free_entries = 1
 
     @classmethod
@@ -174,6 +181,94 @@ class MemoryAlloc:
         else:
             return None
 
+    def _alloc_chunk(self, size):
+        """take size bytes from the free list and return addr or None"""
+        # find best free chunk
+        chunk, left = self._find_best_chunk(size)
+        # out of memory?
+        if chunk == None:
+            return None
+        # remove chunk from free list
+        # is something left?
+        addr = chunk.addr
+        if left == 0:
+            self._remove_chunk(chunk)
+        else:
+            left_chunk = MemoryChunk(addr + size, left)
+            self._replace_chunk(chunk, left_chunk)
+        return addr
+
+    def _free_chunk(self, addr, size):
+        """return a chunk to the free list and merge it with its neighbors"""
+        # create a new free chunk
+        chunk = MemoryChunk(addr, size)
+        self._insert_chunk(chunk)
+
+        # try to merge with prev/next
+        prev = chunk.prev
+        if prev != None:
+            new_chunk = self._merge_chunk(prev, chunk)
+            if new_chunk != None:
+                log_mem_alloc.debug(
+                    "merged: %s + this=%s -> %s", prev, chunk, new_chunk
+                )
+                chunk = new_chunk
+        next = chunk.next
+        if next != None:
+            new_chunk = self._merge_chunk(chunk, next)
+            if new_chunk != None:
+                log_mem_alloc.debug(
+                    "merged: this=%s + %s -> %s", chunk, next, new_chunk
+                )
+
+    def _get_free_chunks(self):
+        """return list of (addr, size) of all free chunks sorted by address"""
+        result = []
+        chunk = self.free_first
+        while chunk != None:
+            result.append((chunk.addr, chunk.size))
+            chunk = chunk.next
+        return result
+
+    def get_stats(self):
+        """return a dict with usage and fragmentation statistics.
+        fragmentation is the part of the free memory not in the largest chunk
+        """
+        free = self.free_bytes
+        largest = self.largest_chunk()
+        if free > 0:
+            frag = 1.0 - largest / free
+        else:
+            frag = 0.0
+        return {
+            "total": self.size,
+            "free": free,
+            "used": self.size - free,
+            "peak_used": self.peak_used_bytes,
+            "num_allocs": self.num_allocs,
+            "cur_allocs": len(self.addrs),
+            "free_chunks": self.free_entries,
+            "largest_free": largest,
+            "fragmentation": frag,
+        }
+
+    def dump_stats(self):
+        stats = self.get_stats()
+        log_mem_alloc.info(
+            "stats: used %06x, peak %06x, allocs #%d (now #%d)",
+            stats["used"],
+            stats["peak_used"],
+            stats["num_allocs"],
+            stats["cur_allocs"],
+        )
+        log_mem_alloc.info(
+            "stats: free %06x in #%d chunks, largest %06x, fragmentation %.1f%%",
+            stats["free"],
+            stats["free_chunks"],
+            stats["largest_free"],
+            stats["fragmentation"] * 100.0,
+        )
+
     def _stat_info(self):
         num_allocs = len(self.addrs)
         return "(free %06x #%d) (allocs #%d)" % (
@@ -186,26 +281,23 @@ class MemoryAlloc:
         """allocate memory and return addr or 0 if no more memory"""
         # align size to 4 bytes
         size = (size + 3) & ~3
-        # find best free chunk
-        chunk, left = self._find_best_chunk(size)
+        # take a free chunk
+        addr = self._alloc_chunk(size)
         # out of memory?
-        if chunk == None:
+        if addr == None:
             if except_on_fail:
                 self.dump_orphans()
                 log_mem_alloc.error("[alloc: NO MEMORY for %06x bytes]" % size)
                 raise VamosInternalError("[alloc: NO MEMORY for %06x bytes]" % size)
             return 0
-        # remove chunk from free list
-        # is something left?
-        addr = chunk.addr
-        if left == 0:
-            self._remove_chunk(chunk)
-        else:
-            left_chunk = MemoryChunk(addr + size, left)
-            self._replace_chunk(chunk, left_chunk)
         # add to valid allocs map
         self.addrs[addr] = size
         self.free_bytes -= size
+        # update stats
+        self.num_allocs += 1
+        used = self.size - self.free_bytes
+        if used > self.peak_used_bytes:
+            self.peak_used_bytes = used
         # erase memory
         self.mem.clear_block(addr, size, 0)
         log_mem_alloc.info(
@@ -231,26 +323,8 @@ class MemoryAlloc:
         assert size == real_size
         # remove from valid allocs
         del self.addrs[addr]
-        # create a new free chunk
-        chunk = MemoryChunk(addr, real_size)
-        self._insert_chunk(chunk)
-
-        # try to merge with prev/next
-        prev = chunk.prev
-        if prev != None:
-            new_chunk = self._merge_chunk(prev, chunk)
-            if new_chunk != None:
-                log_mem_alloc.debug(
-                    "merged: %s + this=%s -> %s", prev, chunk, new_chunk
-                )
-                chunk = new_chunk
-        next = chunk.next
-        if next != None:
-            new_chunk = self._merge_chunk(chunk, next)
-            if new_chunk != None:
-                log_mem_alloc.debug(
-                    "merged: this=%s + %s -> %s", chunk, next, new_chunk
-                )
+        # return to free list
+        self._free_chunk(addr, real_size)
 
         # correct free bytes
         self.free_bytes += size
@@ -270,12 +344,10 @@ class MemoryAlloc:
             return None
 
     def dump_mem_state(self):
-        chunk = self.free_first
         num = 0
-        while chunk != None:
-            log_mem_alloc.debug("dump #%02d: %s" % (num, chunk))
+        for addr, size in self._get_free_chunks():
+            log_mem_alloc.debug("dump #%02d: %s" % (num, MemoryChunk(addr, size)))
             num += 1
-            chunk = chunk.next
 
     def _dump_orphan(self, addr, size):
         log_mem_alloc.warning("orphan: [@%06x +%06x %06x]" % (addr, size, addr + size))
@@ -285,22 +357,13 @@ class MemoryAlloc:
                 log_mem_alloc.warning("-> %s", l)
 
     def dump_orphans(self):
-        last = self.free_first
-        # orphan at begin?
-        if last.addr != self.addr:
-            addr = self.addr
-            size = last.addr - addr
-            self._dump_orphan(addr, size)
-        # walk along free list
-        cur = last.next
-        while cur != None:
-            addr = last.addr + last.size
-            size = cur.addr - addr
-            self._dump_orphan(addr, size)
-            last = cur
-            cur = cur.next
+        # walk along free list: all gaps are orphans
+        addr = self.addr
+        for chunk_addr, chunk_size in self._get_free_chunks():
+            if chunk_addr != addr:
+                self._dump_orphan(addr, chunk_addr - addr)
+            addr = chunk_addr + chunk_size
         # orphan at end?
-        addr = last.addr + last.size
         end = self.addr + self.size
         if addr != end:
             self._dump_orphan(addr, end - addr)
@@ -452,17 +515,13 @@ class MemoryAlloc:
 
     def available(self):
         free = 0
-        chunk = self.free_first
-        while chunk != None:
-            free += chunk.size
-            chunk = chunk.next
+        for _, size in self._get_free_chunks():
+            free += size
         return free
 
     def largest_chunk(self):
         largest = 0
-        chunk = self.free_first
-        while chunk != None:
-            if chunk.size > largest:
-                largest = chunk.size
-            chunk = chunk.next
+        for _, size in self._get_free_chunks():
+            if size > largest:
+                largest = size
         return largest
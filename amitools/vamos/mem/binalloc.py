@@ -0,0 +1,128 @@
+from amitools.vamos.log import log_mem_alloc
+from .alloc import MemoryAlloc
+
+
+class BinMemoryAlloc(MemoryAlloc):
+    """a memory allocator that keeps free chunks in size-class bins.
+
+    Each power of two range of chunk sizes is split into SUB_BINS bins. An
+    allocation first looks for a fitting chunk in the bin of its size and
+    then takes any chunk of the next non-empty larger bin. A bit mask of the
+    non-empty bins finds that bin without walking the free list.
+
+    For coalescing the free chunks are indexed by start and end address, so
+    the neighbors of a freed chunk are found directly.
+    """
+
+    SUB_BINS_LOG2 = 2
+    SUB_BINS = 1 << SUB_BINS_LOG2
+    # max chunks checked in the bin of the requested size
+    MAX_BIN_SCAN = 16
+
+    def _init_free(self, addr, size):
+        # free chunks: start addr -> size and end addr -> start addr
+        self.free_starts = {}
+        self.free_ends = {}
+        # bins: each a dict of start addr -> size
+        self.bins = []
+        self.bin_mask = 0
+        self.free_entries = 0
+        self._add_free(addr, size)
+
+    def _bin_index(self, size):
+        """return the size class of a chunk size"""
+        sub_log2 = self.SUB_BINS_LOG2
+        fl = size.bit_length() - 1
+        if fl < sub_log2:
+            return size
+        sl = (size >> (fl - sub_log2)) & (self.SUB_BINS - 1)
+        return ((fl - sub_log2 + 1) << sub_log2) + sl
+
+    def _add_free(self, addr, size):
+        self.free_starts[addr] = size
+        self.free_ends[addr + size] = addr
+        idx = self._bin_index(size)
+        bins = self.bins
+        if idx >= len(bins):
+            bins.extend({} for _ in range(idx + 1 - len(bins)))
+        bins[idx][addr] = size
+        self.bin_mask |= 1 << idx
+        self.free_entries += 1
+
+    def _remove_free(self, addr, size):
+        del self.free_starts[addr]
+        del self.free_ends[addr + size]
+        idx = self._bin_index(size)
+        bin = self.bins[idx]
+        del bin[addr]
+        if not bin:
+            self.bin_mask &= ~(1 << idx)
+        self.free_entries -= 1
+
+    def _find_free(self, size):
+        """return (addr, chunk_size) of a fitting free chunk or None"""
+        idx = self._bin_index(size)
+        # some chunks in my bin may be large enough
+        if self.bin_mask & (1 << idx):
+            num = 0
+            for addr, chunk_size in self.bins[idx].items():
+                if chunk_size >= size:
+                    return addr, chunk_size
+                num += 1
+                if num == self.MAX_BIN_SCAN:
+                    break
+        # all chunks in larger bins fit: take lowest non-empty bin
+        mask = self.bin_mask >> (idx + 1)
+        if mask == 0:
+            return None
+        idx += (mask & -mask).bit_length()
+        return next(iter(self.bins[idx].items()))
+
+    def _alloc_chunk(self, size):
+        res = self._find_free(size)
+        if res is None:
+            return None
+        addr, chunk_size = res
+        self._remove_free(addr, chunk_size)
+        left = chunk_size - size
+        if left > 0:
+            self._add_free(addr + size, left)
+        return addr
+
+    def _free_chunk(self, addr, size):
+        # merge with previous chunk
+        prev_addr = self.free_ends.get(addr)
+        if prev_addr is not None:
+            prev_size = self.free_starts[prev_addr]
+            self._remove_free(prev_addr, prev_size)
+            log_mem_alloc.debug(
+                "merged: @%06x +%06x + this=@%06x +%06x",
+                prev_addr,
+                prev_size,
+                addr,
+                size,
+            )
+            addr = prev_addr
+            size += prev_size
+        # merge with next chunk
+        end = addr + size
+        next_size = self.free_starts.get(end)
+        if next_size is not None:
+            self._remove_free(end, next_size)
+            log_mem_alloc.debug(
+                "merged: this=@%06x +%06x + @%06x +%06x", addr, size, end, next_size
+            )
+            size += next_size
+        self._add_free(addr, size)
+
+    def _get_free_chunks(self):
+        return sorted(self.free_starts.items())
+
+    def available(self):
+        return sum(self.free_starts.values())
+
+    def largest_chunk(self):
+        if self.bin_mask == 0:
+            return 0
+        idx = self.bin_mask.bit_length() - 1
+        return max(self.bins[idx].values())
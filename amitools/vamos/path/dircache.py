@@ -0,0 +1,72 @@
+import os
+import stat
+
+
+class DirCache(object):
+    """cache the case-insensitive name lookup of host directories.
+
+    For each directory a dict maps the lower case names of its entries to
+    the real names. An entry is valid as long as the modification time of
+    the directory is unchanged. vamos drops entries itself when it creates,
+    renames or deletes files. This also covers file systems with coarse
+    time stamps.
+    """
+
+    def __init__(self, max_dirs=4096):
+        self.max_dirs = max_dirs
+        self.dirs = {}
+        # stats
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get_names(self, path):
+        """return dict of lower case name -> real name for a directory.
+
+        Return None if path is not a directory.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not stat.S_ISDIR(st.st_mode):
+            return None
+        mtime = st.st_mtime_ns
+        entry = self.dirs.get(path)
+        if entry is not None:
+            if entry[0] == mtime:
+                self.hits += 1
+                return entry[1]
+            self.stale += 1
+        else:
+            self.misses += 1
+            if len(self.dirs) >= self.max_dirs:
+                # drop the oldest entry
+                del self.dirs[next(iter(self.dirs))]
+        # scan dir after stat so a concurrent change triggers a rescan
+        names = {}
+        try:
+            for name in os.listdir(path):
+                # first name wins if multiple only differ in case
+                names.setdefault(name.lower(), name)
+        except OSError:
+            return None
+        self.dirs[path] = (mtime, names)
+        return names
+
+    def invalidate(self, path):
+        """drop cached listings affected by a change of the given path"""
+        path = path.rstrip(os.sep) or path
+        self.dirs.pop(path, None)
+        self.dirs.pop(os.path.dirname(path), None)
+
+    def clear(self):
+        self.dirs = {}
+
+    def get_stats(self):
+        return {
+            "dirs": len(self.dirs),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+        }
@@ -510,6 +510,10 @@ class PathManager:
         res = self.vol_mgr.ami_to_sys_path(str(ami_path))
         return res
 
+    def invalidate_sys_path(self, sys_path):
+        """tell the path mapping that a sys path was created or removed"""
+        self.vol_mgr.invalidate_sys_path(sys_path)
+
     def from_sys_path(self, sys_path, strict=False):
         """Convert sys path to AmiPath
 
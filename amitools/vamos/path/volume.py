@@ -4,6 +4,7 @@ import shutil
 from amitools.vamos.log import log_path
 import logging
 from .spec import Spec
+from .dircache import DirCache
 
 
 def resolve_sys_path(sys_path):
@@ -141,6 +142,7 @@ class VolumeManager(object):
         self.is_setup = False
         self.vols_by_name = {}
         self.vols_base_dir = vols_base_dir
+        self.dir_cache = DirCache()
 
     def get_num_volumes(self):
         return len(self.volumes)
@@ -181,6 +183,15 @@ class VolumeManager(object):
             log_path.info("cleaning up volume: %s", volume)
             volume.shutdown()
             volume.is_setup = False
+        stats = self.dir_cache.get_stats()
+        log_path.info(
+            "vol: dir cache: %d dirs, %d hits, %d misses, %d stale",
+            stats["dirs"],
+            stats["hits"],
+            stats["misses"],
+            stats["stale"],
+        )
+        self.dir_cache.clear()
 
     def add_volumes(self, volumes):
         if not volumes:
@@ -392,30 +403,29 @@ class VolumeManager(object):
             )
             return None
 
+    def invalidate_sys_path(self, sys_path):
+        """a sys path was created, renamed or deleted: update dir cache"""
+        self.dir_cache.invalidate(sys_path)
+
+    def get_dir_cache_stats(self):
+        return self.dir_cache.get_stats()
+
     def _follow_path_no_case(self, base, dirs, fast):
-        # base is the name (no more dirs)
-        if len(dirs) == 0:
+        get_names = self.dir_cache.get_names
+        for i, d in enumerate(dirs):
+            # base must be a dir. otherwise assume remainder is new
+            names = get_names(base)
+            if names is None:
+                break
+            # check for no case variant
+            name = names.get(d.lower())
+            if name is None:
+                break
+            # fast mode keeps the original case on a case insensitive fs
+            if fast and name != d and os.path.exists(os.path.join(base, d)):
+                name = d
+            base = os.path.join(base, name)
+        else:
             return base
-        # make sure base is a dir
-        if not os.path.isdir(base):
-            # assume remainder is new
-            return os.path.join(base, os.path.join(*dirs))
-        # dir component to search
-        d = dirs[0]
-        # check for direct match first
-        if fast:
-            dp = os.path.join(base, d)
-            if os.path.exists(dp):
-                return self._follow_path_no_case(dp, dirs[1:], fast)
-        # read dir and check for no case variant
-        dlow = d.lower()
-        files = os.listdir(base)
-        dl = len(d)
-        for f in files:
-            if len(f) == dl:
-                flow = f.lower()
-                if flow == dlow:
-                    res = os.path.join(base, f)
-                    return self._follow_path_no_case(res, dirs[1:], fast)
         # can't find it -> we assume rest of path is new
-        return os.path.join(base, os.path.join(*dirs))
+        return os.path.join(base, *dirs[i:])
@@ -1,3 +1,4 @@
 from .main import MainProfiler
 from .profiler import Profiler
 from .data import ProfDataFile
+from .cpu import CPUProfiler
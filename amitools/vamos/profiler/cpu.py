@@ -0,0 +1,313 @@
+import struct
+from bisect import bisect_right
+from amitools.vamos.log import log_prof
+from amitools.vamos.label import LabelSegment
+from amitools.vamos.machine.regs import REG_A7
+from amitools.vamos.cfgcore import ConfigDict
+from .profiler import Profiler
+
+
+def _to_str(name):
+    if isinstance(name, bytes):
+        return name.decode("latin-1")
+    return name
+
+
+class SegmentSymbols(object):
+    """find the symbol and source line covering an offset in a segment.
+
+    Symbols and debug lines of a bin image segment only mark the start of a
+    function or line. Keep them sorted to find the last one before an offset.
+    """
+
+    def __init__(self, segment):
+        syms = []
+        symtab = segment.get_symtab()
+        if symtab is not None:
+            for sym in symtab.get_symbols():
+                syms.append((sym.get_offset(), _to_str(sym.get_name())))
+        syms.sort(key=lambda x: x[0])
+        self.sym_offsets = [x[0] for x in syms]
+        self.sym_names = [x[1] for x in syms]
+
+        lines = []
+        debug_line = segment.get_debug_line()
+        if debug_line is not None:
+            for df in debug_line.get_files():
+                src_file = _to_str(df.get_src_file())
+                for e in df.get_entries():
+                    src = "%s:%d" % (src_file, e.get_src_line())
+                    lines.append((e.get_offset(), src))
+        lines.sort(key=lambda x: x[0])
+        self.line_offsets = [x[0] for x in lines]
+        self.line_srcs = [x[1] for x in lines]
+
+    def find_symbol(self, offset):
+        pos = bisect_right(self.sym_offsets, offset) - 1
+        if pos >= 0:
+            return self.sym_names[pos]
+
+    def find_src(self, offset):
+        pos = bisect_right(self.line_offsets, offset) - 1
+        if pos >= 0:
+            return self.line_srcs[pos]
+
+
+class CPUProfiler(Profiler):
+    """sample the m68k code executed by the CPU.
+
+    The machine calls the profiler after each slice of cycles it executed.
+    Then the PC is taken as a sample weighted by the cycles of the slice.
+    So the emulation runs at full speed and only pays a small cost per
+    slice. The interval sets the cycles of a slice and thus the sample rate.
+
+    Each sample is mapped with the labels to a function: the symbol of a
+    loaded segment or the label name if no symbols are available. The source
+    line is taken from the debug info of the segment.
+
+    Callers are found by scanning the stack for return addresses: a long
+    word that points into a label right after a JSR or BSR instruction. This
+    is a heuristic that works without frame pointers but may add stale
+    return addresses found in uninitialized locals.
+
+    Results are kept as cycles per call stack and source line. The dump
+    shows a flat profile and collapsed stacks can be written for flame
+    graph tools.
+    """
+
+    name = "cpu"
+    # bytes of the stack scanned for return addresses
+    STACK_SCAN = 1024
+    # entries shown in dump
+    DUMP_NUM = 30
+
+    def __init__(self, machine, interval=10000, depth=16, collapsed=None):
+        self.machine = machine
+        self.interval = interval
+        self.depth = depth
+        self.collapsed = collapsed
+        # sample state
+        self.stacks = {}
+        self.lines = {}
+        self.num_samples = 0
+        self.total_cycles = 0
+        # resolve caches
+        self.label_cache = {}
+        self.seg_syms = {}
+
+    def get_name(self):
+        return self.name
+
+    def parse_config(self, cfg):
+        if not cfg:
+            return True
+        if cfg.interval < 0 or cfg.depth < 0:
+            log_prof.error("cpu: invalid interval or depth!")
+            return False
+        self.interval = cfg.interval
+        self.depth = cfg.depth
+        self.collapsed = cfg.collapsed
+        return True
+
+    def set_data(self, data_dict):
+        for stack, cycles in data_dict.stacks.items():
+            self.stacks[stack] = self.stacks.get(stack, 0) + cycles
+        for src, cycles in data_dict.lines.items():
+            self.lines[src] = self.lines.get(src, 0) + cycles
+        self.num_samples += data_dict.samples
+        self.total_cycles += data_dict.cycles
+        return True
+
+    def get_data(self):
+        return ConfigDict(
+            {
+                "stacks": dict(self.stacks),
+                "lines": dict(self.lines),
+                "samples": self.num_samples,
+                "cycles": self.total_cycles,
+            }
+        )
+
+    def setup(self):
+        machine = self.machine
+        self.cpu = machine.get_cpu()
+        self.mem = machine.get_mem()
+        self.label_mgr = machine.get_label_mgr()
+        self.ram_begin = machine.get_ram_begin()
+        self.ram_end = machine.get_ram_total()
+        if self.label_mgr is None:
+            log_prof.warning("cpu: no labels available. only addresses sampled")
+        if self.interval > 0:
+            # samples are taken after slices of the interval
+            machine.set_cycles_per_run(self.interval)
+            machine.set_adaptive_slicing(False)
+        machine.set_run_hook(self.sample)
+        log_prof.debug(
+            "cpu: interval=%d, depth=%d, collapsed=%s",
+            machine.cycles_per_run,
+            self.depth,
+            self.collapsed,
+        )
+
+    def shutdown(self):
+        self.machine.set_run_hook(None)
+        if self.collapsed:
+            self.write_collapsed(self.collapsed)
+
+    # ----- sampling -----
+
+    def sample(self, cycles):
+        """run hook of the machine: take a sample at the current PC"""
+        pc = self.cpu.r_pc()
+        func, src = self._get_frame(pc)
+        if self.depth > 0:
+            stack = self._get_callers()
+            stack.append(func)
+            key = ";".join(stack)
+        else:
+            key = func
+        stacks = self.stacks
+        stacks[key] = stacks.get(key, 0) + cycles
+        if src is not None:
+            lines = self.lines
+            lines[src] = lines.get(src, 0) + cycles
+        self.num_samples += 1
+        self.total_cycles += cycles
+
+    def _get_frame(self, addr):
+        """return function name and source line (or None) of an address"""
+        label_mgr = self.label_mgr
+        if label_mgr is None:
+            return "%06x" % addr, None
+        label = label_mgr.get_label(addr)
+        if label is None:
+            return "[unknown]", None
+        # labels are replaced on reuse of memory so cache per label
+        cache = self.label_cache.get(label)
+        if cache is None:
+            cache = {}
+            self.label_cache[label] = cache
+        frame = cache.get(addr)
+        if frame is None:
+            frame = self._resolve_frame(label, addr)
+            cache[addr] = frame
+        return frame
+
+    def _resolve_frame(self, label, addr):
+        if not isinstance(label, LabelSegment):
+            return label.name, None
+        segment = label.segment
+        syms = self.seg_syms.get(segment)
+        if syms is None:
+            syms = SegmentSymbols(segment)
+            self.seg_syms[segment] = syms
+        # real start of code in segment
+        offset = addr - label.addr - 8
+        sym = syms.find_symbol(offset)
+        src = syms.find_src(offset)
+        if sym is None:
+            sym = label.name
+        return sym, src
+
+    def _get_callers(self):
+        """scan the stack and return the functions of callers, outer first"""
+        sp = self.cpu.r_reg(REG_A7)
+        end = min(sp + self.STACK_SCAN, self.ram_end)
+        size = (end - sp) & ~3
+        if size < 4:
+            return []
+        data = self.mem.r_block(sp, size)
+        # return addresses are word aligned: check both long word phases
+        ram_begin = self.ram_begin
+        ram_end = self.ram_end
+        num = size // 4
+        cands = []
+        for phase in (0, 2):
+            vals = struct.unpack_from(">%dI" % (num - phase // 2), data, phase)
+            cands += [
+                (off, val)
+                for off, val in zip(range(phase, size, 4), vals)
+                if ram_begin <= val < ram_end and not val & 1
+            ]
+        cands.sort()
+        callers = []
+        depth = self.depth
+        for _, addr in cands:
+            if self._is_return_addr(addr):
+                func, _ = self._get_frame(addr)
+                callers.append(func)
+                if len(callers) == depth:
+                    break
+        callers.reverse()
+        return callers
+
+    def _is_return_addr(self, addr):
+        """is there a JSR or BSR right before the given address?"""
+        if addr < self.ram_begin + 6:
+            return False
+        r16 = self.mem.r16
+        # jsr (an) or bsr.b
+        w = r16(addr - 2)
+        if 0x4E90 <= w <= 0x4E97:
+            found = True
+        elif w & 0xFF00 == 0x6100 and w & 0xFF not in (0, 0xFF):
+            found = True
+        else:
+            # jsr d16(an), d8(an,xn), abs.w, d16(pc), d8(pc,xn) or bsr.w
+            w = r16(addr - 4)
+            if w == 0x6100 or (0x4EA8 <= w <= 0x4EBB and w != 0x4EB9):
+                found = True
+            else:
+                # jsr abs.l or bsr.l
+                w = r16(addr - 6)
+                found = w == 0x4EB9 or w == 0x61FF
+        # the caller must be known code
+        if found and self.label_mgr is not None:
+            return self.label_mgr.get_label(addr) is not None
+        return found
+
+    # ----- results -----
+
+    def get_func_cycles(self):
+        """return dict of func name -> (self cycles, total cycles)"""
+        funcs = {}
+        for stack, cycles in self.stacks.items():
+            frames = stack.split(";")
+            leaf = frames[-1]
+            for func in set(frames):
+                self_cycles, total_cycles = funcs.get(func, (0, 0))
+                if func == leaf:
+                    self_cycles += cycles
+                funcs[func] = (self_cycles, total_cycles + cycles)
+        return funcs
+
+    def write_collapsed(self, path):
+        """write stacks in the collapsed format of flame graph tools"""
+        log_prof.debug("cpu: writing collapsed stacks to '%s'", path)
+        with open(path, "w") as fh:
+            for stack in sorted(self.stacks):
+                fh.write("%s %d\n" % (stack, self.stacks[stack]))
+
+    def dump(self, write):
+        total = self.total_cycles
+        write("%d samples, %d cycles" % (self.num_samples, total))
+        if total == 0:
+            return
+        funcs = self.get_func_cycles()
+        write("   self%    total%        cycles  function")
+        entries = sorted(funcs.items(), key=lambda x: x[1], reverse=True)
+        for func, (self_cycles, total_cycles) in entries[: self.DUMP_NUM]:
+            write(
+                "%7.2f%%  %7.2f%%  %12d  %s"
+                % (
+                    self_cycles * 100.0 / total,
+                    total_cycles * 100.0 / total,
+                    self_cycles,
+                    func,
+                )
+            )
+        if self.lines:
+            write("   self%        cycles  source line")
+            entries = sorted(self.lines.items(), key=lambda x: x[1], reverse=True)
+            for src, cycles in entries[: self.DUMP_NUM]:
+                write("%7.2f%%  %12d  %s" % (cycles * 100.0 / total, cycles, src))
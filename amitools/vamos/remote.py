@@ -0,0 +1,130 @@
+"""talk to a vamos server over a local Unix socket.
+
+Every message is a JSON object prefixed with its size as a 32 bit big endian
+value. A run request passes the std file descriptors of the client along
+with the message, so the output of the Amiga process is written directly to
+the client's stdout and stderr.
+
+This module is used by the thin client and must not import the emulator.
+"""
+
+import os
+import array
+import json
+import socket
+import struct
+
+# up to 3 file descriptors (stdin, stdout, stderr) are passed
+MAX_FDS = 3
+MAX_MSG_SIZE = 16 * 1024 * 1024
+
+
+class RemoteError(Exception):
+    pass
+
+
+class ConnectError(OSError):
+    """no server is reachable at the socket path"""
+
+    pass
+
+
+def get_default_socket_path():
+    path = os.environ.get("VAMOS_SOCKET")
+    if path:
+        return path
+    return os.path.expanduser("~/.vamos/vamosd.sock")
+
+
+def send_msg(sock, msg, fds=None):
+    data = json.dumps(msg).encode("utf-8")
+    data = struct.pack(">I", len(data)) + data
+    if fds:
+        # pass the fds as SCM_RIGHTS ancillary data of the first chunk
+        anc = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))]
+        n = sock.sendmsg([data], anc)
+        data = data[n:]
+    if data:
+        sock.sendall(data)
+
+
+def _recv_fds(sock, size, fds):
+    fd_array = array.array("i")
+    anc_size = socket.CMSG_LEN(MAX_FDS * fd_array.itemsize)
+    data, anc, _, _ = sock.recvmsg(size, anc_size)
+    for level, kind, anc_data in anc:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            num = len(anc_data) - len(anc_data) % fd_array.itemsize
+            fd_array.frombytes(anc_data[:num])
+    fds += fd_array
+    return data
+
+
+def _recv_exact(sock, size, fds=None):
+    buf = bytearray()
+    while len(buf) < size:
+        if fds is not None:
+            data = _recv_fds(sock, size - len(buf), fds)
+        else:
+            data = sock.recv(size - len(buf))
+        if not data:
+            raise RemoteError("connection closed")
+        buf += data
+    return bytes(buf)
+
+
+def recv_msg(sock, fds=None):
+    """receive a message. passed file descriptors are added to fds"""
+    hdr = _recv_exact(sock, 4, fds)
+    (size,) = struct.unpack(">I", hdr)
+    if size > MAX_MSG_SIZE:
+        raise RemoteError("message too large: %d" % size)
+    data = _recv_exact(sock, size, fds)
+    msg = json.loads(data.decode("utf-8"))
+    if not isinstance(msg, dict):
+        raise RemoteError("invalid message")
+    return msg
+
+
+def connect(socket_path=None):
+    if socket_path is None:
+        socket_path = get_default_socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError as e:
+        sock.close()
+        raise ConnectError(e.errno, e.strerror, socket_path)
+    return sock
+
+
+def run_remote(args, socket_path=None, cwd=None, env=None):
+    """run a vamos command line on the server.
+
+    The current dir and environment of the caller are used unless given.
+    Returns the exit code. Raises ConnectError if no server is reachable.
+    """
+    if cwd is None:
+        cwd = os.getcwd()
+    if env is None:
+        env = dict(os.environ)
+    msg = {"cmd": "run", "args": list(args), "cwd": cwd, "env": env}
+    with connect(socket_path) as sock:
+        send_msg(sock, msg, [0, 1, 2])
+        reply = recv_msg(sock)
+    if "error" in reply:
+        raise RemoteError(reply["error"])
+    return reply["exit_code"]
+
+
+def stop_server(socket_path=None):
+    """ask the server to quit"""
+    with connect(socket_path) as sock:
+        send_msg(sock, {"cmd": "quit"})
+        return recv_msg(sock)
+
+
+def get_server_stats(socket_path=None):
+    with connect(socket_path) as sock:
+        send_msg(sock, {"cmd": "stats"})
+        return recv_msg(sock)
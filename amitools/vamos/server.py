@@ -0,0 +1,143 @@
+import os
+import sys
+import socket
+
+from .log import log_main
+from .remote import send_msg, recv_msg, get_default_socket_path, RemoteError
+from .warmstart import WarmStart
+
+
+class VamosServer:
+    """a long-lived vamos that runs command lines sent by clients.
+
+    The server listens on a local Unix socket and handles one request after
+    the other. A run request carries a vamos command line, the current dir
+    and environment of the client and its std file descriptors. Each command
+    runs as a fresh process forked from a booted session (see WarmStart), so
+    the machine starts in the same state for every command.
+    """
+
+    def __init__(self, socket_path=None, cfg_files=None):
+        if socket_path is None:
+            socket_path = get_default_socket_path()
+        self.socket_path = socket_path
+        # config files relative to the client's current dir are allowed
+        self.cfg_files = cfg_files
+        self.warm_start = WarmStart()
+        self.sock = None
+        self.stay = False
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        path = self.socket_path
+        dir_name = os.path.dirname(path)
+        if dir_name and not os.path.isdir(dir_name):
+            os.makedirs(dir_name)
+        # remove stale socket of a previous server
+        if os.path.exists(path):
+            os.remove(path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        sock.listen()
+        self.sock = sock
+        log_main.info("vamos server: listening on '%s'", path)
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+        self.warm_start.shutdown()
+
+    def serve(self):
+        """handle requests until a client sends quit"""
+        self.stay = True
+        while self.stay:
+            conn, _ = self.sock.accept()
+            with conn:
+                self.handle(conn)
+
+    def handle(self, conn):
+        fds = []
+        try:
+            msg = recv_msg(conn, fds)
+            cmd = msg.get("cmd")
+            if cmd == "run":
+                try:
+                    reply = self._run(msg, fds)
+                except OSError as e:
+                    reply = {"error": str(e)}
+            elif cmd == "stats":
+                reply = self.warm_start.get_stats()
+            elif cmd == "quit":
+                self.stay = False
+                reply = {}
+            else:
+                reply = {"error": "invalid command: %s" % cmd}
+            send_msg(conn, reply)
+        except (OSError, ValueError, RemoteError) as e:
+            log_main.error("vamos server: request failed: %s", e)
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def _get_cfg_files(self, cwd):
+        if self.cfg_files is not None:
+            return self.cfg_files
+        # same as vamos tool
+        return (os.path.join(cwd, ".vamosrc"), os.path.expanduser("~/.vamosrc"))
+
+    def _redirect_std_fds(self, fds):
+        """redirect the std fds and return the old ones"""
+        sys.stdout.flush()
+        sys.stderr.flush()
+        old_fds = [os.dup(i) for i in range(3)]
+        for i, fd in enumerate(fds):
+            os.dup2(fd, i)
+        return old_fds
+
+    def _restore_std_fds(self, old_fds):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for i, fd in enumerate(old_fds):
+            os.dup2(fd, i)
+            os.close(fd)
+
+    def _run(self, msg, fds):
+        args = msg.get("args")
+        cwd = msg.get("cwd")
+        env = msg.get("env")
+        if not isinstance(args, list) or len(fds) != 3:
+            return {"error": "invalid run request"}
+
+        # run in the dir, environment and with the std files of the client.
+        # config errors and help are shown to the client, too.
+        old_cwd = os.getcwd()
+        old_env = None
+        old_fds = self._redirect_std_fds(fds)
+        try:
+            if cwd:
+                os.chdir(cwd)
+            if env is not None:
+                old_env = dict(os.environ)
+                os.environ.clear()
+                os.environ.update(env)
+            cfg_files = self._get_cfg_files(os.getcwd())
+            exit_code = self.warm_start.run(cfg_files, args=args)
+        except SystemExit as e:
+            # argparse exits after showing help
+            exit_code = e.code if isinstance(e.code, int) else 1
+        finally:
+            if old_env is not None:
+                os.environ.clear()
+                os.environ.update(old_env)
+            os.chdir(old_cwd)
+            self._restore_std_fds(old_fds)
+        return {"exit_code": exit_code}
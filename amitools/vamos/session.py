@@ -0,0 +1,168 @@
+from .machine import Machine, MemoryMap
+from .machine.regs import REG_D0
+from .log import log_main
+from .path import VamosPathManager
+from .trace import TraceManager
+from .libmgr import SetupLibManager
+from .schedule import Scheduler
+from .profiler import MainProfiler, CPUProfiler
+from .lib.dos.Process import Process
+
+
+class VamosSession:
+    """a booted vamos machine.
+
+    boot() sets up the machine, memory map, paths and opens the base libs.
+    Afterwards the main process given in the config can be run on it.
+    Finally, shutdown the libs, paths and the machine in this order.
+    """
+
+    def __init__(self, mp):
+        self.mp = mp
+        self.main_profiler = None
+        self.machine = None
+        self.mem_map = None
+        self.trace_mgr = None
+        self.path_mgr = None
+        self.scheduler = None
+        self.slm = None
+
+    def boot(self):
+        """setup the session. return False on config errors"""
+        mp = self.mp
+
+        # setup main profiler
+        main_profiler = MainProfiler()
+        prof_cfg = mp.get_profile_dict().profile
+        main_profiler.parse_config(prof_cfg)
+        self.main_profiler = main_profiler
+
+        # setup machine
+        machine_cfg = mp.get_machine_dict().machine
+        use_labels = mp.get_trace_dict().trace.labels
+        # the cpu profiler maps samples with labels
+        use_cpu_profiler = prof_cfg.enabled and prof_cfg.cpu.enabled
+        if use_cpu_profiler:
+            use_labels = True
+        machine = Machine.from_cfg(machine_cfg, use_labels)
+        if not machine:
+            return False
+        self.machine = machine
+
+        # setup cpu profiler
+        if use_cpu_profiler:
+            main_profiler.add_profiler(CPUProfiler(machine))
+
+        # setup memory map
+        mem_map_cfg = mp.get_machine_dict().memmap
+        mem_map = MemoryMap(machine)
+        if not mem_map.parse_config(mem_map_cfg):
+            log_main.error("memory map setup failed!")
+            return False
+        self.mem_map = mem_map
+
+        # setup trace manager
+        trace_mgr_cfg = mp.get_trace_dict().trace
+        trace_mgr = TraceManager(machine)
+        if not trace_mgr.parse_config(trace_mgr_cfg):
+            log_main.error("tracing setup failed!")
+            return False
+        self.trace_mgr = trace_mgr
+
+        # setup path manager
+        path_mgr = VamosPathManager()
+        self.path_mgr = path_mgr
+        if not path_mgr.parse_config(mp.get_path_dict()):
+            log_main.error("path config failed!")
+            return False
+        if not path_mgr.setup():
+            log_main.error("path setup failed!")
+            return False
+
+        # setup scheduler
+        scheduler = Scheduler(machine)
+        self.scheduler = scheduler
+
+        # setup lib mgr
+        lib_cfg = mp.get_libs_dict()
+        slm = SetupLibManager(
+            machine, mem_map, scheduler, path_mgr, main_profiler=main_profiler
+        )
+        if not slm.parse_config(lib_cfg):
+            log_main.error("lib manager setup failed!")
+            return False
+        slm.setup()
+        self.slm = slm
+
+        # setup profiler
+        main_profiler.setup()
+
+        # open base libs
+        slm.open_base_libs()
+        return True
+
+    def rebind_std_files(self):
+        """let the std files of dos use the current sys streams"""
+        self.slm.dos_ctx.dos_lib.file_mgr.rebind_std_files()
+
+    def run(self):
+        """run the main process.
+
+        return (ok, exit_code) or None if the process setup failed.
+        """
+        machine_cfg = self.mp.get_machine_dict().machine
+
+        # setup main proc
+        proc_cfg = self.mp.get_proc_dict().process
+        main_proc = Process.create_main_proc(proc_cfg, self.path_mgr, self.slm.dos_ctx)
+        if not main_proc:
+            log_main.error("main proc setup failed!")
+            return None
+
+        # main loop
+        task = main_proc.get_task()
+        self.scheduler.add_task(task)
+        self.scheduler.schedule()
+
+        # check proc result
+        ok = False
+        run_state = task.get_run_state()
+        if run_state.done:
+            if run_state.error:
+                log_main.error("vamos failed!")
+                exit_code = 1
+            else:
+                ok = True
+                # return code is limited to 0-255
+                exit_code = run_state.regs[REG_D0] & 0xFF
+                log_main.info("done. exit code=%d", exit_code)
+                log_main.info("total cycles: %d", run_state.cycles)
+        else:
+            log_main.info(
+                "vamos was stopped after %d cycles. ignoring result",
+                machine_cfg.max_cycles,
+            )
+            exit_code = 0
+
+        # shutdown main proc
+        if ok:
+            main_proc.free()
+
+        return ok, exit_code
+
+    def shutdown_libs(self):
+        self.slm.close_base_libs()
+        self.main_profiler.shutdown()
+        self.slm.cleanup()
+
+    def shutdown_paths(self):
+        # always shutdown path manager to ensure that
+        # external resources are cleaned up properly
+        if self.path_mgr:
+            self.path_mgr.shutdown()
+
+    def shutdown_machine(self, ok):
+        # mem_map and machine shutdown
+        if ok:
+            self.mem_map.cleanup()
+        self.machine.cleanup()
@@ -0,0 +1,165 @@
+import os
+import sys
+import hashlib
+
+from .cfg import VamosMainParser
+from .log import log_main, log_setup, log_help
+from .session import VamosSession
+from .main import main, RET_CODE_CONFIG_ERROR
+
+
+def config_hash(mp):
+    """return a hash of all config options that define a booted session.
+
+    The process options are excluded as they only affect a single run.
+    Relative host paths depend on the current directory so it is included.
+    """
+    cfgs = (
+        mp.get_log_dict(),
+        mp.get_path_dict(),
+        mp.get_libs_dict(),
+        mp.get_trace_dict(),
+        mp.get_machine_dict(),
+        mp.get_profile_dict(),
+    )
+    h = hashlib.sha1()
+    h.update(os.getcwd().encode("utf-8"))
+    for cfg in cfgs:
+        h.update(repr(cfg).encode("utf-8"))
+    return h.hexdigest()
+
+
+class WarmStart:
+    """run vamos processes from the state of an already booted session.
+
+    Booting a session (machine, memory map, paths and base libs) is done
+    only once per config hash. Each run forks the booted process and runs
+    the main process in the child. The fork keeps a copy on write snapshot
+    of the whole state: RAM, CPU context, allocator, labels and all library,
+    lock and file managers. So every run starts from the same post-boot
+    state and changes of a run never reach the session.
+
+    The CPU emulation is global in a process so only a single session is
+    kept. A run with another config hash replaces it. Only the state of host
+    volumes is shared between runs. Platforms without fork() always perform
+    a cold start with main().
+    """
+
+    def __init__(self):
+        self.session = None
+        self.session_key = None
+        self.num_boots = 0
+        self.num_runs = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    @staticmethod
+    def is_available():
+        return hasattr(os, "fork")
+
+    def get_stats(self):
+        return {"boots": self.num_boots, "runs": self.num_runs}
+
+    def run(self, cfg_files=None, args=None, cfg_dict=None):
+        """run a process like main() but start from a booted session.
+
+        return the exit code of the process.
+        """
+        if not self.is_available():
+            return main(cfg_files, args, cfg_dict)
+
+        # --- parse config ---
+        mp = VamosMainParser()
+        if not mp.parse(cfg_files, args, cfg_dict):
+            return RET_CODE_CONFIG_ERROR
+
+        key = config_hash(mp)
+        if key != self.session_key:
+            self.shutdown()
+            session = self._boot(mp)
+            if session is None:
+                return RET_CODE_CONFIG_ERROR
+            self.session = session
+            self.session_key = key
+        else:
+            # use the process options of this run
+            self.session.mp = mp
+
+        self.num_runs += 1
+        return self._fork_run(self.session)
+
+    def shutdown(self):
+        """shutdown the booted session"""
+        session = self.session
+        if session is None:
+            return
+        self.session = None
+        self.session_key = None
+        try:
+            session.shutdown_libs()
+        finally:
+            session.shutdown_paths()
+        session.shutdown_machine(True)
+
+    def _boot(self, mp):
+        # --- init logging ---
+        log_cfg = mp.get_log_dict().logging
+        if not log_setup(log_cfg):
+            log_help()
+            return None
+
+        session = VamosSession(mp)
+        try:
+            ok = session.boot()
+        except:
+            session.shutdown_paths()
+            raise
+        if not ok:
+            session.shutdown_paths()
+            return None
+        self.num_boots += 1
+        log_main.info("warm start: booted session")
+        return session
+
+    def _fork_run(self, session):
+        # make sure no buffered output is written twice
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # exit codes may exceed 8 bits so pass them in a pipe
+        rfd, wfd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # child: run process on the snapshot of the session
+            os.close(rfd)
+            exit_code = 1
+            try:
+                session.rebind_std_files()
+                res = session.run()
+                if res is None:
+                    exit_code = RET_CODE_CONFIG_ERROR
+                else:
+                    ok, exit_code = res
+                    session.shutdown_libs()
+                    # the host paths are owned by the booted session
+                    session.shutdown_machine(ok)
+                    log_main.info("vamos is exiting: code=%d", exit_code)
+            except BaseException as e:
+                log_main.error("warm start run failed: %s", e)
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os.write(wfd, b"%d" % exit_code)
+                os._exit(0)
+        # parent: wait for child
+        os.close(wfd)
+        with os.fdopen(rfd, "rb") as fh:
+            data = fh.read()
+        _, status = os.waitpid(pid, 0)
+        if not data:
+            log_main.error("warm start run was terminated: status=%d", status)
+            return 1
+        return int(data)
@@ -0,0 +1,69 @@
+import pytest
+from amitools.vamos.machine import Machine
+from amitools.vamos.astructs import AccessStruct
+from amitools.vamos.libstructs import FileInfoBlockStruct, DateStampStruct
+
+FIB_ADDR = 0x1000
+FIELDS = ["fib_DiskKey", "fib_DirEntryType", "fib_Protection", "fib_Size"]
+
+
+@pytest.fixture
+def mem():
+    machine = Machine()
+    yield machine.get_mem()
+    machine.cleanup()
+
+
+def astructs_access_r_s_benchmark(benchmark, mem):
+    def read():
+        fib = AccessStruct(mem, FileInfoBlockStruct, FIB_ADDR)
+        return [fib.r_s(name) for name in FIELDS]
+
+    benchmark(read)
+
+
+def astructs_access_w_s_benchmark(benchmark, mem):
+    def write():
+        fib = AccessStruct(mem, FileInfoBlockStruct, FIB_ADDR)
+        for name in FIELDS:
+            fib.w_s(name, 42)
+
+    benchmark(write)
+
+
+def astructs_access_field_ref_benchmark(benchmark, mem):
+    """reference: read fields via struct instance"""
+
+    def read():
+        fib = FileInfoBlockStruct(mem, FIB_ADDR)
+        return [fib.get(name).get() for name in FIELDS]
+
+    benchmark(read)
+
+
+def astructs_access_accessor_benchmark(benchmark, mem):
+    accs = [FileInfoBlockStruct.get_accessor(name) for name in FIELDS]
+
+    def read():
+        return [acc.read(mem, FIB_ADDR) for acc in accs]
+
+    benchmark(read)
+
+
+def astructs_access_field_group_benchmark(benchmark, mem):
+    group = FileInfoBlockStruct.get_field_group(*FIELDS)
+    benchmark(group.read, mem, FIB_ADDR)
+
+
+@pytest.mark.parametrize("bulk", [False, True])
+def astructs_access_datestamp_write_benchmark(benchmark, mem, bulk):
+    def write():
+        ds = AccessStruct(mem, DateStampStruct, FIB_ADDR)
+        if bulk:
+            ds.w_fields({"ds_Days": 1, "ds_Minute": 2, "ds_Tick": 3})
+        else:
+            ds.w_s("ds_Days", 1)
+            ds.w_s("ds_Minute", 2)
+            ds.w_s("ds_Tick", 3)
+
+    benchmark(write)
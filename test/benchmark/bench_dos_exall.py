@@ -0,0 +1,53 @@
+import pytest
+from amitools.vamos.machine import MockMachine
+from amitools.vamos.astructs import AccessStruct
+from amitools.vamos.libstructs import FileInfoBlockStruct
+from amitools.vamos.lib.dos.Lock import Lock, ED_DATE
+from amitools.vamos.lib.dos.Error import NO_ERROR, ERROR_NO_MORE_ENTRIES
+
+NUM_ENTRIES = 50000
+BUF_SIZE = 8192
+
+
+@pytest.fixture(scope="module")
+def big_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("big_dir")
+    for i in range(NUM_ENTRIES):
+        open(str(path / ("file%05d.o" % i)), "w").close()
+    return str(path)
+
+
+def _ex_all(lock, mem):
+    last_key = 0
+    total = 0
+    while True:
+        num, last_key, err = lock.ex_all(mem, 0x1000, BUF_SIZE, ED_DATE, last_key)
+        total += num
+        if err != NO_ERROR:
+            assert err == ERROR_NO_MORE_ENTRIES
+            return total
+
+
+def _ex_next(lock, fib):
+    assert lock.examine_lock(fib) == NO_ERROR
+    total = 0
+    while lock.examine_next(fib) == NO_ERROR:
+        total += 1
+    return total
+
+
+def dos_exall_benchmark(benchmark, big_dir):
+    lock = Lock("big", "big:", big_dir)
+    mem = MockMachine().get_mem()
+    total = benchmark.pedantic(_ex_all, args=(lock, mem), rounds=3)
+    assert total == NUM_ENTRIES
+    benchmark.extra_info["entries/s"] = int(total / benchmark.stats.stats.mean)
+
+
+def dos_exnext_benchmark(benchmark, big_dir):
+    lock = Lock("big", "big:", big_dir)
+    mem = MockMachine().get_mem()
+    fib = AccessStruct(mem, FileInfoBlockStruct, 0x1000)
+    total = benchmark.pedantic(_ex_next, args=(lock, fib), rounds=3)
+    assert total == NUM_ENTRIES
+    benchmark.extra_info["entries/s"] = int(total / benchmark.stats.stats.mean)
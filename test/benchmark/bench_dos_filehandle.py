@@ -0,0 +1,43 @@
+import io
+from amitools.vamos.lib.dos.FileHandle import FileHandle
+
+LINES = 1000
+TEXT = b"".join(
+    b"line %d of the text read by the benchmark\n" % i for i in range(LINES)
+)
+
+
+def _create_fh(obj, **kwargs):
+    return FileHandle(obj, "bench", "/bench", need_close=False, **kwargs)
+
+
+def dos_filehandle_getc_benchmark(benchmark):
+    def run():
+        fh = _create_fh(io.BytesIO(TEXT))
+        getc = fh.getc
+        while getc() != -1:
+            pass
+
+    benchmark(run)
+
+
+def dos_filehandle_getline_benchmark(benchmark):
+    def run():
+        fh = _create_fh(io.BytesIO(TEXT))
+        while fh.gets(256):
+            pass
+
+    benchmark(run)
+
+
+def dos_filehandle_putc_benchmark(benchmark):
+    data = [bytes((ch,)) for ch in TEXT[:10000]]
+
+    def run():
+        fh = _create_fh(io.BytesIO())
+        write = fh.write
+        for ch in data:
+            write(ch)
+        fh.flush()
+
+    benchmark(run)
@@ -0,0 +1,25 @@
+import pytest
+from amitools.vamos.lib.dos.PatternMatch import (
+    pattern_parse,
+    pattern_match,
+    pattern_interp,
+)
+
+NAMES = ["file%d.%s" % (i, ext) for i in range(100) for ext in ("c", "h", "o")]
+PATTERNS = ["#?.o", "file(1|2)#?.(c|h)", "~(#?.info)"]
+
+
+def _match_all(match, pat):
+    return sum(1 for name in NAMES if match(pat, name))
+
+
+@pytest.mark.parametrize("src", PATTERNS)
+def dos_pattern_interp_benchmark(benchmark, src):
+    pat = pattern_parse(src)
+    benchmark(_match_all, pattern_interp, pat)
+
+
+@pytest.mark.parametrize("src", PATTERNS)
+def dos_pattern_match_benchmark(benchmark, src):
+    pat = pattern_parse(src)
+    assert benchmark(_match_all, pattern_match, pat) == _match_all(pattern_interp, pat)
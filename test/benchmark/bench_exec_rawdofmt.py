@@ -0,0 +1,62 @@
+import pytest
+from amitools.vamos.machine import Machine
+from amitools.vamos.mem import MemoryAlloc
+from amitools.vamos.libcore import LibCtx
+from amitools.vamos.lib.lexec.RawDoFmt import RawDoFmt, raw_do_fmt
+
+PROC_ADDR = 0x1000
+FMT_ADDR = 0x1100
+ARGS_ADDR = 0x1200
+BUF_ADDR = 0x2000
+
+# move.b d0,(a3)+ / rts with and without a nop in front
+PUT_PROCS = {
+    "known": b"\x16\xc0\x4e\x75",
+    "unknown": b"\x4e\x71\x16\xc0\x4e\x75",
+}
+
+
+def _setup(put_proc):
+    machine = Machine()
+    ctx = LibCtx(machine)
+    ctx.alloc = MemoryAlloc.for_machine(machine)
+    mem = ctx.mem
+    mem.w_block(PROC_ADDR, PUT_PROCS[put_proc])
+    mem.w_cstr(FMT_ADDR, "%s: line %ld of %ld (%lx)\n")
+    mem.w32(ARGS_ADDR, 0x1180)
+    mem.w_cstr(0x1180, "bench")
+    mem.w32(ARGS_ADDR + 4, 23)
+    mem.w32(ARGS_ADDR + 8, 42)
+    mem.w32(ARGS_ADDR + 12, 0xDEADBEEF)
+    return ctx
+
+
+def _bench_in_trap(benchmark, ctx, func):
+    """run the benchmark from a trap so put procs run as nested runs"""
+    machine = ctx.machine
+    addr = machine.setup_quick_trap(lambda op, pc: benchmark(func))
+    rs = machine.run(addr, machine.get_scratch_top())
+    assert rs.error is None
+    machine.cleanup()
+
+
+@pytest.mark.parametrize("put_proc", sorted(PUT_PROCS))
+def exec_rawdofmt_benchmark(benchmark, put_proc):
+    ctx = _setup(put_proc)
+    rdf = RawDoFmt(ctx.alloc)
+    _bench_in_trap(
+        benchmark,
+        ctx,
+        lambda: rdf.do_fmt(ctx, FMT_ADDR, ARGS_ADDR, PROC_ADDR, BUF_ADDR),
+    )
+    rdf.cleanup()
+
+
+def exec_rawdofmt_one_shot_benchmark(benchmark):
+    """reference: setup a fragment for every call"""
+    ctx = _setup("unknown")
+    _bench_in_trap(
+        benchmark,
+        ctx,
+        lambda: raw_do_fmt(ctx, FMT_ADDR, ARGS_ADDR, PROC_ADDR, BUF_ADDR),
+    )
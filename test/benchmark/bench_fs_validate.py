@@ -0,0 +1,43 @@
+import pytest
+from amitools.fs.blkdev.ADFBlockDevice import ADFBlockDevice
+from amitools.fs.ADFSVolume import ADFSVolume
+from amitools.fs.FSString import FSString
+from amitools.fs import DosType
+from amitools.fs.validate.Validator import Validator
+from amitools.fs.validate.BlockScan import BlockScan
+from amitools.fs.validate.Log import Log
+
+
+@pytest.fixture
+def blkdev(tmpdir):
+    blkdev = ADFBlockDevice(str(tmpdir / "bench.adf"))
+    blkdev.create()
+    vol = ADFSVolume(blkdev)
+    vol.create(FSString("bench"))
+    for i in range(20):
+        vol.write_file(bytes(range(256)) * 20, FSString("file%d" % i))
+    vol.close()
+    yield blkdev
+    blkdev.close()
+
+
+def fs_validate_scan_blocks_benchmark(benchmark, blkdev):
+    def scan():
+        bs = BlockScan(blkdev, Log(Log.WARN), DosType.DOS0)
+        bs.scan_blocks()
+        return bs
+
+    benchmark(scan)
+
+
+def fs_validate_full_benchmark(benchmark, blkdev):
+    def validate():
+        v = Validator(blkdev, min_level=Log.WARN)
+        v.scan_boot()
+        v.scan_root()
+        v.scan_dir_tree()
+        v.scan_files()
+        v.scan_bitmap()
+        return v.get_summary()
+
+    assert benchmark(validate) == (0, 0)
@@ -0,0 +1,93 @@
+import random
+import pytest
+
+from amitools.vamos.label import LabelManager, LabelRange
+
+NUM_LABELS = 10000
+LABEL_SIZE = 0x40
+
+
+class LinkedLabelManager:
+    """the former doubly linked list label manager for comparison"""
+
+    def __init__(self):
+        self.first = None
+        self.last = None
+
+    def add_label(self, range):
+        range.prev = self.last
+        range.next = None
+        if self.last == None:
+            self.first = range
+        else:
+            self.last.next = range
+        self.last = range
+
+    def get_label(self, addr):
+        r = self.first
+        while r != None:
+            if r.addr <= addr and addr < r.end:
+                return r
+            r = r.next
+        return None
+
+    def get_intersecting_labels(self, addr, size):
+        result = []
+        r = self.first
+        while r != None:
+            if r.does_intersect(addr, size):
+                result.append(r)
+            r = r.next
+        return result
+
+
+def _create_mgr(mgr_type):
+    lm = mgr_type()
+    addrs = list(range(0x1000, 0x1000 + NUM_LABELS * LABEL_SIZE, LABEL_SIZE))
+    # labels are added in allocation order which is not sorted
+    random.Random(1).shuffle(addrs)
+    for addr in addrs:
+        lm.add_label(LabelRange("label", addr, LABEL_SIZE - 4))
+    return lm
+
+
+def _lookup_addrs():
+    rnd = random.Random(2)
+    end = 0x1000 + NUM_LABELS * LABEL_SIZE
+    return [rnd.randrange(0x1000, end) for _ in range(100)]
+
+
+@pytest.mark.parametrize("mgr_type", [LabelManager, LinkedLabelManager])
+def label_mgr_get_label_benchmark(benchmark, mgr_type):
+    lm = _create_mgr(mgr_type)
+    addrs = _lookup_addrs()
+
+    def lookup():
+        for addr in addrs:
+            lm.get_label(addr)
+
+    benchmark(lookup)
+
+
+@pytest.mark.parametrize("mgr_type", [LabelManager, LinkedLabelManager])
+def label_mgr_intersect_benchmark(benchmark, mgr_type):
+    lm = _create_mgr(mgr_type)
+    addrs = _lookup_addrs()
+
+    def intersect():
+        for addr in addrs:
+            lm.get_intersecting_labels(addr, 0x100)
+
+    benchmark(intersect)
+
+
+def label_mgr_add_remove_benchmark(benchmark):
+    lm = _create_mgr(LabelManager)
+    label = LabelRange("tmp", 0x1000 + NUM_LABELS * LABEL_SIZE // 2 + 8, 4)
+
+    def add_remove():
+        lm.add_label(label)
+        lm.get_label(label.addr)
+        lm.remove_label(label)
+
+    benchmark(add_remove)
@@ -0,0 +1,115 @@
+import io
+import pytest
+from amitools.vamos.machine import Machine
+from amitools.vamos.machine.regs import *
+from amitools.vamos.libcore import LibCtx
+from amitools.vamos.lib.ExecLibrary import ExecLibrary
+from amitools.vamos.lib.DosLibrary import DosLibrary
+from amitools.vamos.lib.dos.FileHandle import FileHandle
+
+SIZES = [256, 64 * 1024]
+
+
+class FileMgrMock:
+    def __init__(self, fh):
+        self.fh = fh
+
+    def get_by_b_addr(self, b_addr, for_writing=None):
+        return self.fh
+
+
+def _set_mb_per_s(benchmark, size):
+    mean = benchmark.stats.stats.mean
+    benchmark.extra_info["MB/s"] = round(size / mean / 1e6, 1)
+
+
+def _setup_dos(machine, obj):
+    ctx = LibCtx(machine)
+    dos = DosLibrary()
+    dos.file_mgr = FileMgrMock(FileHandle(obj, "bench", "/bench", need_close=False))
+    return ctx, dos
+
+
+@pytest.mark.parametrize("size", SIZES)
+def lib_blockio_copymem_benchmark(benchmark, size):
+    machine = Machine()
+    ctx = LibCtx(machine)
+    cpu = ctx.cpu
+    cpu.w_reg(REG_A0, 0x10000)
+    cpu.w_reg(REG_A1, 0x40000)
+    cpu.w_reg(REG_D0, size)
+    benchmark(ExecLibrary().CopyMem, ctx)
+    _set_mb_per_s(benchmark, size)
+    machine.cleanup()
+
+
+@pytest.mark.parametrize("size", SIZES)
+def lib_blockio_copy_loop_benchmark(benchmark, size):
+    """reference: copy long words in python"""
+    machine = Machine()
+    mem = machine.get_mem()
+
+    def copy_loop():
+        src = 0x10000
+        dst = 0x40000
+        for off in range(0, size, 4):
+            mem.w32(dst + off, mem.r32(src + off))
+
+    benchmark(copy_loop)
+    _set_mb_per_s(benchmark, size)
+    machine.cleanup()
+
+
+@pytest.mark.parametrize("size", SIZES)
+def lib_blockio_read_benchmark(benchmark, size):
+    machine = Machine()
+    obj = io.BytesIO(bytes(size))
+    ctx, dos = _setup_dos(machine, obj)
+    cpu = ctx.cpu
+    cpu.w_reg(REG_D2, 0x10000)
+    cpu.w_reg(REG_D3, size)
+
+    def read():
+        obj.seek(0)
+        dos.Read(ctx)
+
+    benchmark(read)
+    _set_mb_per_s(benchmark, size)
+    machine.cleanup()
+
+
+@pytest.mark.parametrize("size", SIZES)
+def lib_blockio_write_benchmark(benchmark, size):
+    machine = Machine()
+    obj = io.BytesIO()
+    ctx, dos = _setup_dos(machine, obj)
+    cpu = ctx.cpu
+    cpu.w_reg(REG_D2, 0x10000)
+    cpu.w_reg(REG_D3, size)
+
+    def write():
+        obj.seek(0)
+        dos.Write(ctx)
+
+    benchmark(write)
+    _set_mb_per_s(benchmark, size)
+    machine.cleanup()
+
+
+@pytest.mark.parametrize("size", SIZES)
+def lib_blockio_fread_benchmark(benchmark, size):
+    machine = Machine()
+    obj = io.BytesIO(bytes(size))
+    ctx, dos = _setup_dos(machine, obj)
+    cpu = ctx.cpu
+    cpu.w_reg(REG_D2, 0x10000)
+    cpu.w_reg(REG_D3, 4)
+    cpu.w_reg(REG_D4, size // 4)
+
+    def fread():
+        obj.seek(0)
+        dos.FRead(ctx)
+
+    benchmark(fread)
+    _set_mb_per_s(benchmark, size)
+    machine.cleanup()
@@ -13,7 +13,7 @@ def _create_ctx():
     return LibCtx(machine)
 
 
-def _create_stub(do_profile=False, do_log=False):
+def _create_stub(do_profile=False, do_log=False, codegen=True):
     name = "vamostest.library"
     impl = VamosTestLibrary()
     fd = read_lib_fd(name)
@@ -31,7 +31,7 @@ def _create_stub(do_profile=False, do_log=False):
         log_missing = None
         log_valid = None
     # create stub
-    gen = LibStubGen(log_missing=log_missing, log_valid=log_valid)
+    gen = LibStubGen(log_missing=log_missing, log_valid=log_valid, codegen=codegen)
     stub = gen.gen_stub(scan, ctx, profile)
     return stub
 
@@ -54,3 +54,21 @@ def libcore_stub_log_benchmark(benchmark):
 def libcore_stub_log_profile_benchmark(benchmark):
     stub = _create_stub(do_profile=True, do_log=True)
     benchmark(stub.PrintHello)
+
+
+@pytest.mark.parametrize("codegen", [True, False], ids=["codegen", "closure"])
+def libcore_stub_gen_benchmark(benchmark, codegen):
+    stub = _create_stub(codegen=codegen)
+    benchmark(stub.PrintHello)
+
+
+@pytest.mark.parametrize("codegen", [True, False], ids=["codegen", "closure"])
+def libcore_stub_gen_args_benchmark(benchmark, codegen):
+    stub = _create_stub(codegen=codegen)
+    benchmark(stub.Add)
+
+
+@pytest.mark.parametrize("codegen", [True, False], ids=["codegen", "closure"])
+def libcore_stub_gen_profile_args_benchmark(benchmark, codegen):
+    stub = _create_stub(do_profile=True, codegen=codegen)
+    benchmark(stub.Swap)
@@ -0,0 +1,41 @@
+import pytest
+from machine68k import CPUType
+from amitools.vamos.machine import Machine
+from amitools.vamos.machine.opcodes import op_rts
+
+
+def _create_machine(slicing, with_trap):
+    m = Machine(CPUType.M68000, raise_on_main_run=False, slicing=slicing)
+    mem = m.get_mem()
+    code = m.get_ram_begin()
+    # move.l #loops,d0 / [jsr trap.w] / subq.l #1,d0 / bne.s / rts
+    mem.w16(code, 0x203C)
+    addr = code + 6
+    if with_trap:
+        mem.w32(code + 2, 1000)
+        trap_addr = m.setup_quick_trap(lambda op, pc: None)
+        mem.w16(addr, 0x4EB8)
+        mem.w16(addr + 2, trap_addr)
+        addr += 4
+    else:
+        mem.w32(code + 2, 100000)
+    mem.w16(addr, 0x5380)
+    mem.w16(addr + 2, 0x6600 | ((code + 6 - addr - 4) & 0xFF))
+    mem.w16(addr + 4, op_rts)
+    return m, code
+
+
+@pytest.mark.parametrize("slicing", ["fixed", "adaptive"])
+def machine_run_cpu_benchmark(benchmark, slicing):
+    m, code = _create_machine(slicing, False)
+    stack = m.get_scratch_top()
+    benchmark(m.run, code, stack)
+    m.cleanup()
+
+
+@pytest.mark.parametrize("slicing", ["fixed", "adaptive"])
+def machine_run_trap_benchmark(benchmark, slicing):
+    m, code = _create_machine(slicing, True)
+    stack = m.get_scratch_top()
+    benchmark(m.run, code, stack)
+    m.cleanup()
@@ -0,0 +1,29 @@
+import random
+import pytest
+
+from amitools.vamos.machine import MockMemory
+from amitools.vamos.mem import MemoryAlloc, BinMemoryAlloc
+
+
+def _fragment(alloc, num=5000):
+    # allocate many small blocks and free every second to fragment memory
+    rnd = random.Random(5)
+    addrs = []
+    for _ in range(num):
+        size = rnd.randrange(8, 256, 4)
+        addrs.append((alloc.alloc_mem(size), size))
+    for addr, size in addrs[::2]:
+        alloc.free_mem(addr, size)
+
+
+@pytest.mark.parametrize("alloc_type", [MemoryAlloc, BinMemoryAlloc])
+def mem_alloc_fragmented_benchmark(benchmark, alloc_type):
+    mem = MockMemory(size_kib=4096)
+    alloc = alloc_type(mem, addr=0x1000, size=0x3FF000)
+    _fragment(alloc)
+
+    def alloc_free():
+        addr = alloc.alloc_mem(512)
+        alloc.free_mem(addr, 512)
+
+    benchmark(alloc_free)
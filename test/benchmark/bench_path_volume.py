@@ -0,0 +1,14 @@
+from amitools.vamos.path import VolumeManager
+
+NUM_FILES = 200
+
+
+def path_volume_ami_to_sys_benchmark(benchmark, tmpdir):
+    inc = tmpdir.mkdir("Work").mkdir("Include").mkdir("Exec")
+    for i in range(NUM_FILES):
+        inc.join("File%d.h" % i).write("")
+    v = VolumeManager()
+    assert v.add_volume("work:" + str(tmpdir))
+    a2s = v.ami_to_sys_path
+    result = benchmark(a2s, "work:work/include/exec/file99.h")
+    assert result == str(inc.join("File99.h"))
@@ -0,0 +1,49 @@
+from machine68k import CPUType
+from amitools.vamos.machine import Machine
+from amitools.vamos.machine.opcodes import op_rts
+from amitools.vamos.profiler import CPUProfiler
+
+
+def _create_machine():
+    m = Machine(CPUType.M68000, raise_on_main_run=False)
+    mem = m.get_mem()
+    code = m.get_ram_begin()
+    # main: bsr.w func / rts
+    mem.w16(code, 0x6100)
+    mem.w16(code + 2, 0x0E)
+    mem.w16(code + 4, op_rts)
+    # func: move.l #100000,d0 / subq.l #1,d0 / bne.s -4 / rts
+    mem.w16(code + 0x10, 0x203C)
+    mem.w32(code + 0x12, 100000)
+    mem.w16(code + 0x16, 0x5380)
+    mem.w16(code + 0x18, 0x66FC)
+    mem.w16(code + 0x1A, op_rts)
+    return m, code
+
+
+def _run(benchmark, prof=None):
+    m, code = _create_machine()
+    if prof:
+        prof.machine = m
+        prof.setup()
+    stack = m.get_scratch_top()
+
+    def run():
+        m.run(code, stack)
+
+    benchmark(run)
+    if prof:
+        prof.shutdown()
+    m.cleanup()
+
+
+def profiler_cpu_off_benchmark(benchmark):
+    _run(benchmark)
+
+
+def profiler_cpu_flat_benchmark(benchmark):
+    _run(benchmark, CPUProfiler(None, depth=0))
+
+
+def profiler_cpu_stack_benchmark(benchmark):
+    _run(benchmark, CPUProfiler(None))
@@ -0,0 +1,27 @@
+import os
+import pytest
+
+from amitools.vamos.main import main
+from amitools.vamos.warmstart import WarmStart
+
+ARGS = ["-c", "test.vamosrc", "--", "curdir:bin/test_hello_gcc"]
+
+
+def _skip_if_no_prog():
+    if not os.path.exists("bin/test_hello_gcc"):
+        pytest.skip("test_hello_gcc not built")
+
+
+def warm_start_cold_benchmark(benchmark):
+    _skip_if_no_prog()
+    res = benchmark.pedantic(main, kwargs={"args": ARGS}, rounds=5)
+    assert res == 0
+
+
+@pytest.mark.skipif(not WarmStart.is_available(), reason="warm start needs fork()")
+def warm_start_warm_benchmark(benchmark):
+    _skip_if_no_prog()
+    with WarmStart() as ws:
+        assert ws.run(args=ARGS) == 0
+        res = benchmark.pedantic(ws.run, kwargs={"args": ARGS}, rounds=5)
+    assert res == 0
@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+import socket
+import subprocess
+import threading
+import pytest
+from amitools.vamos.remote import (
+    run_remote,
+    stop_server,
+    get_server_stats,
+    send_msg,
+    recv_msg,
+    ConnectError,
+)
+from amitools.tools.vamosc import main as vamosc_main
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="server needs fork()")
+
+
+@pytest.fixture
+def server(tmpdir):
+    sock_path = str(tmpdir / "vamosd.sock")
+    env = dict(os.environ)
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    env["PYTHONPATH"] = base_dir
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "amitools.tools.vamosd", "-s", sock_path],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        if os.path.exists(sock_path):
+            break
+        time.sleep(0.05)
+    yield sock_path
+    stop_server(sock_path)
+    assert proc.wait(timeout=10) == 0
+    assert not os.path.exists(sock_path)
+
+
+def get_args(vamos, prog_name, *prog_args):
+    vamos.make_prog(prog_name)
+    prog = vamos.get_prog_bin_name(prog_name)
+    return vamos.vamos_args + ["--no-ts", "--", prog] + list(prog_args)
+
+
+def server_run_test(vamos, server, capfd):
+    args = get_args(vamos, "test_hello")
+    for _ in range(3):
+        assert run_remote(args, server) == 0
+    out, err = capfd.readouterr()
+    assert out.splitlines() == ["VamosTest: PrintHello()"] * 3
+    assert get_server_stats(server) == {"boots": 1, "runs": 3}
+
+
+def server_run_error_test(vamos, server, capfd):
+    args = vamos.vamos_args + ["--no-ts", "--", "curdir:bin/does_not_exist"]
+    assert run_remote(args, server) == 1000
+    out, err = capfd.readouterr()
+    assert "main proc setup failed!" in err
+
+
+def server_pass_fds_test(tmpdir):
+    a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    with a, b:
+        path = str(tmpdir / "out.txt")
+        with open(path, "w") as fh:
+            send_msg(a, {"cmd": "test"}, [fh.fileno()])
+        fds = []
+        assert recv_msg(b, fds) == {"cmd": "test"}
+        assert len(fds) == 1
+        with os.fdopen(fds[0], "w") as fh:
+            fh.write("hello")
+    with open(path) as fh:
+        assert fh.read() == "hello"
+
+
+def server_no_server_test(tmpdir):
+    with pytest.raises(ConnectError):
+        run_remote(["foo"], str(tmpdir / "none.sock"))
+
+
+def server_connection_lost_test(tmpdir, monkeypatch, capsys):
+    """a broken connection must not run the program locally"""
+    sock_path = str(tmpdir / "lost.sock")
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    srv.bind(sock_path)
+    srv.listen(1)
+
+    def drop_client():
+        conn, _ = srv.accept()
+        fds = []
+        recv_msg(conn, fds)
+        for fd in fds:
+            os.close(fd)
+        conn.close()
+
+    thread = threading.Thread(target=drop_client)
+    thread.start()
+    monkeypatch.setenv("VAMOS_SOCKET", sock_path)
+    assert vamosc_main(["foo"]) == 1
+    thread.join()
+    srv.close()
+    assert "vamosc: " in capsys.readouterr().err
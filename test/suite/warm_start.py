@@ -0,0 +1,43 @@
+import pytest
+from amitools.vamos.main import RET_CODE_CONFIG_ERROR
+from amitools.vamos.warmstart import WarmStart
+
+pytestmark = pytest.mark.skipif(
+    not WarmStart.is_available(), reason="warm start needs fork()"
+)
+
+
+def get_args(vamos, prog_name, *prog_args):
+    vamos.make_prog(prog_name)
+    prog = vamos.get_prog_bin_name(prog_name)
+    return vamos.vamos_args + ["--no-ts", "--", prog] + list(prog_args)
+
+
+def warm_start_hello_test(vamos, capfd):
+    args = get_args(vamos, "test_hello")
+    with WarmStart() as ws:
+        for _ in range(3):
+            assert ws.run(args=args) == 0
+        assert ws.get_stats() == {"boots": 1, "runs": 3}
+    out, err = capfd.readouterr()
+    assert out.splitlines() == ["VamosTest: PrintHello()"] * 3
+
+
+def warm_start_sessions_test(vamos, capfd):
+    args = get_args(vamos, "test_hello")
+    with WarmStart() as ws:
+        assert ws.run(args=args) == 0
+        # other machine config needs another session
+        assert ws.run(args=["-m", "4096"] + args) == 0
+        assert ws.run(args=args) == 0
+        assert ws.get_stats() == {"boots": 3, "runs": 3}
+    out, err = capfd.readouterr()
+    assert out.splitlines() == ["VamosTest: PrintHello()"] * 3
+
+
+def warm_start_config_error_test(vamos, capfd):
+    args = vamos.vamos_args + ["--no-ts", "--", "curdir:bin/does_not_exist"]
+    with WarmStart() as ws:
+        assert ws.run(args=args) == RET_CODE_CONFIG_ERROR
+        assert ws.run(args=get_args(vamos, "test_hello")) == 0
+        assert ws.get_stats()["boots"] == 1
@@ -1,3 +1,4 @@
+import os
 import pytest
 
 
@@ -11,3 +12,65 @@ def xdfscan(toolrun):
 
 def xdfscan_scan_test(xdfscan):
     xdfscan("disks")
+
+
+def xdfscan_scan_parallel_test(xdfscan):
+    serial = xdfscan("disks")
+    parallel = xdfscan("-j", "2", "disks")
+    # same results in same order and a throughput line
+    results = [line for line in serial if "  scan  " not in line]
+    assert parallel[:-1] == results
+    assert "images/s" in parallel[-1]
+
+
+def xdfscan_scan_resume_test(xdfscan, tmpdir):
+    results = str(tmpdir / "results.txt")
+    xdfscan("-j", "2", "-r", results, "disks")
+    with open(results) as fh:
+        lines = fh.readlines()
+    assert len(lines) > 2
+    # simulate interrupted scan with partial last line
+    with open(results, "w") as fh:
+        fh.writelines(lines[:2])
+        fh.write(lines[2][:5])
+    output = xdfscan("-r", results, "disks")
+    assert "2 images skipped (already in results file)" in output[-1]
+    with open(results) as fh:
+        assert fh.readlines() == lines
+
+
+def xdfscan_scan_cache_test(xdfscan, tmpdir):
+    disks = tmpdir.mkdir("disks")
+    for name in ("empty-dd-ofs.adf", "boot-dd-ffs.adf"):
+        with open(os.path.join("disks", name), "rb") as fh:
+            disks.join(name).write_binary(fh.read())
+    cache = str(tmpdir / "cache")
+    output = xdfscan("-c", cache, str(disks))
+    assert "0 images skipped (unchanged), 0 revalidated" in output[-1]
+    assert "2 new" in output[-1]
+    results = [line for line in output[:-2] if "  scan  " not in line]
+    # unchanged images are not scanned again
+    output = xdfscan("-c", cache, str(disks))
+    assert output[:-2] == results
+    assert "2 images skipped (unchanged), 0 revalidated" in output[-1]
+    # cached images are not part of the throughput
+    assert output[-2].startswith("0 images in ")
+    # debug output needs a new scan
+    output = xdfscan("-c", cache, "-d", str(disks))
+    assert "0 images skipped (unchanged), 0 revalidated" in output[-1]
+    assert output[-2].startswith("2 images in ")
+    xdfscan("-c", cache, str(disks))
+    # touched image with same contents
+    img = disks.join("empty-dd-ofs.adf")
+    img.setmtime(img.mtime() + 10)
+    output = xdfscan("-c", cache, "-j", "2", str(disks))
+    assert output[:-2] == results
+    assert "2 images skipped (unchanged), 0 revalidated" in output[-1]
+    # modified image
+    data = bytearray(img.read_binary())
+    data[512 * 1024] ^= 0xFF
+    img.write_binary(bytes(data))
+    output = xdfscan("-c", cache, str(disks))
+    assert "1 images skipped (unchanged), 1 revalidated (1 regions changed)" in (
+        output[-1]
+    )
@@ -384,6 +384,43 @@ def xdftool_write_read_test(xdftool, xdf_img, test_files):
     assert output == test_files.data
 
 
+def xdftool_write_read_mmap_test(xdftool, xdf_img, test_files):
+    """write a file and read it back with a memory mapped image"""
+    # write file
+    xdftool(xdf_img.file_name, ("open", "mmap"), ("write", test_files.file_path))
+    # read file back
+    read_file = test_files.file_path + "-read"
+    xdftool(
+        xdf_img.file_name,
+        ("open", "mmap"),
+        ("read", test_files.file_name, read_file),
+    )
+    # compare
+    with open(read_file, "rb") as fh:
+        read_data = fh.read()
+        assert read_data == test_files.data
+    # type file without mapping
+    output = xdftool(xdf_img.file_name, ("type", test_files.file_name), raw_output=True)
+    assert output == test_files.data
+
+
+def xdftool_write_read_cache_test(xdftool, xdf_img, test_files):
+    """write files with a block cache and read them back"""
+    xdftool(
+        xdf_img.file_name,
+        ("open", "cache=16"),
+        ("makedir", "bla"),
+        ("write", test_files.file_path),
+        ("write", test_files.file_path, "bla"),
+    )
+    output = xdftool(xdf_img.file_name, ("type", test_files.file_name), raw_output=True)
+    assert output == test_files.data
+    output = xdftool(
+        xdf_img.file_name, ("type", "bla/" + test_files.file_name), raw_output=True
+    )
+    assert output == test_files.data
+
+
 def xdftool_write_delete_test(xdftool, xdf_img, test_files):
     """write a file and delete it"""
     # write file
@@ -485,3 +522,13 @@ def xdftool_rdb_open_format_test(xdftool, rdb_files):
     # list again
     for part in part_list:
         xdftool(rdb_file, ("open", "part=" + part), ("list",))
+
+
+def xdftool_rdb_open_mmap_test(xdftool, rdb_files):
+    part_list, rdb_file = rdb_files
+    for part in part_list:
+        name = "foo_" + part
+        xdftool(rdb_file, ("open", "part=" + part, "mmap"), ("format", name))
+    # list again
+    for part in part_list:
+        xdftool(rdb_file, ("open", "part=" + part, "mmap"), ("list",))
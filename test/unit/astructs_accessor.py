@@ -0,0 +1,161 @@
+import pytest
+from amitools.vamos.machine import MockMemory
+from amitools.vamos.astructs import (
+    AccessStruct,
+    AmigaStruct,
+    AmigaStructDef,
+    FieldAccessor,
+    FieldGroup,
+    BYTE,
+    UBYTE,
+    WORD,
+    UWORD,
+    LONG,
+    ULONG,
+    APTR_SELF,
+    BPTR_VOID,
+    CSTR,
+    ARRAY,
+)
+from amitools.vamos.libstructs import NodeStruct, NodeType, TaskStruct
+
+
+@AmigaStructDef
+class AccStruct(AmigaStruct):
+    _format = [
+        (BYTE, "as_Byte"),  # 0
+        (UBYTE, "as_UByte"),  # 1
+        (WORD, "as_Word"),  # 2
+        (UWORD, "as_UWord"),  # 4
+        (UWORD, "as_Pad"),  # 6
+        (LONG, "as_Long"),  # 8
+        (ULONG, "as_ULong"),  # 12
+        (BPTR_VOID, "as_BPtr"),  # 16
+        (CSTR, "as_Name"),  # 20
+        (ARRAY(UBYTE, 4), "as_Array"),  # 24
+    ]  # 28
+
+
+@AmigaStructDef
+class AccSubStruct(AmigaStruct):
+    _format = [
+        (ULONG, "ss_Magic"),
+        (AccStruct, "ss_Acc"),
+        (APTR_SELF, "ss_Next"),
+    ]
+
+
+def astructs_accessor_compile_test():
+    acc = AccStruct.get_accessor("as_Word")
+    assert isinstance(acc, FieldAccessor)
+    assert (acc.offset, acc.width, acc.signed, acc.bptr) == (2, 1, True, False)
+    # compiled once per path
+    assert AccStruct.get_accessor("as_Word") is acc
+    # alias name
+    assert AccStruct.get_accessor("long").offset == 8
+    acc = AccStruct.get_accessor("as_BPtr")
+    assert (acc.offset, acc.width, acc.signed, acc.bptr) == (16, 2, False, True)
+    acc = AccStruct.get_accessor("as_Name")
+    assert (acc.offset, acc.width, acc.bptr) == (20, 2, False)
+    # sub struct path
+    acc = AccSubStruct.get_accessor("ss_Acc.as_ULong")
+    assert acc.offset == 4 + 12
+    assert AccSubStruct.get_accessor("ss_Next").offset == 4 + 28
+
+
+def astructs_accessor_invalid_test():
+    with pytest.raises(KeyError):
+        AccStruct.get_accessor("as_Foo")
+    with pytest.raises(KeyError):
+        AccStruct.get_accessor("as_Word.bla")
+    with pytest.raises(KeyError):
+        AccSubStruct.get_accessor("ss_Acc.as_Foo")
+    # no scalars
+    with pytest.raises(ValueError):
+        AccStruct.get_accessor("as_Array")
+    with pytest.raises(ValueError):
+        AccSubStruct.get_accessor("ss_Acc")
+    assert AccSubStruct.sdef.find_accessor("ss_Acc") is None
+
+
+@pytest.mark.parametrize(
+    "name,val",
+    [
+        ("as_Byte", -5),
+        ("as_UByte", 0xF0),
+        ("as_Word", -1000),
+        ("as_UWord", 0xFFF0),
+        ("as_Long", -100000),
+        ("as_ULong", 0xDEADBEEF),
+        ("as_BPtr", 0x1234),
+        ("as_Name", 0x4321),
+    ],
+)
+def astructs_accessor_rw_test(name, val):
+    mem = MockMemory()
+    acc = AccStruct.get_accessor(name)
+    acc.write(mem, 0x100, val)
+    assert acc.read(mem, 0x100) == val
+    # same as field of struct instance
+    field = AccStruct(mem, 0x100).get(name)
+    if name == "as_BPtr":
+        assert field.get_ref_addr() == val
+        assert mem.r32(0x110) == val >> 2
+    else:
+        assert field.get() == val
+
+
+def astructs_accessor_enum_test():
+    mem = MockMemory()
+    acc = NodeStruct.get_accessor("ln_Type")
+    acc.write(mem, 0x100, "NT_TASK")
+    assert acc.read(mem, 0x100) == NodeType.NT_TASK
+    acc.write(mem, 0x100, NodeType.NT_PROCESS)
+    assert acc.read(mem, 0x100) == NodeType.NT_PROCESS
+    with pytest.raises(ValueError):
+        acc.write(mem, 0x100, "NT_FOO")
+
+
+def astructs_accessor_group_test():
+    mem = MockMemory()
+    mem.w_block(0x100, b"\xaa" * 28)
+    group = AccStruct.get_field_group("as_ULong", "as_Byte", "as_BPtr")
+    assert isinstance(group, FieldGroup)
+    assert AccStruct.get_field_group("as_ULong", "as_Byte", "as_BPtr") is group
+    assert (group.start, group.size) == (0, 20)
+    group.write(mem, 0x100, [0x12345678, -2, 0x40])
+    assert group.read(mem, 0x100) == [0x12345678, -2, 0x40]
+    # gaps are untouched
+    assert mem.r_block(0x101, 11) == b"\xaa" * 11
+    assert mem.r8s(0x100) == -2
+    assert mem.r32(0x10C) == 0x12345678
+    assert mem.r32(0x110) == 0x10
+    # overlapping fields
+    with pytest.raises(ValueError):
+        AccStruct.get_field_group("as_Word", "as_Word")
+
+
+def astructs_accessor_access_struct_test():
+    mem = MockMemory()
+    a = AccessStruct(mem, AccSubStruct, 0x200)
+    a.w_fields({"ss_Magic": 0xCAFE, "ss_Acc.as_Word": -7, "ss_Next": 0x200})
+    assert a.r_fields("ss_Next", "ss_Magic") == [0x200, 0xCAFE]
+    assert a.r_s("ss_Acc.as_Word") == -7
+    # s_get_addr works for all fields
+    assert a.s_get_addr("ss_Acc") == 0x204
+    assert a.s_get_addr("ss_Acc.as_Array") == 0x204 + 24
+    with pytest.raises(KeyError):
+        a.s_get_addr("ss_Foo")
+    # the struct instance is only created on demand
+    assert a._struct is None
+    assert a.struct.get_addr() == 0x200
+
+
+def astructs_accessor_libstruct_test():
+    mem = MockMemory()
+    a = AccessStruct(mem, TaskStruct, 0x400)
+    a.w_s("tc_Node.ln_Pri", -3)
+    a.w_s("tc_Node.ln_Name", 0x800)
+    task = TaskStruct(mem, 0x400)
+    assert task.node.pri.val == -3
+    assert task.node.name.aptr == 0x800
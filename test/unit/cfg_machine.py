@@ -9,9 +9,11 @@ def cfg_machine_dict_test():
             "cpu": "68020",
             "max_cycles": 23,
             "cycles_per_run": 42,
+            "slicing": "adaptive",
+            "max_cycles_per_run": 4200,
             "ram_size": 512,
         },
-        "memmap": {"hw_access": "abort", "old_dos_guard": True},
+        "memmap": {"hw_access": "abort", "old_dos_guard": True, "mem_alloc": "bins"},
     }
     lp.parse_config(input_dict, "dict")
     assert lp.get_cfg_dict() == input_dict
@@ -24,9 +26,12 @@ def cfg_machine_ini_test():
             "cpu": "68020",
             "max_cycles": 23,
             "cycles_per_run": 42,
+            "slicing": "adaptive",
+            "max_cycles_per_run": 4200,
             "ram_size": 512,
             "hw_access": "abort",
             "old_dos_guard": True,
+            "mem_alloc": "bins",
         }
     }
     lp.parse_config(ini_dict, "ini")
@@ -35,9 +40,11 @@ def cfg_machine_ini_test():
             "cpu": "68020",
             "max_cycles": 23,
             "cycles_per_run": 42,
+            "slicing": "adaptive",
+            "max_cycles_per_run": 4200,
             "ram_size": 512,
         },
-        "memmap": {"hw_access": "abort", "old_dos_guard": True},
+        "memmap": {"hw_access": "abort", "old_dos_guard": True, "mem_alloc": "bins"},
     }
 
 
@@ -53,11 +60,17 @@ def cfg_machine_args_test():
             "23",
             "--cycles-per-block",
             "42",
+            "--slicing",
+            "adaptive",
+            "--max-cycles-per-block",
+            "4200",
             "--old-dos-guard",
             "-m",
             "512",
             "-H",
             "abort",
+            "--mem-alloc",
+            "bins",
         ]
     )
     lp.parse_args(args)
@@ -66,7 +79,9 @@ def cfg_machine_args_test():
             "cpu": "68020",
             "max_cycles": 23,
             "cycles_per_run": 42,
+            "slicing": "adaptive",
+            "max_cycles_per_run": 4200,
             "ram_size": 512,
         },
-        "memmap": {"hw_access": "abort", "old_dos_guard": True},
+        "memmap": {"hw_access": "abort", "old_dos_guard": True, "mem_alloc": "bins"},
     }
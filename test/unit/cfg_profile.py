@@ -8,6 +8,12 @@ def cfg_profile_dict_test():
         "profile": {
             "enabled": True,
             "libs": {"names": ["exec.library", "dos.library"], "calls": True},
+            "cpu": {
+                "enabled": True,
+                "interval": 500,
+                "depth": 8,
+                "collapsed": "foo/stacks",
+            },
             "output": {"file": "foo/bar", "append": True, "dump": True},
         }
     }
@@ -25,6 +31,13 @@ def cfg_profile_args_test():
             "--profile-libs",
             "exec.library,dos.library",
             "--profile-lib-calls",
+            "--profile-cpu",
+            "--profile-cpu-interval",
+            "500",
+            "--profile-cpu-depth",
+            "8",
+            "--profile-cpu-collapsed",
+            "foo/stacks",
             "--profile-file",
             "foo/bar",
             "--profile-file-append",
@@ -36,6 +49,12 @@ def cfg_profile_args_test():
         "profile": {
             "enabled": True,
             "libs": {"names": ["exec.library", "dos.library"], "calls": True},
+            "cpu": {
+                "enabled": True,
+                "interval": 500,
+                "depth": 8,
+                "collapsed": "foo/stacks",
+            },
             "output": {"file": "foo/bar", "append": True, "dump": True},
         }
     }
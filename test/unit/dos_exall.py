@@ -0,0 +1,165 @@
+import os
+import pytest
+from amitools.vamos.machine import MockMachine
+from amitools.vamos.machine.regs import *
+from amitools.vamos.libcore import LibCtx
+from amitools.vamos.astructs import AccessStruct
+from amitools.vamos.libstructs import (
+    ExAllDataStruct,
+    ExAllControlStruct,
+    FileInfoBlockStruct,
+)
+from amitools.vamos.lib.DosLibrary import DosLibrary
+from amitools.vamos.lib.dos.Lock import Lock, ED_NAME, ED_TYPE, ED_SIZE, ED_OWNER
+from amitools.vamos.lib.dos.PatternMatch import pattern_parse
+from amitools.vamos.lib.dos.Error import *
+
+BUF = 0x1000
+CTRL = 0x800
+FIB = 0x400
+
+
+class LockMgrMock:
+    def __init__(self, lock):
+        self.lock = lock
+
+    def get_by_b_addr(self, b_addr):
+        assert b_addr == 42
+        return self.lock
+
+
+class TaskAccessMock:
+    def __init__(self):
+        self.values = {}
+
+    def w_s(self, name, val):
+        self.values[name] = val
+
+
+class ProcessMock:
+    def __init__(self):
+        self.this_task = self
+        self.access = TaskAccessMock()
+
+
+def create_dir(tmpdir, num):
+    for i in range(num):
+        tmpdir.join("file%02d.c" % i).write("x" * i)
+    tmpdir.mkdir("sub")
+    return Lock("test", "test:", str(tmpdir))
+
+
+def read_entries(mem, addr, data_type):
+    res = []
+    while addr != 0:
+        ed = AccessStruct(mem, ExAllDataStruct, addr)
+        entry = [mem.r_cstr(ed.r_s("ed_Name"))]
+        if data_type >= ED_TYPE:
+            entry.append(ed.r_s("ed_Type"))
+        if data_type >= ED_SIZE:
+            entry.append(ed.r_s("ed_Size"))
+        res.append(tuple(entry))
+        addr = ed.r_s("ed_Next")
+    return res
+
+
+def setup_dos(lock):
+    ctx = LibCtx(MockMachine())
+    ctx.process = ProcessMock()
+    dos = DosLibrary()
+    dos.lock_mgr = LockMgrMock(lock)
+    ctx.mem.clear_block(CTRL, ExAllControlStruct.get_size(), 0)
+    ctrl = AccessStruct(ctx.mem, ExAllControlStruct, CTRL)
+    return ctx, dos, ctrl
+
+
+def ex_all(ctx, dos, size, data_type):
+    regs = {REG_D1: 42, REG_D2: BUF, REG_D3: size, REG_D4: data_type, REG_D5: CTRL}
+    for reg, val in regs.items():
+        ctx.cpu.w_reg(reg, val)
+    return dos.ExAll(ctx)
+
+
+def dos_exall_lock_test(tmpdir):
+    lock = create_dir(tmpdir, 3)
+    mem = MockMachine().get_mem()
+    num, last_key, err = lock.ex_all(mem, BUF, 1024, ED_SIZE, 0)
+    assert (num, last_key, err) == (4, 4, ERROR_NO_MORE_ENTRIES)
+    entries = sorted(read_entries(mem, BUF, ED_SIZE))
+    assert entries == [
+        ("file00.c", -3, 0),
+        ("file01.c", -3, 1),
+        ("file02.c", -3, 2),
+        ("sub", 2, 0),
+    ]
+
+
+@pytest.mark.parametrize("data_type", range(ED_NAME, ED_OWNER + 1))
+def dos_exall_batches_test(tmpdir, data_type):
+    lock = create_dir(tmpdir, 20)
+    ctx, dos, ctrl = setup_dos(lock)
+    names = []
+    calls = 0
+    while True:
+        more = ex_all(ctx, dos, 128, data_type)
+        calls += 1
+        num = ctrl.r_s("eac_Entries")
+        entries = read_entries(ctx.mem, BUF if num else 0, data_type)
+        assert len(entries) == num
+        names += [e[0] for e in entries]
+        if not more:
+            break
+    assert dos.IoErr(ctx) == ERROR_NO_MORE_ENTRIES
+    assert sorted(names) == sorted(os.listdir(str(tmpdir)))
+    assert calls > 1
+
+
+def dos_exall_pattern_test(tmpdir):
+    lock = create_dir(tmpdir, 20)
+    ctx, dos, ctrl = setup_dos(lock)
+    pat = pattern_parse("file1#?", ignore_case=True)
+    ctx.mem.w_cstr(0x2000, pat.pat_str)
+    ctrl.w_s("eac_MatchString", 0x2000)
+    assert not ex_all(ctx, dos, 1024, ED_NAME)
+    names = [e[0] for e in read_entries(ctx.mem, BUF, ED_NAME)]
+    assert sorted(names) == ["file%02d.c" % i for i in range(10, 20)]
+
+
+def dos_exall_errors_test(tmpdir):
+    lock = create_dir(tmpdir, 1)
+    ctx, dos, ctrl = setup_dos(lock)
+    # invalid type
+    assert not ex_all(ctx, dos, 1024, ED_OWNER + 1)
+    assert dos.IoErr(ctx) == ERROR_BAD_NUMBER
+    # buffer too small
+    assert not ex_all(ctx, dos, 8, ED_NAME)
+    assert dos.IoErr(ctx) == ERROR_NO_FREE_STORE
+    assert ctrl.r_s("eac_Entries") == 0
+
+
+def dos_exall_end_test(tmpdir):
+    lock = create_dir(tmpdir, 20)
+    ctx, dos, ctrl = setup_dos(lock)
+    assert ex_all(ctx, dos, 64, ED_NAME)
+    assert ctrl.r_s("eac_LastKey") > 0
+    dos.ExAllEnd(ctx)
+    assert ctrl.r_s("eac_LastKey") == 0
+    assert lock.exall_dirent is None
+
+
+def dos_exall_examine_next_test(tmpdir):
+    lock = create_dir(tmpdir, 3)
+    mem = MockMachine().get_mem()
+    fib = AccessStruct(mem, FileInfoBlockStruct, FIB)
+    assert lock.examine_lock(fib) == NO_ERROR
+    assert fib.r_s("fib_DirEntryType") == 2
+    entries = []
+    while lock.examine_next(fib) == NO_ERROR:
+        name = mem.r_cstr(fib.s_get_addr("fib_FileName"))
+        entries.append((name, fib.r_s("fib_DirEntryType"), fib.r_s("fib_Size")))
+    assert sorted(entries) == [
+        ("file00.c", -3, 0),
+        ("file01.c", -3, 1),
+        ("file02.c", -3, 2),
+        ("sub", 2, 0),
+    ]
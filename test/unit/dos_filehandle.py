@@ -0,0 +1,221 @@
+import io
+import pytest
+from amitools.vamos.lib.dos.FileHandle import FileHandle
+
+TEXT = b"first line\nsecond\n\nlast without newline"
+
+
+class CountIO(io.BytesIO):
+    """count the calls to the host file"""
+
+    def __init__(self, data=b""):
+        io.BytesIO.__init__(self, data)
+        self.num_reads = 0
+        self.num_writes = 0
+
+    def read1(self, size=-1):
+        self.num_reads += 1
+        return io.BytesIO.read1(self, size)
+
+    def write(self, data):
+        self.num_writes += 1
+        return io.BytesIO.write(self, data)
+
+
+def create_fh(data=b"", buf_size=None, auto_flush=False):
+    obj = CountIO(data)
+    fh = FileHandle(
+        obj, "test", "/test", need_close=False, auto_flush=auto_flush, buf_size=buf_size
+    )
+    return fh, obj
+
+
+def read_chars(fh):
+    res = bytearray()
+    while True:
+        ch = fh.getc()
+        if ch == -1:
+            return bytes(res)
+        res.append(ch)
+
+
+@pytest.mark.parametrize("buf_size", [1, 3, 4096])
+def dos_filehandle_getc_test(buf_size):
+    fh, obj = create_fh(TEXT, buf_size)
+    assert read_chars(fh) == TEXT
+    assert fh.getc() == -1
+    # host file is read in chunks. each eof needs a read
+    assert obj.num_reads == -(-len(TEXT) // buf_size) + 2
+
+
+@pytest.mark.parametrize("buf_size", [1, 3, 4096])
+def dos_filehandle_getline_test(buf_size):
+    fh, obj = create_fh(TEXT, buf_size)
+    assert fh.getline() == b"first line\n"
+    assert fh.getline() == b"second\n"
+    assert fh.getline() == b"\n"
+    assert fh.getline() == b"last without newline"
+    assert fh.getline() == b""
+
+
+@pytest.mark.parametrize("buf_size", [1, 3, 4096])
+def dos_filehandle_gets_test(buf_size):
+    fh, obj = create_fh(TEXT, buf_size)
+    # rest of a long line is returned by the next call
+    assert fh.gets(5) == "first"
+    assert fh.gets(100) == " line\n"
+    assert fh.gets(7) == "second\n"
+    assert fh.gets(0) == ""
+    assert fh.gets(1) == "\n"
+    assert fh.gets(100) == "last without newline"
+    assert fh.gets(100) == ""
+
+
+def dos_filehandle_gets_unch_test():
+    fh, obj = create_fh(b"file\nnext\n")
+    fh.setbuf("arg")
+    # pushed back chars come first and are continued with file data
+    assert fh.gets(100) == "argfile\n"
+    fh.setbuf("a\nb")
+    assert fh.gets(100) == "a\n"
+    assert fh.gets(100) == "bnext\n"
+
+
+def dos_filehandle_ungetc_test():
+    fh, obj = create_fh(b"abc")
+    assert fh.getc() == ord("a")
+    assert fh.ungetc(-1) == ord("a")
+    # ungetc steps back in readahead
+    assert not fh.unch
+    assert fh.tell() == 0
+    assert fh.getc() == ord("a")
+    assert fh.ungetc(ord("x")) == ord("x")
+    assert fh.getc() == ord("x")
+    assert read_chars(fh) == b"bc"
+
+
+def dos_filehandle_read_test():
+    fh, obj = create_fh(TEXT, 8)
+    assert fh.getc() == ord("f")
+    fh.setbuf("arg")
+    # read is unbuffered: pushed back chars are not returned but readahead is
+    assert fh.read(4) == b"irst"
+    assert fh.read(10) == b" line\nseco"
+    assert fh.tell() == 15
+    assert fh.read(100) == TEXT[15:]
+    assert fh.read(100) == b""
+    assert fh.gets(100) == "arg"
+
+
+def dos_filehandle_tell_seek_test():
+    fh, obj = create_fh(TEXT, 8)
+    assert fh.gets(100) == "first line\n"
+    assert fh.tell() == 11
+    # relative seek is based on the buffered position
+    fh.seek(-5, 1)
+    assert fh.tell() == 6
+    assert fh.gets(100) == "line\n"
+    fh.seek(0, 0)
+    assert fh.getc() == ord("f")
+    fh.seek(-4, 2)
+    assert fh.gets(100) == "line"
+
+
+def dos_filehandle_write_combine_test():
+    fh, obj = create_fh(buf_size=16)
+    for ch in b"hello":
+        assert fh.write(bytes((ch,))) == 1
+    # writes are combined
+    assert obj.num_writes == 0
+    assert fh.tell() == 5
+    assert obj.num_writes == 1
+    assert fh.write(b"0123456789abcdefg") == 17
+    assert obj.num_writes == 2
+    assert obj.getvalue() == b"hello0123456789abcdefg"
+    fh.write(b"end")
+    fh.flush()
+    assert obj.getvalue() == b"hello0123456789abcdefgend"
+
+
+def dos_filehandle_write_auto_flush_test():
+    fh, obj = create_fh(auto_flush=True)
+    fh.write(b"a")
+    fh.write(b"b")
+    # interactive handles write through
+    assert obj.num_writes == 2
+    assert obj.getvalue() == b"ab"
+
+
+def dos_filehandle_write_seek_test():
+    fh, obj = create_fh(b"0123456789")
+    fh.write(b"ab")
+    fh.seek(0, 0)
+    assert fh.read(4) == b"ab23"
+    # write after read goes to the current position
+    assert fh.getc() == ord("4")
+    fh.write(b"X")
+    assert fh.getc() == ord("6")
+    fh.seek(-1, 1)
+    fh.write(b"Y")
+    fh.seek(0, 2)
+    fh.write(b"!")
+    assert fh.tell() == 11
+    fh.flush()
+    assert obj.getvalue() == b"ab234XY789!"
+
+
+def dos_filehandle_close_test():
+    obj = io.BytesIO()
+    fh = FileHandle(obj, "test", "/test", need_close=False)
+    fh.write(b"data")
+    assert fh.close()
+    # buffered data is written on close
+    assert obj.getvalue() == b"data"
+
+
+class FailWriteIO(io.BytesIO):
+    def write(self, data):
+        raise IOError("write failed")
+
+
+def dos_filehandle_close_error_test():
+    fh = FileHandle(FailWriteIO(), "test", "/test", need_close=False)
+    fh.write(b"data")
+    # lost buffered data is reported
+    assert not fh.close()
+
+
+def dos_filehandle_seek_error_test(tmpdir):
+    path = tmpdir / "test.txt"
+    path.write_binary(TEXT)
+    with open(str(path), "rb") as obj:
+        fh = FileHandle(obj, "test", str(path), need_close=False)
+        assert fh.getc() == TEXT[0]
+        assert fh.getc() == TEXT[1]
+        # seek before begin of file fails and keeps the position
+        assert fh.seek(-100, 1) == -1
+        assert fh.tell() == 2
+        assert fh.getc() == TEXT[2]
+
+
+def dos_filehandle_nil_test():
+    fh = FileHandle(io.BytesIO(b"data"), "NIL:", "/dev/null", is_nil=True)
+    assert fh.getc() == -1
+    assert fh.gets(10) == ""
+
+
+def dos_filehandle_set_obj_test():
+    fh, obj = create_fh(b"old data")
+    fh.setbuf("arg")
+    assert fh.getc() == ord("a")
+    fh.set_obj(io.BytesIO(b"new"))
+    assert fh.gets(10) == "new"
+
+
+def dos_filehandle_write_unbuffered_test():
+    fh, obj = create_fh()
+    fh.write(b"abc")
+    assert obj.num_writes == 0
+    # unbuffered writes keep the order of buffered data
+    fh.write(b"def", buffered=False)
+    assert obj.getvalue() == b"abcdef"
@@ -1,7 +1,13 @@
+import itertools
+import random
+import pytest
 from amitools.vamos.lib.dos.PatternMatch import (
     pattern_parse,
     pattern_match,
     pattern_dump,
+    pattern_interp,
+    pattern_to_regex,
+    pattern_compile,
 )
 
 
@@ -38,3 +44,94 @@ def pattern_not_any_test():
     pat = pattern_parse("~(#?.o)")
     assert pattern_match(pat, "bla")
     assert not pattern_match(pat, "test.o", True)
+
+
+def pattern_cache_test():
+    pat = pattern_parse("#?.o")
+    assert pattern_parse("#?.o") is pat
+    assert pattern_parse("#?.o", ignore_case=False) is not pat
+    assert pattern_compile(pat.pat_str, True) is pattern_compile(pat.pat_str, True)
+
+
+@pytest.mark.parametrize(
+    "src,compiled",
+    [
+        ("#?.o", True),
+        ("(foo|bar)#?", True),
+        ("[a-c]x[~0-9]", True),
+        ("~(#?.info)", True),
+        ("foo?~(bar)", True),
+        ("#?~(x)", False),
+        ("~(a)b", False),
+        ("(~(a)|b)", False),
+    ],
+)
+def pattern_to_regex_test(src, compiled):
+    pat = pattern_parse(src)
+    assert (pattern_to_regex(pat.pat_str) is not None) == compiled
+
+
+def pattern_class_test():
+    pat = pattern_parse("[a-cx]")
+    assert pattern_match(pat, "b")
+    assert pattern_match(pat, "X")
+    assert not pattern_match(pat, "d")
+    pat = pattern_parse("[~a-c]")
+    assert pattern_match(pat, "d")
+    assert not pattern_match(pat, "B")
+    # open range
+    pat = pattern_parse("[x-]")
+    assert pattern_match(pat, "\xe4")
+    assert not pattern_match(pat, "a")
+
+
+# pattern parts and strings for differential testing
+ATOMS = [
+    "a",
+    "b",
+    "A",
+    ".",
+    "?",
+    "#?",
+    "#a",
+    "#(a|b)",
+    "(a|b)",
+    "(a|%)",
+    "(a|bb)",
+    "[a-b]",
+    "[~a]",
+    "[b-]",
+    "'#",
+    "~a",
+    "~(a)",
+    "~(b#?)",
+    "(~a|b)",
+    "#~(a)",
+    "*",
+]
+CHARS = "abA.#"
+
+
+def _call(func, *args):
+    # the interpreter fails on some nested NOTs: expect the same errors
+    try:
+        return func(*args)
+    except (TypeError, IndexError) as e:
+        return type(e)
+
+
+@pytest.mark.parametrize("ignore_case", [True, False])
+@pytest.mark.parametrize("star_is_wild", [True, False])
+def pattern_compile_differential_test(ignore_case, star_is_wild):
+    """compiled and interpreted patterns must give the same results"""
+    rnd = random.Random(42)
+    strs = ["".join(x) for n in range(5) for x in itertools.product(CHARS, repeat=n)]
+    for _ in range(100):
+        src = "".join(rnd.choice(ATOMS) for _ in range(rnd.randint(1, 4)))
+        pat = pattern_parse(src, ignore_case, star_is_wild)
+        if pat is None:
+            continue
+        match = pattern_compile(pat.pat_str, ignore_case)
+        for txt in strs:
+            expect = _call(pattern_interp, pat, txt)
+            assert _call(match, txt) == expect, (src, txt)
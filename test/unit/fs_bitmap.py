@@ -0,0 +1,80 @@
+from amitools.fs.blkdev.ADFBlockDevice import ADFBlockDevice
+from amitools.fs.ADFSVolume import ADFSVolume
+from amitools.fs.ADFSBitmap import ADFSBitmap
+from amitools.fs.FSString import FSString
+
+
+def create_volume(tmpdir):
+    blkdev = ADFBlockDevice(str(tmpdir / "test.adf"))
+    blkdev.create()
+    vol = ADFSVolume(blkdev)
+    vol.create(FSString("test"))
+    return vol
+
+
+def count_free(bitmap):
+    res = bitmap.blkdev.reserved
+    num = 0
+    for i in range(bitmap.bitmap_bits):
+        if bitmap.get_bit(i + res):
+            num += 1
+    return num
+
+
+def fs_bitmap_counters_test(tmpdir):
+    vol = create_volume(tmpdir)
+    bm = vol.bitmap
+    # root and bitmap block are used
+    assert bm.get_num_free() == bm.bitmap_bits - 2
+    assert bm.get_num_free() == count_free(bm)
+    assert bm.get_num_used() == 2
+    blks = bm.alloc_n(10)
+    assert bm.get_num_free() == bm.bitmap_bits - 12
+    assert bm.get_num_free() == count_free(bm)
+    bm.dealloc_n(blks[:5])
+    assert bm.get_num_free() == bm.bitmap_bits - 7
+    assert bm.get_num_free() == count_free(bm)
+
+
+def fs_bitmap_read_test(tmpdir):
+    vol = create_volume(tmpdir)
+    bm = vol.bitmap
+    bm.alloc_n(100)
+    bm.write()
+    # read bitmap again
+    bm2 = ADFSBitmap(vol.root)
+    bm2.read()
+    assert bm2.get_num_free() == bm.get_num_free()
+    assert bm2.get_bitmap_data() == bm.get_bitmap_data()
+
+
+def fs_bitmap_alloc_run_test(tmpdir):
+    vol = create_volume(tmpdir)
+    bm = vol.bitmap
+    # fragment bitmap: use every other block after root
+    root = vol.root.blk_num
+    for b in range(root + 2, root + 200, 2):
+        bm.clr_bit(b)
+    blks = bm.alloc_n(64)
+    assert blks == list(range(blks[0], blks[0] + 64))
+    for b in blks:
+        assert not bm.get_bit(b)
+    assert bm.get_num_free() == count_free(bm)
+
+
+def fs_bitmap_alloc_scattered_test(tmpdir):
+    vol = create_volume(tmpdir)
+    bm = vol.bitmap
+    # use every other block of the whole volume
+    res = bm.blkdev.reserved
+    for b in range(res, bm.blkdev.num_blocks, 2):
+        bm.clr_bit(b)
+    num_free = bm.get_num_free()
+    assert bm.find_free_run(2) is None
+    # falls back to scattered blocks
+    blks = bm.alloc_n(4)
+    assert len(blks) == 4
+    assert bm.get_num_free() == num_free - 4
+    # too many
+    assert bm.alloc_n(num_free) is None
+    assert bm.find_n_free(num_free - 4) is not None
@@ -0,0 +1,122 @@
+import pytest
+from amitools.fs.blkdev.ADFBlockDevice import ADFBlockDevice
+from amitools.fs.blkdev.HDFBlockDevice import HDFBlockDevice
+from amitools.fs.blkdev.CachedBlockDevice import CachedBlockDevice
+from amitools.fs.blkdev.BlkDevFactory import BlkDevFactory
+from amitools.fs.blkdev.DiskGeometry import DiskGeometry
+from amitools.fs.ADFSVolume import ADFSVolume
+from amitools.fs.FSString import FSString
+
+
+class CountingBlockDevice(HDFBlockDevice):
+    """count the block writes reaching the image"""
+
+    def __init__(self, *args, **kw_args):
+        HDFBlockDevice.__init__(self, *args, **kw_args)
+        self.written = []
+
+    def write_block(self, blk_num, data):
+        self.written.append(blk_num)
+        return HDFBlockDevice.write_block(self, blk_num, data)
+
+
+def create_hdf(tmpdir, cyls=4):
+    blkdev = CountingBlockDevice(str(tmpdir / "test.hdf"))
+    blkdev.create(DiskGeometry(cyls, 1, 32))
+    return blkdev
+
+
+def fs_blkdev_cache_read_write_test(tmpdir):
+    raw = create_hdf(tmpdir)
+    cache = CachedBlockDevice(raw, capacity=4)
+    # geometry is taken from wrapped device
+    assert cache.num_blocks == raw.num_blocks
+    assert cache.block_bytes == 512
+    assert cache.get_chs_str() == raw.get_chs_str()
+    # writes are delayed
+    cache.write_block(7, b"\x07" * 512)
+    cache.write_block(3, b"\x03" * 512)
+    cache.write_block(7, b"\x77" * 512)
+    assert raw.written == []
+    assert cache.read_block(7) == b"\x77" * 512
+    assert cache.num_hits == 1
+    assert cache.num_writes == 3
+    # multi block reads see dirty blocks
+    data = cache.read_block(2, num_blks=6)
+    assert data[512:1024] == b"\x03" * 512
+    assert data[5 * 512 :] == b"\x77" * 512
+    assert data[0:512] == bytes(512)
+    # flush writes sorted and only once
+    cache.flush()
+    assert raw.written == [3, 7]
+    assert cache.get_stats()["dirty"] == 0
+    assert raw.read_block(7) == b"\x77" * 512
+    cache.close()
+
+
+def fs_blkdev_cache_evict_test(tmpdir):
+    raw = create_hdf(tmpdir)
+    cache = CachedBlockDevice(raw, capacity=2)
+    cache.write_block(1, b"\x01" * 512)
+    cache.write_block(2, b"\x02" * 512)
+    # use block 1 so 2 is least recently used
+    cache.read_block(1)
+    cache.read_block(5)
+    assert cache.num_misses == 1
+    assert raw.written == [2]
+    assert cache.num_write_backs == 1
+    # re-read evicted block
+    assert cache.read_block(2) == b"\x02" * 512
+    assert cache.num_misses == 2
+    cache.close()
+    assert raw.written == [2, 1]
+
+
+def fs_blkdev_cache_invalid_test(tmpdir):
+    cache = CachedBlockDevice(create_hdf(tmpdir))
+    with pytest.raises(ValueError):
+        cache.write_block(cache.num_blocks, bytes(512))
+    with pytest.raises(ValueError):
+        cache.write_block(0, bytes(100))
+    with pytest.raises(ValueError):
+        CachedBlockDevice(cache, capacity=0)
+
+
+def fs_blkdev_cache_volume_test(tmpdir):
+    raw = create_hdf(tmpdir, cyls=32)
+    cache = CachedBlockDevice(raw)
+    vol = ADFSVolume(cache)
+    vol.create(FSString("test"))
+    for i in range(20):
+        vol.create_dir(FSString("dir%d" % i))
+        vol.write_file(b"hello" * i, FSString("dir%d/file" % i))
+    vol.close()
+    cache.flush()
+    # each block written only once
+    assert len(raw.written) == len(set(raw.written))
+    assert cache.num_writes > len(raw.written)
+    # check contents without cache
+    vol = ADFSVolume(raw)
+    vol.open()
+    for i in range(20):
+        assert vol.read_file(FSString("dir%d/file" % i)) == b"hello" * i
+    vol.close()
+    cache.close()
+
+
+def fs_blkdev_cache_factory_test(tmpdir):
+    path = str(tmpdir / "test.adf")
+    f = BlkDevFactory()
+    blkdev = f.create(path, options={"cache": True})
+    assert isinstance(blkdev, CachedBlockDevice)
+    assert blkdev.capacity == CachedBlockDevice.DEFAULT_CAPACITY
+    blkdev.write_block(880, b"\xaa" * 512)
+    blkdev.close()
+    blkdev = f.open(path, options={"cache": 16})
+    assert blkdev.capacity == 16
+    assert isinstance(blkdev.blkdev, ADFBlockDevice)
+    assert blkdev.read_block(880) == b"\xaa" * 512
+    blkdev.close()
+    blkdev = f.open(path)
+    assert isinstance(blkdev, ADFBlockDevice)
+    blkdev.close()
@@ -0,0 +1,90 @@
+import pytest
+from amitools.fs.blkdev.ImageFile import ImageFile
+
+
+def create_image(path, num_blocks=8, block_bytes=512):
+    data = bytearray()
+    for i in range(num_blocks):
+        data += bytes([i]) * block_bytes
+    with open(path, "wb") as fh:
+        fh.write(data)
+    return data
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def fs_blkdev_imagefile_read_test(tmpdir, use_mmap):
+    path = str(tmpdir / "test.img")
+    data = create_image(path)
+    im = ImageFile(path, read_only=True, use_mmap=use_mmap)
+    im.open()
+    assert im.is_mapped() == use_mmap
+    assert im.num_blocks == 8
+    assert im.read_blk(0) == data[0:512]
+    assert im.read_blk(3, 2) == data[3 * 512 : 5 * 512]
+    with pytest.raises(IOError):
+        im.read_blk(8)
+    im.close()
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def fs_blkdev_imagefile_write_test(tmpdir, use_mmap):
+    path = str(tmpdir / "test.img")
+    create_image(path)
+    im = ImageFile(path, use_mmap=use_mmap)
+    im.open()
+    im.write_blk(2, b"\xaa" * 512)
+    im.write_blk(4, b"\xbb" * 1024, num_blks=2)
+    im.flush()
+    assert im.read_blk(2) == b"\xaa" * 512
+    im.close()
+    # check file contents
+    with open(path, "rb") as fh:
+        data = fh.read()
+    assert data[2 * 512 : 3 * 512] == b"\xaa" * 512
+    assert data[4 * 512 : 6 * 512] == b"\xbb" * 1024
+
+
+def fs_blkdev_imagefile_mmap_view_test(tmpdir):
+    path = str(tmpdir / "test.img")
+    create_image(path)
+    im = ImageFile(path, read_only=True, use_mmap=True)
+    im.open()
+    blk = im.read_blk(1)
+    assert isinstance(blk, memoryview)
+    assert blk.readonly
+    # closing with a living view is fine
+    im.close()
+    assert blk[0] == 1
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def fs_blkdev_imagefile_write_range_test(tmpdir, use_mmap):
+    path = str(tmpdir / "test.img")
+    create_image(path)
+    im = ImageFile(path, use_mmap=use_mmap)
+    im.open()
+    # write crossing the end of the image
+    with pytest.raises(IOError):
+        im.write_blk(7, b"\xaa" * 1024, num_blks=2)
+    with pytest.raises(IOError):
+        im.write_blk(8, b"\xaa" * 512)
+    im.close()
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def fs_blkdev_imagefile_resize_test(tmpdir, use_mmap):
+    path = str(tmpdir / "test.img")
+    create_image(path)
+    im = ImageFile(path, use_mmap=use_mmap)
+    im.open()
+    im.resize(12)
+    assert im.is_mapped() == use_mmap
+    assert im.num_blocks == 12
+    im.write_blk(11, b"\xcc" * 512)
+    assert im.read_blk(11) == b"\xcc" * 512
+    im.create(4)
+    assert im.is_mapped() == use_mmap
+    assert im.num_blocks == 4
+    with pytest.raises(IOError):
+        im.read_blk(4)
+    im.close()
@@ -0,0 +1,113 @@
+from amitools.fs.blkdev.ADFBlockDevice import ADFBlockDevice
+from amitools.fs.block.BlockCache import BlockCache
+from amitools.fs.block.BlockFactory import BlockFactory
+from amitools.fs.block.Block import Block
+from amitools.fs.block.UserDirBlock import UserDirBlock
+from amitools.fs.block.FileHeaderBlock import FileHeaderBlock
+from amitools.fs.ADFSVolume import ADFSVolume
+from amitools.fs.FSString import FSString
+from amitools.fs import DosType
+
+
+class CountingADFBlockDevice(ADFBlockDevice):
+    """count the block reads"""
+
+    def __init__(self, *args, **kw_args):
+        ADFBlockDevice.__init__(self, *args, **kw_args)
+        self.num_reads = 0
+
+    def read_block(self, blk_num, num_blks=1):
+        self.num_reads += 1
+        return ADFBlockDevice.read_block(self, blk_num, num_blks)
+
+
+def create_volume(tmpdir, dos_type=DosType.DOS1):
+    blkdev = CountingADFBlockDevice(str(tmpdir / "test.adf"))
+    blkdev.create()
+    vol = ADFSVolume(blkdev)
+    vol.create(FSString("test"), dos_type=dos_type)
+    return vol
+
+
+class FakeBlock:
+    def __init__(self, blk_num):
+        self.blk_num = blk_num
+
+
+def fs_block_cache_lru_test():
+    cache = BlockCache(capacity=2)
+    a, b, c = FakeBlock(1), FakeBlock(2), FakeBlock(3)
+    cache.put(a)
+    cache.put(b)
+    assert cache.get(1) is a
+    cache.put(c)
+    # b was least recently used
+    assert cache.get(2) is None
+    assert cache.get(1) is a
+    assert cache.get(3) is c
+    assert cache.get(3, UserDirBlock) is None
+    assert cache.get_stats() == {"hits": 3, "misses": 2, "cached": 2}
+    cache.invalidate_n([1, 3, 5])
+    assert len(cache) == 0
+
+
+def fs_block_cache_path_test(tmpdir):
+    vol = create_volume(tmpdir)
+    path = "dir0"
+    vol.create_dir(FSString(path))
+    for i in range(1, 8):
+        path += "/dir%d" % i
+        vol.create_dir(FSString(path))
+    path += "/"
+    vol.write_file(b"hello", FSString(path + "file"))
+    vol.close()
+    # re-open volume: first lookup reads the blocks
+    vol = ADFSVolume(vol.blkdev)
+    vol.open()
+    node = vol.get_path_name(FSString(path + "file"))
+    assert isinstance(node.block, FileHeaderBlock)
+    vol.get_root_dir().flush()
+    # second lookup is served from the block cache
+    reads = vol.blkdev.num_reads
+    hits = vol.block_cache.num_hits
+    node2 = vol.get_path_name(FSString(path + "file"))
+    assert vol.blkdev.num_reads == reads
+    assert vol.block_cache.num_hits - hits == 9
+    assert node2.block is node.block
+    assert node2.get_file_data() == b"hello"
+
+
+def fs_block_cache_reuse_test(tmpdir):
+    vol = create_volume(tmpdir, DosType.DOS0)
+    for i in range(10):
+        vol.create_dir(FSString("dir%d" % i))
+    vol.get_root_dir().flush()
+    vol.get_path_name(FSString("dir5"))
+    for i in range(10):
+        vol.delete(FSString("dir%d" % i))
+    assert len(vol.block_cache) == 0
+    # reuse the blocks as OFS data blocks
+    data = bytes(x % 256 for x in range(20 * 488))
+    vol.write_file(data, FSString("file"))
+    vol.get_root_dir().flush()
+    assert vol.read_file(FSString("file")) == data
+    # re-open and compare
+    vol2 = ADFSVolume(vol.blkdev)
+    vol2.open()
+    assert vol2.read_file(FSString("file")) == data
+    assert [n.name.get_name() for n in vol2.get_root_dir().get_entries()] == [
+        FSString("file")
+    ]
+
+
+def fs_block_cache_factory_test(tmpdir):
+    vol = create_volume(tmpdir)
+    vol.create_dir(FSString("foo"))
+    node = vol.get_path_name(FSString("foo"))
+    blk = Block(vol.blkdev, node.block.blk_num)
+    blk.read()
+    dec_blk = BlockFactory.create_specific_block(blk, vol.block_cache)
+    assert dec_blk is node.block
+    dec_blk = BlockFactory.create_specific_block(blk)
+    assert dec_blk is not node.block
+    assert isinstance(dec_blk, UserDirBlock)
@@ -0,0 +1,60 @@
+import os
+import struct
+from amitools.fs.block import BlockChecksum
+
+
+def ref_chksum(data, chk_loc):
+    chksum = 0
+    for i in range(len(data) // 4):
+        if i != chk_loc:
+            chksum += struct.unpack_from(">I", data, i * 4)[0]
+    return (-chksum) & 0xFFFFFFFF
+
+
+def ref_boot_chksum(data):
+    chksum = 0
+    for i in range(len(data) // 4):
+        if i != 1:
+            chksum += struct.unpack_from(">I", data, i * 4)[0]
+            if chksum > 0xFFFFFFFF:
+                chksum += 1
+                chksum &= 0xFFFFFFFF
+    return (~chksum) & 0xFFFFFFFF
+
+
+def fs_block_chksum_calc_test():
+    data = bytearray(os.urandom(512))
+    for chk_loc in (0, 2, 5):
+        chksum = BlockChecksum.calc_chksum(data, chk_loc)
+        assert chksum == ref_chksum(data, chk_loc)
+        struct.pack_into(">I", data, chk_loc * 4, chksum)
+        assert BlockChecksum.is_valid_chksum(data)
+
+
+def fs_block_chksum_offset_test():
+    data = bytearray(os.urandom(1024))
+    chksum = BlockChecksum.calc_chksum(data, 5, num_longs=128, offset=512)
+    assert chksum == ref_chksum(data[512:], 5)
+
+
+def fs_block_chksum_bulk_test():
+    num = 16
+    data = bytearray(os.urandom(512 * num))
+    # fix checksum in every other block
+    for i in range(0, num, 2):
+        off = i * 512
+        chksum = ref_chksum(data[off : off + 512], 5)
+        struct.pack_into(">I", data, off + 20, chksum)
+    chksums = BlockChecksum.calc_chksums(data, 512, 5)
+    assert chksums == [ref_chksum(data[i * 512 : (i + 1) * 512], 5) for i in range(num)]
+    valid = BlockChecksum.verify_chksums(data, 512)
+    assert valid[0::2] == [True] * (num // 2)
+    assert valid[1::2] == [False] * (num // 2)
+
+
+def fs_block_chksum_boot_test():
+    for _ in range(8):
+        data = os.urandom(1024)
+        assert BlockChecksum.calc_boot_chksum(data) == ref_boot_chksum(data)
+    data = b"\xff" * 1024
+    assert BlockChecksum.calc_boot_chksum(data) == ref_boot_chksum(data)
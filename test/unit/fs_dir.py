@@ -0,0 +1,101 @@
+import pytest
+from amitools.fs.blkdev.ADFBlockDevice import ADFBlockDevice
+from amitools.fs.ADFSVolume import ADFSVolume
+from amitools.fs.FSString import FSString
+from amitools.fs import DosType
+from amitools.fs.validate.Validator import Validator
+from amitools.fs.validate.Log import Log
+
+
+class CountingBlockDevice(ADFBlockDevice):
+    def __init__(self, *args, **kw_args):
+        ADFBlockDevice.__init__(self, *args, **kw_args)
+        self.num_reads = 0
+
+    def read_block(self, blk_num, num_blks=1):
+        self.num_reads += 1
+        return ADFBlockDevice.read_block(self, blk_num, num_blks)
+
+
+def create_volume(tmpdir, dos_type, num_files=300):
+    blkdev = CountingBlockDevice(str(tmpdir / "test.adf"))
+    blkdev.create()
+    vol = ADFSVolume(blkdev)
+    vol.create(FSString("test"), dos_type=dos_type)
+    vol.create_dir(FSString("dir"))
+    for i in range(num_files):
+        vol.write_file(b"%d" % i, FSString("dir/file%d" % i))
+    return vol
+
+
+def reopen_volume(vol):
+    vol.close()
+    vol2 = ADFSVolume(vol.blkdev)
+    vol2.open()
+    vol.blkdev.num_reads = 0
+    return vol2
+
+
+def get_names(node):
+    return sorted(e.name.get_unicode_name() for e in node.get_entries())
+
+
+dos_types = [DosType.DOS0, DosType.DOS1, DosType.DOS3, DosType.DOS5]
+
+
+@pytest.mark.parametrize("dos_type", dos_types)
+def fs_dir_get_path_lazy_test(tmpdir, dos_type):
+    vol = create_volume(tmpdir, dos_type)
+    vol = reopen_volume(vol)
+    node = vol.get_path_name(FSString("DIR/File123"))
+    assert node is not None
+    assert node.name.get_unicode_name() == "file123"
+    assert node.get_file_data() == b"123"
+    # only the hash chains of the path were read, not the 300 entries
+    assert vol.blkdev.num_reads < 20
+    assert vol.get_path_name(FSString("dir/file300")) is None
+    assert vol.get_path_name(FSString("dir/file123/foo")) is None
+    assert vol.get_path_name(FSString("dir/file123"), allow_file=False) is None
+    assert vol.get_path_name(FSString("dir"), allow_dir=False) is None
+    # a full read keeps the lazy nodes
+    parent = node.parent
+    entries = parent.get_entries()
+    assert len(entries) == 300
+    assert node in entries
+    assert vol.get_path_name(FSString("dir/file123")) is node
+
+
+@pytest.mark.parametrize("dos_type", dos_types)
+def fs_dir_lazy_modify_test(tmpdir, dos_type):
+    vol = create_volume(tmpdir, dos_type)
+    vol = reopen_volume(vol)
+    names = ["file%d" % i for i in range(300)]
+    # delete and create without reading the whole dir
+    vol.delete(FSString("dir/file7"))
+    names.remove("file7")
+    vol.write_file(b"new", FSString("dir/new"))
+    names.append("new")
+    vol.get_path_name(FSString("dir/file8")).change_protect(0x0F)
+    assert vol.blkdev.num_reads < 50
+    # entries are consistent
+    node = vol.get_path_name(FSString("dir"))
+    assert get_names(node) == sorted(names)
+    vol.write_file(b"new2", FSString("dir/new2"))
+    names.append("new2")
+    assert get_names(node) == sorted(names)
+    # re-read from disk
+    vol = reopen_volume(vol)
+    node = vol.get_path_name(FSString("dir"))
+    assert get_names(node) == sorted(names)
+    assert vol.read_file(FSString("dir/new")) == b"new"
+    meta_info = vol.get_path_name(FSString("dir/file8")).get_meta_info()
+    assert meta_info.get_protect() == 0x0F
+    # validator reports bitmap errors for dircache volumes
+    if not DosType.is_dircache(dos_type):
+        v = Validator(vol.blkdev, min_level=Log.WARN)
+        assert v.scan_boot()[0]
+        assert v.scan_root()
+        v.scan_dir_tree()
+        v.scan_files()
+        v.scan_bitmap()
+        assert v.get_summary() == (0, 0)
@@ -0,0 +1,178 @@
+import pytest
+from amitools.fs.blkdev.ADFBlockDevice import ADFBlockDevice
+from amitools.fs.ADFSVolume import ADFSVolume
+from amitools.fs.FSString import FSString
+from amitools.fs.FSError import FSError
+from amitools.fs.block.FileDataBlock import FileDataBlock
+from amitools.fs import DosType
+from amitools.fs.validate.Validator import Validator
+from amitools.fs.validate.Log import Log
+
+
+def create_volume(tmpdir, dos_type):
+    blkdev = ADFBlockDevice(str(tmpdir / "test.adf"))
+    blkdev.create()
+    vol = ADFSVolume(blkdev)
+    vol.create(FSString("test"), dos_type=dos_type)
+    return vol
+
+
+def fs_file_extents_test(tmpdir):
+    vol = create_volume(tmpdir, DosType.DOS1)
+    data = bytes(x % 256 for x in range(40000))
+    vol.write_file(data, FSString("foo"))
+    node = vol.get_path_name(FSString("foo"))
+    extents = node.get_data_extents()
+    assert sum(n for _, n in extents) == len(node.data_blk_nums)
+    blks = []
+    for first, num in extents:
+        blks += list(range(first, first + num))
+    assert blks == node.data_blk_nums
+    # limit extent size
+    extents = node.get_data_extents(max_blks=4)
+    assert max(n for _, n in extents) <= 4
+    assert sum(n for _, n in extents) == len(node.data_blk_nums)
+
+
+@pytest.mark.parametrize("dos_type", [DosType.DOS0, DosType.DOS1])
+@pytest.mark.parametrize("size", [0, 1, 488, 512, 513, 40000])
+def fs_file_read_test(tmpdir, dos_type, size):
+    vol = create_volume(tmpdir, dos_type)
+    data = bytes(x % 253 for x in range(size))
+    vol.write_file(data, FSString("foo"))
+    # fragment free space and write a second file
+    vol.write_file(b"a" * 2000, FSString("bar"))
+    vol.delete(FSString("foo"))
+    vol.write_file(b"b" * 100, FSString("baz"))
+    vol.write_file(data, FSString("foo"))
+    # re-open volume
+    vol2 = ADFSVolume(vol.blkdev)
+    vol2.open()
+    assert vol2.read_file(FSString("foo")) == data
+
+
+def validate_volume(vol):
+    v = Validator(vol.blkdev, min_level=Log.WARN)
+    assert v.scan_boot()[0]
+    assert v.scan_root()
+    v.scan_dir_tree()
+    v.scan_files()
+    v.scan_bitmap()
+    assert v.get_summary() == (0, 0)
+
+
+@pytest.mark.parametrize(
+    "dos_type", [DosType.DOS0, DosType.DOS1, DosType.DOS4, DosType.DOS5]
+)
+@pytest.mark.parametrize("size", [0, 1, 488, 512, 513, 40000, 200000])
+@pytest.mark.parametrize("use_hint", [True, False])
+def fs_file_stream_write_test(tmpdir, dos_type, size, use_hint):
+    vol = create_volume(tmpdir, dos_type)
+    data = bytes(x % 251 for x in range(size))
+    size_hint = size if use_hint else None
+    free = vol.bitmap.get_num_free()
+    with vol.open_write_file(FSString("foo"), size_hint=size_hint) as writer:
+        # write in odd sized pieces
+        for off in range(0, size, 1000):
+            writer.write(data[off : off + 1000])
+        assert writer.tell() == size
+    # same blocks used as a regular write
+    used = free - vol.bitmap.get_num_free()
+    vol.write_file(data, FSString("bar"))
+    assert free - vol.bitmap.get_num_free() == 2 * used
+    # re-open volume
+    vol.close()
+    vol2 = ADFSVolume(vol.blkdev)
+    vol2.open()
+    assert vol2.read_file(FSString("foo")) == data
+    node = vol2.get_path_name(FSString("foo"))
+    assert node.get_size() == size
+    # validator does not know about dircache blocks
+    if not DosType.is_dircache(dos_type):
+        validate_volume(vol2)
+
+
+@pytest.mark.parametrize("dos_type", [DosType.DOS0, DosType.DOS1])
+def fs_file_stream_write_no_space_test(tmpdir, dos_type):
+    vol = create_volume(tmpdir, dos_type)
+    vol.write_file(b"a" * 300000, FSString("big"))
+    free = vol.bitmap.get_num_free()
+    # known size is rejected before the file is created
+    with pytest.raises(FSError):
+        vol.open_write_file(FSString("foo"), size_hint=1000000)
+    assert vol.get_path_name(FSString("foo")) is None
+    assert vol.bitmap.get_num_free() == free
+    # unknown size fails while writing
+    data = b"b" * 1000
+    with pytest.raises(FSError):
+        with vol.open_write_file(FSString("foo")) as writer:
+            for _ in range(1000):
+                writer.write(data)
+    assert vol.get_path_name(FSString("foo")) is None
+    assert vol.bitmap.get_num_free() == free
+    vol.close()
+    vol2 = ADFSVolume(vol.blkdev)
+    vol2.open()
+    assert vol2.bitmap.get_num_free() == free
+    validate_volume(vol2)
+
+
+@pytest.mark.parametrize("dos_type", [DosType.DOS0, DosType.DOS1])
+def fs_file_stream_write_closed_test(tmpdir, dos_type):
+    vol = create_volume(tmpdir, dos_type)
+    with vol.open_write_file(FSString("foo")) as writer:
+        writer.write(b"hello")
+    with pytest.raises(ValueError):
+        writer.write(b"world")
+    assert vol.read_file(FSString("foo")) == b"hello"
+
+
+@pytest.mark.parametrize("dos_type", [DosType.DOS0, DosType.DOS1])
+def fs_file_read_size_mismatch_test(tmpdir, dos_type):
+    vol = create_volume(tmpdir, dos_type)
+    data = bytes(x % 253 for x in range(5120))
+    vol.write_file(data, FSString("foo"))
+    node = vol.get_path_name(FSString("foo"))
+    blk_num = node.data_blk_nums[0]
+    if DosType.is_ffs(dos_type):
+        # drop the last data block from the header
+        node.update_blk_lists(node.data_blk_nums[:-1], [], len(data))
+    else:
+        # cut the first data block
+        blk = FileDataBlock(vol.blkdev, blk_num)
+        blk.read()
+        blk.contents = blk.get_block_data()[:100]
+        blk.data_size = 100
+        blk.write()
+    node.flush()
+    with pytest.raises(FSError):
+        node.get_file_data()
+    with pytest.raises(FSError):
+        with node.open_read() as reader:
+            reader.read()
+
+
+@pytest.mark.parametrize("dos_type", [DosType.DOS0, DosType.DOS1])
+@pytest.mark.parametrize("size", [0, 1, 488, 512, 513, 40000])
+def fs_file_stream_read_test(tmpdir, dos_type, size):
+    vol = create_volume(tmpdir, dos_type)
+    data = bytes(x % 253 for x in range(size))
+    vol.write_file(data, FSString("foo"))
+    # read all
+    with vol.open_read_file(FSString("foo")) as reader:
+        assert reader.read() == data
+        assert reader.tell() == size
+        assert reader.read() == b""
+    # read in pieces
+    result = b""
+    with vol.open_read_file(FSString("foo")) as reader:
+        while True:
+            piece = reader.read(100)
+            if not piece:
+                break
+            result += piece
+    assert result == data
+    # iterate chunks
+    node = vol.get_path_name(FSString("foo"))
+    with node.open_read(max_blks=2) as reader:
+        assert b"".join(reader) == data
@@ -0,0 +1,226 @@
+import struct
+import pytest
+from amitools.fs.blkdev.ADFBlockDevice import ADFBlockDevice
+from amitools.fs.ADFSVolume import ADFSVolume
+from amitools.fs.FSString import FSString
+from amitools.fs import DosType
+from amitools.fs.validate.Validator import Validator
+from amitools.fs.validate.BlockScan import BlockScan
+from amitools.fs.validate.Log import Log
+from amitools.fs.validate.ValidateCache import ValidateCache
+
+
+def create_volume(tmpdir, dos_type=DosType.DOS0):
+    blkdev = ADFBlockDevice(str(tmpdir / "test.adf"))
+    blkdev.create()
+    vol = ADFSVolume(blkdev)
+    vol.create(FSString("test"), dos_type=dos_type)
+    vol.create_dir(FSString("dir"))
+    vol.write_file(b"hello" * 200, FSString("dir/file"))
+    vol.write_file(b"world", FSString("foo"))
+    vol.close()
+    return vol
+
+
+def validate(blkdev, level=Log.WARN):
+    v = Validator(blkdev, min_level=level)
+    assert v.scan_boot()[0]
+    assert v.scan_root()
+    v.scan_dir_tree()
+    v.scan_files()
+    v.scan_bitmap()
+    return v
+
+
+class FailBlockDevice:
+    """wrap a block device and fail reading some blocks"""
+
+    def __init__(self, blkdev, bad_blks):
+        self.blkdev = blkdev
+        self.bad_blks = bad_blks
+        self.num_reads = 0
+
+    def __getattr__(self, name):
+        return getattr(self.blkdev, name)
+
+    def read_block(self, blk_num, num_blks=1):
+        self.num_reads += 1
+        for b in self.bad_blks:
+            if blk_num <= b < blk_num + num_blks:
+                raise IOError("bad block")
+        return self.blkdev.read_block(blk_num, num_blks)
+
+
+def fs_validate_block_scan_test(tmpdir):
+    vol = create_volume(tmpdir)
+    blkdev = vol.blkdev
+    log = Log(Log.DEBUG)
+    bs = BlockScan(blkdev, log, vol.boot.dos_type)
+    bs.scan_blocks()
+    assert bs.get_num_blocks_of_status(BlockScan.BS_NOT_SCANNED) == blkdev.reserved
+    assert bs.get_num_blocks_of_type(BlockScan.BT_ROOT) == 1
+    assert bs.get_num_blocks_of_type(BlockScan.BT_DIR) == 1
+    assert bs.get_num_blocks_of_type(BlockScan.BT_FILE_HDR) == 2
+    # OFS data blocks: 1000 bytes and 5 bytes
+    assert bs.get_num_blocks_of_type(BlockScan.BT_FILE_DATA) == 4
+    assert bs.any_chance_of_fs()
+    root_blk = vol.root.blk_num
+    assert bs.get_block_type(root_blk) == BlockScan.BT_ROOT
+    # only typed blocks keep details
+    assert sorted(bs.blk_infos) == sorted(
+        bi.blk_num for t in range(BlockScan.NUM_BT) for bi in bs.get_blocks_of_type(t)
+    )
+    (dir_bi,) = bs.get_blocks_of_type(BlockScan.BT_DIR)
+    assert dir_bi.name == FSString("dir")
+    assert dir_bi.parent_blk == root_blk
+    # nothing was used yet
+    assert not bs.is_block_available(root_blk)
+    assert bs.get_block(root_blk).blk_type == BlockScan.BT_ROOT
+    assert bs.is_block_available(root_blk)
+    # out of range
+    assert bs.get_block(blkdev.num_blocks) is None
+    assert bs.get_block_type(-1) is None
+    assert not bs.use_block(blkdev.num_blocks)
+    # the own keys are valid
+    assert bs.scan_all()
+    assert log.get_num_level(Log.ERROR) == 0
+
+
+def fs_validate_block_scan_lazy_test(tmpdir):
+    vol = create_volume(tmpdir)
+    blkdev = FailBlockDevice(vol.blkdev, [])
+    bs = BlockScan(blkdev, Log(Log.DEBUG), vol.boot.dos_type)
+    root_blk = vol.root.blk_num
+    run = BlockScan.RUN_BLOCKS
+    # the bitmap is decoded before its run is scanned
+    bm_blk = vol.root.bitmap_ptrs[0]
+    assert bm_blk // run == root_blk // run
+    assert bs.read_block(bm_blk, is_bm=True).blk_type == BlockScan.BT_BITMAP
+    blkdev.num_reads = 0
+    # the run around a queried block is scanned on demand
+    bi = bs.get_block(root_blk)
+    assert bi.blk_type == BlockScan.BT_ROOT
+    assert blkdev.num_reads == 1
+    assert bs.get_block_type(bm_blk) == BlockScan.BT_BITMAP
+    # empty block has a valid checksum but no type
+    assert bs.get_block_status(root_blk - 1) == BlockScan.BS_VALID
+    assert blkdev.num_reads == 1
+    num_blocks = vol.blkdev.num_blocks
+    assert bs.get_num_blocks_of_status(BlockScan.BS_NOT_SCANNED) == num_blocks - run
+    # reserved blocks are scanned one by one
+    bs.get_block_status(0)
+    assert blkdev.num_reads == 2
+    assert bs.get_num_blocks_of_status(BlockScan.BS_NOT_SCANNED) == (
+        num_blocks - run - 1
+    )
+    # full scan skips scanned blocks
+    bs.scan_blocks()
+    assert bs.get_num_blocks_of_status(BlockScan.BS_NOT_SCANNED) == 1
+    assert bs.get_block(root_blk) is bi
+    assert bs.get_block_type(bm_blk) == BlockScan.BT_BITMAP
+
+
+def fs_validate_block_scan_read_error_test(tmpdir):
+    vol = create_volume(tmpdir)
+    bad_blk = 1000
+    blkdev = FailBlockDevice(vol.blkdev, [bad_blk])
+    log = Log(Log.DEBUG)
+    bs = BlockScan(blkdev, log, vol.boot.dos_type)
+    bs.scan_blocks()
+    assert bs.get_block_status(bad_blk) == BlockScan.BS_READ_ERROR
+    assert bs.get_num_blocks_of_status(BlockScan.BS_READ_ERROR) == 1
+    assert bs.get_num_blocks_of_type(BlockScan.BT_FILE_HDR) == 2
+    assert log.get_num_level(Log.ERROR) == 1
+
+
+def fs_validate_free_bits_test(tmpdir):
+    vol = create_volume(tmpdir)
+    bs = BlockScan(vol.blkdev, Log(Log.DEBUG), vol.boot.dos_type)
+    assert bs.get_free_bits(0) == 0xFFFFFFFF
+    for b in (2, 3, 33):
+        bs.use_block(b)
+    assert bs.get_free_bits(0) == 0xFFFFFFF3
+    assert bs.get_free_bits(32) == 0xFFFFFFFD
+    # blocks beyond the volume are free
+    last = vol.blkdev.num_blocks - 8
+    bs.use_block(last)
+    assert bs.get_free_bits(last) == 0xFFFFFFFE
+
+
+@pytest.mark.parametrize("dos_type", [DosType.DOS0, DosType.DOS1])
+def fs_validate_ok_test(tmpdir, dos_type):
+    vol = create_volume(tmpdir, dos_type)
+    v = validate(vol.blkdev)
+    assert v.get_summary() == (0, 0)
+    assert len(v.dir_scan.get_all_dir_infos()) == 2
+    assert len(v.dir_scan.get_all_file_hdr_blk_infos()) == 2
+
+
+def fs_validate_data_block_errors_test(tmpdir):
+    vol = create_volume(tmpdir)
+    node = vol.get_path_name(FSString("foo"))
+    hdr_blk = node.block.blk_num
+    data_blk = node.data_blk_nums[0]
+    # ofs data block refers to wrong header
+    blkdev = vol.blkdev
+    data = bytearray(blkdev.read_block(data_blk))
+    struct.pack_into(">I", data, 4, hdr_blk + 1)
+    chksum = struct.unpack_from(">I", data, 20)[0]
+    struct.pack_into(">I", data, 20, (chksum - 1) & 0xFFFFFFFF)
+    blkdev.write_block(data_blk, data)
+    v = validate(blkdev)
+    assert v.get_summary() == (1, 0)
+    assert "does not ref header" in v.log.entries[0].msg
+
+
+def fs_validate_cache_test(tmpdir):
+    img = tmpdir / "test.adf"
+    img.write_binary(bytes(ValidateCache.REGION_SIZE * 3))
+    cache_dir = str(tmpdir / "cache")
+    cache = ValidateCache(cache_dir)
+    path = str(img)
+    assert cache.lookup(path, 2) is None
+    cache.store(path, 2, "ok", ["a", "b"])
+    entry = cache.lookup(path, 2)
+    assert entry.result == "ok"
+    assert entry.lines == ["a", "b"]
+    # other level or debug output needs a new scan
+    assert cache.lookup(path, 1) is None
+    assert cache.lookup(path, 2, debug=True) is None
+    cache.close()
+    # modified region
+    data = bytearray(img.read_binary())
+    data[ValidateCache.REGION_SIZE + 1] = 1
+    img.write_binary(bytes(data))
+    img.setmtime(img.mtime() + 10)
+    cache = ValidateCache(cache_dir)
+    assert cache.lookup(path, 2) is None
+    assert cache.num_changed == 1
+    assert cache.num_changed_regions == 1
+    cache.store(path, 2, "NOK", [])
+    assert cache.lookup(path, 2).result == "NOK"
+    assert (cache.num_hits, cache.num_new) == (1, 0)
+    cache.close()
+
+
+def fs_validate_cache_snapshot_test(tmpdir, monkeypatch):
+    img = tmpdir / "test.adf"
+    img.write_binary(bytes(ValidateCache.REGION_SIZE * 2))
+    path = str(img)
+    cache = ValidateCache(str(tmpdir / "cache"))
+    hashed = []
+    hash_file = cache.hash_file
+    monkeypatch.setattr(cache, "hash_file", lambda p: hashed.append(p) or hash_file(p))
+    # a new image is hashed once before validation
+    assert cache.lookup(path, 2) is None
+    assert hashed == [path]
+    # modified while validating
+    img.write_binary(b"\1" * ValidateCache.REGION_SIZE * 2)
+    img.setmtime(img.mtime() + 10)
+    cache.store(path, 2, "ok", [])
+    assert hashed == [path]
+    # the old verdict is not used for the new contents
+    assert cache.lookup(path, 2) is None
+    assert cache.num_changed == 1
+    assert cache.num_changed_regions == 2
+    cache.close()
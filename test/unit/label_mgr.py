@@ -0,0 +1,100 @@
+import random
+from amitools.vamos.label import LabelManager, LabelRange
+
+
+class RefLabelManager:
+    """straight forward list based reference"""
+
+    def __init__(self):
+        self.labels = []
+
+    def add_label(self, r):
+        self.labels.append(r)
+
+    def remove_label(self, r):
+        self.labels.remove(r)
+
+    def delete_labels_within(self, addr, size):
+        self.labels = [
+            r
+            for r in self.labels
+            if not (r.addr >= addr and r.addr + r.size <= addr + size)
+        ]
+
+    def get_label(self, addr):
+        for r in self.labels:
+            if r.is_inside(addr):
+                return r
+
+    def get_intersecting_labels(self, addr, size):
+        return [r for r in self.labels if r.does_intersect(addr, size)]
+
+
+def label_mgr_basic_test():
+    lm = LabelManager()
+    a = LabelRange("a", 0x100, 0x100)
+    b = LabelRange("b", 0x300, 0x10)
+    c = LabelRange("c", 0x200, 0x100)
+    for r in (a, b, c):
+        lm.add_label(r)
+    assert lm.get_all_labels() == [a, b, c]
+    assert lm.get_label(0xFF) is None
+    assert lm.get_label(0x100) is a
+    assert lm.get_label(0x2FF) is c
+    assert lm.get_label(0x310) is None
+    assert lm.get_label_offset(0x304) == (b, 4)
+    assert lm.get_intersecting_labels(0x1F0, 0x20) == [a, c]
+    lm.remove_label(c)
+    assert lm.get_label(0x2FF) is None
+    lm.delete_labels_within(0, 0x1000)
+    assert lm.get_all_labels() == []
+
+
+def label_mgr_nested_test():
+    lm = LabelManager()
+    # a puddle with labels inside: the first label added wins
+    puddle = LabelRange("puddle", 0x1000, 0x1000)
+    lm.add_label(puddle)
+    inner = [LabelRange("inner%d" % i, 0x1000 + i * 0x100, 0x80) for i in range(16)]
+    for r in inner:
+        lm.add_label(r)
+    assert lm.get_label(0x1010) is puddle
+    assert lm.get_label(0x1F90) is puddle
+    lm.remove_label(puddle)
+    assert lm.get_label(0x1010) is inner[0]
+    assert lm.get_label(0x1F90) is None
+    lm.delete_labels_within(0x1000, 0x1000)
+    assert lm.get_all_labels() == []
+
+
+def label_mgr_random_test():
+    rnd = random.Random(42)
+    lm = LabelManager()
+    ref = RefLabelManager()
+    for i in range(3000):
+        op = rnd.random()
+        if op < 0.5 or not ref.labels:
+            addr = rnd.randrange(0, 0x10000, 4)
+            r = LabelRange("l%d" % i, addr, rnd.randrange(0, 0x400))
+            lm.add_label(r)
+            ref.add_label(r)
+        elif op < 0.7:
+            r = rnd.choice(ref.labels)
+            lm.remove_label(r)
+            ref.remove_label(r)
+        elif op < 0.75:
+            addr = rnd.randrange(0, 0x10000)
+            size = rnd.randrange(0, 0x1000)
+            lm.delete_labels_within(addr, size)
+            ref.delete_labels_within(addr, size)
+        elif op < 0.8:
+            addr = rnd.randrange(0, 0x10000)
+            size = rnd.randrange(0, 0x400)
+            got = lm.get_intersecting_labels(addr, size)
+            assert got == ref.get_intersecting_labels(addr, size)
+        else:
+            addr = rnd.randrange(0, 0x10400)
+            assert lm.get_label(addr) is ref.get_label(addr)
+    assert lm.get_all_labels() == ref.labels
+    # max ends are consistent
+    assert lm.max_ends == [max(lm.ends[: i + 1]) for i in range(len(lm.ends))]
@@ -0,0 +1,126 @@
+import io
+import pytest
+from amitools.vamos.machine import MockMachine
+from amitools.vamos.machine.regs import *
+from amitools.vamos.libcore import LibCtx
+from amitools.vamos.lib.ExecLibrary import ExecLibrary
+from amitools.vamos.lib.DosLibrary import DosLibrary
+from amitools.vamos.lib.dos.FileHandle import FileHandle
+
+
+class FileMgrMock:
+    def __init__(self, fh):
+        self.fh = fh
+
+    def get_by_b_addr(self, b_addr, for_writing=None):
+        assert b_addr == 42
+        return self.fh
+
+
+class FailIO(io.BytesIO):
+    def read(self, size=-1):
+        raise IOError("read failed")
+
+    def write(self, data):
+        raise IOError("write failed")
+
+
+def setup_dos(obj):
+    ctx = LibCtx(MockMachine())
+    dos = DosLibrary()
+    fh = FileHandle(obj, "test", "/test", need_close=False)
+    dos.file_mgr = FileMgrMock(fh)
+    return ctx, dos
+
+
+def set_regs(ctx, regs):
+    for reg, val in regs.items():
+        ctx.cpu.w_reg(reg, val)
+
+
+@pytest.mark.parametrize("func", ["CopyMem", "CopyMemQuick"])
+@pytest.mark.parametrize("delta", [-6, -1, 0, 1, 6, 100])
+def lib_blockio_copymem_test(func, delta):
+    ctx = LibCtx(MockMachine())
+    mem = ctx.mem
+    data = bytes(range(64))
+    src = 0x1000
+    dst = src + delta
+    mem.w_block(src, data)
+    set_regs(ctx, {REG_A0: src, REG_A1: dst, REG_D0: len(data)})
+    getattr(ExecLibrary(), func)(ctx)
+    # overlapping blocks are moved
+    assert mem.r_block(dst, len(data)) == data
+
+
+def lib_blockio_copymem_empty_test():
+    ctx = LibCtx(MockMachine())
+    mem = ctx.mem
+    mem.w_block(0x1000, b"abcd")
+    set_regs(ctx, {REG_A0: 0x1000, REG_A1: 0x1002, REG_D0: 0})
+    ExecLibrary().CopyMem(ctx)
+    assert mem.r_block(0x1000, 4) == b"abcd"
+
+
+def lib_blockio_read_test():
+    ctx, dos = setup_dos(io.BytesIO(b"hello, world!"))
+    set_regs(ctx, {REG_D1: 42, REG_D2: 0x1000, REG_D3: 5})
+    assert dos.Read(ctx) == 5
+    assert ctx.mem.r_block(0x1000, 5) == b"hello"
+    # short read at end of file
+    set_regs(ctx, {REG_D1: 42, REG_D2: 0x2000, REG_D3: 100})
+    assert dos.Read(ctx) == 8
+    assert ctx.mem.r_block(0x2000, 8) == b", world!"
+    # eof
+    assert dos.Read(ctx) == 0
+
+
+def lib_blockio_read_error_test():
+    ctx, dos = setup_dos(FailIO())
+    set_regs(ctx, {REG_D1: 42, REG_D2: 0x1000, REG_D3: 5})
+    assert dos.Read(ctx) == -1
+
+
+def lib_blockio_write_test():
+    obj = io.BytesIO()
+    ctx, dos = setup_dos(obj)
+    ctx.mem.w_block(0x1000, b"hello")
+    set_regs(ctx, {REG_D1: 42, REG_D2: 0x1000, REG_D3: 5})
+    assert dos.Write(ctx) == 5
+    assert obj.getvalue() == b"hello"
+    # error
+    ctx, dos = setup_dos(FailIO())
+    set_regs(ctx, {REG_D1: 42, REG_D2: 0x1000, REG_D3: 5})
+    assert dos.Write(ctx) == -1
+
+
+def lib_blockio_fread_test():
+    ctx, dos = setup_dos(io.BytesIO(b"0123456789"))
+    # only complete blocks are counted
+    set_regs(ctx, {REG_D1: 42, REG_D2: 0x1000, REG_D3: 4, REG_D4: 3})
+    assert dos.FRead(ctx) == 2
+    assert ctx.mem.r_block(0x1000, 10) == b"0123456789"
+    # zero sized blocks
+    set_regs(ctx, {REG_D1: 42, REG_D2: 0x1000, REG_D3: 0, REG_D4: 3})
+    assert dos.FRead(ctx) == 0
+    # error
+    ctx, dos = setup_dos(FailIO())
+    set_regs(ctx, {REG_D1: 42, REG_D2: 0x1000, REG_D3: 4, REG_D4: 3})
+    assert dos.FRead(ctx) == 0
+
+
+def lib_blockio_fwrite_test():
+    obj = io.BytesIO()
+    ctx, dos = setup_dos(obj)
+    ctx.mem.w_block(0x1000, b"0123456789ab")
+    set_regs(ctx, {REG_D1: 42, REG_D2: 0x1000, REG_D3: 4, REG_D4: 3})
+    assert dos.FWrite(ctx) == 3
+    assert obj.getvalue() == b"0123456789ab"
+    # zero sized blocks
+    set_regs(ctx, {REG_D1: 42, REG_D2: 0x1000, REG_D3: 4, REG_D4: 0})
+    assert dos.FWrite(ctx) == 0
+    assert obj.getvalue() == b"0123456789ab"
+    # error
+    ctx, dos = setup_dos(FailIO())
+    set_regs(ctx, {REG_D1: 42, REG_D2: 0x1000, REG_D3: 4, REG_D4: 3})
+    assert dos.FWrite(ctx) == 0
@@ -0,0 +1,193 @@
+import pytest
+from amitools.vamos.machine import Machine
+from amitools.vamos.mem import MemoryAlloc
+from amitools.vamos.libcore import LibCtx
+from amitools.vamos.lib.lexec.RawDoFmt import (
+    RawDoFmt,
+    raw_do_fmt,
+    find_put_proc,
+    put_proc_idioms,
+)
+from amitools.vamos.lib.dos.Printf import (
+    printf,
+    printf_parse_cached,
+    printf_read_data,
+    printf_generate_output,
+)
+
+PROC_ADDR = 0x1000
+FMT_ADDR = 0x1100
+ARGS_ADDR = 0x1200
+DATA_ADDR = 0x1300
+BUF_ADDR = 0x1400
+
+
+def setup_ctx():
+    machine = Machine()
+    ctx = LibCtx(machine)
+    ctx.alloc = MemoryAlloc.for_machine(machine)
+    return ctx
+
+
+def setup_fmt(ctx, fmt="a=%ld s=%s!", args=(42, 0x1180)):
+    mem = ctx.mem
+    mem.w_cstr(FMT_ADDR, fmt)
+    mem.w_cstr(0x1180, "hello")
+    for i, arg in enumerate(args):
+        mem.w32(ARGS_ADDR + i * 4, arg)
+
+
+def call_from_prog(ctx, func):
+    """call func from a trap like a library function"""
+    machine = ctx.machine
+    res = []
+    addr = machine.setup_quick_trap(lambda op, pc: res.append(func()))
+    rs = machine.run(addr, machine.get_scratch_top())
+    assert rs.error is None
+    return res[0]
+
+
+def run_fmt(ctx, code, put_data, chunk_size=1024):
+    ctx.mem.w_block(PROC_ADDR, code)
+    rdf = RawDoFmt(ctx.alloc, chunk_size)
+    res = call_from_prog(
+        ctx, lambda: rdf.do_fmt(ctx, FMT_ADDR, ARGS_ADDR, PROC_ADDR, put_data)
+    )
+    rdf.cleanup()
+    assert ctx.alloc.is_all_free()
+    return res
+
+
+def get_idiom(name):
+    for entry in put_proc_idioms:
+        if entry[0] == name:
+            return entry[1]
+
+
+def lib_rawdofmt_find_test():
+    ctx = setup_ctx()
+    mem = ctx.mem
+    for name, code, handler in put_proc_idioms:
+        mem.w_block(PROC_ADDR, code)
+        assert find_put_proc(mem, PROC_ADDR) == (name, handler)
+    # nop in front
+    mem.w_block(PROC_ADDR, b"\x4e\x71\x16\xc0\x4e\x75")
+    assert find_put_proc(mem, PROC_ADDR) is None
+
+
+@pytest.mark.parametrize("name", ["store", "store_link", "store_frame"])
+def lib_rawdofmt_store_test(name):
+    ctx = setup_ctx()
+    setup_fmt(ctx)
+    res = run_fmt(ctx, get_idiom(name), BUF_ADDR)
+    assert res == (ARGS_ADDR + 8, "a=%ld s=%s!", "a=42 s=hello!", True)
+    assert ctx.mem.r_block(BUF_ADDR, 14) == b"a=42 s=hello!\0"
+
+
+def _emulate(ctx, code, put_data, chunk_size=1024):
+    # a leading nop hides the idiom and the proc runs on the CPU
+    return run_fmt(ctx, b"\x4e\x71" + code, put_data, chunk_size)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1024])
+@pytest.mark.parametrize(
+    "name", ["store", "store_link", "store_frame", "count", "store_ptr"]
+)
+def lib_rawdofmt_idiom_emu_test(name, chunk_size):
+    code = get_idiom(name)
+    results = []
+    for emu in (False, True):
+        ctx = setup_ctx()
+        setup_fmt(ctx)
+        mem = ctx.mem
+        mem.w32(DATA_ADDR, 3 if name == "count" else BUF_ADDR)
+        put_data = DATA_ADDR if name in ("count", "store_ptr") else BUF_ADDR
+        if emu:
+            res = _emulate(ctx, code, put_data, chunk_size)
+        else:
+            res = run_fmt(ctx, code, put_data, chunk_size)
+        assert res[3] == (not emu)
+        results.append((res[:3], mem.r32(DATA_ADDR), mem.r_block(BUF_ADDR, 16)))
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize("left", [-2, 0, 1, 5, 13, 14, 100])
+def lib_rawdofmt_store_limit_test(left):
+    code = get_idiom("store_limit")
+    results = []
+    for emu in (False, True):
+        ctx = setup_ctx()
+        setup_fmt(ctx)
+        mem = ctx.mem
+        mem.w_block(BUF_ADDR, b"-" * 16)
+        mem.w32(DATA_ADDR, BUF_ADDR)
+        mem.w32s(DATA_ADDR + 4, left)
+        if emu:
+            res = _emulate(ctx, code, DATA_ADDR, 4)
+        else:
+            res = run_fmt(ctx, code, DATA_ADDR)
+        results.append(
+            (
+                res[:3],
+                mem.r32(DATA_ADDR),
+                mem.r32s(DATA_ADDR + 4),
+                mem.r_block(BUF_ADDR, 16),
+            )
+        )
+    assert results[0] == results[1]
+    n = min(max(left, 0), 14)
+    assert results[0][1] == BUF_ADDR + n
+    assert results[0][2] == left - 14
+    assert results[0][3] == b"a=42 s=hello!\0"[:n] + b"-" * (16 - n)
+
+
+def lib_rawdofmt_reuse_frag_test():
+    ctx = setup_ctx()
+    setup_fmt(ctx)
+    ctx.mem.w_block(PROC_ADDR, b"\x4e\x71\x16\xc0\x4e\x75")
+    rdf = RawDoFmt(ctx.alloc)
+
+    def do_fmt():
+        return rdf.do_fmt(ctx, FMT_ADDR, ARGS_ADDR, PROC_ADDR, BUF_ADDR)
+
+    call_from_prog(ctx, do_fmt)
+    frag = rdf.frag
+    assert frag is not None
+    ctx.mem.w_cstr(FMT_ADDR, "%ld")
+    assert call_from_prog(ctx, do_fmt)[2] == "42"
+    assert rdf.frag is frag
+    assert ctx.mem.r_cstr(BUF_ADDR) == "42"
+    rdf.cleanup()
+    assert rdf.frag is None
+    assert ctx.alloc.is_all_free()
+
+
+def lib_rawdofmt_func_test():
+    ctx = setup_ctx()
+    setup_fmt(ctx)
+    ctx.mem.w_block(PROC_ADDR, b"\x4e\x71\x16\xc0\x4e\x75")
+    res = call_from_prog(
+        ctx, lambda: raw_do_fmt(ctx, FMT_ADDR, ARGS_ADDR, PROC_ADDR, BUF_ADDR)
+    )
+    assert res == (ARGS_ADDR + 8, "a=%ld s=%s!", "a=42 s=hello!", False)
+    assert ctx.mem.r_cstr(BUF_ADDR) == "a=42 s=hello!"
+    assert ctx.alloc.is_all_free()
+
+
+def lib_rawdofmt_parse_cache_test():
+    ctx = setup_ctx()
+    mem = ctx.mem
+    fmt = "%d+%d=%ld"
+    ps = printf_parse_cached(fmt)
+    assert printf_parse_cached(fmt) is ps
+    # the cached state is reused with other data
+    mem.w16(ARGS_ADDR, 1)
+    mem.w16(ARGS_ADDR + 2, 2)
+    mem.w32(ARGS_ADDR + 4, 3)
+    assert printf(fmt, mem, ARGS_ADDR) == "1+2=3"
+    mem.w16(ARGS_ADDR, 0xFFFF)
+    assert printf(fmt, mem, ARGS_ADDR) == "-1+2=3"
+    # generating output twice gives the same result
+    printf_read_data(ps, mem, ARGS_ADDR)
+    assert printf_generate_output(ps) == printf_generate_output(ps)
+    assert printf("a%%b %ld c", mem, ARGS_ADDR + 4) == "a%b 3 c"
@@ -96,11 +96,12 @@ def _create_scan():
     return scanner.scan(name, impl, fd, True)
 
 
-def libcore_stub_gen_base_test(capsys):
+@pytest.mark.parametrize("codegen", [True, False])
+def libcore_stub_gen_base_test(capsys, codegen):
     scan = _create_scan()
     ctx = _create_ctx()
     # create stub
-    gen = LibStubGen()
+    gen = LibStubGen(codegen=codegen)
     stub = gen.gen_stub(scan, ctx)
     _check_stub(stub)
     # call func
@@ -122,12 +123,13 @@ def libcore_stub_gen_base_test(capsys):
     assert cap.out.strip() == "VamosTest: PrintString('hello, world!')"
 
 
-def libcore_stub_gen_profile_test():
+@pytest.mark.parametrize("codegen", [True, False])
+def libcore_stub_gen_profile_test(codegen):
     scan = _create_scan()
     ctx = _create_ctx()
     profile = LibProfileData(scan.get_fd())
     # create stub
-    gen = LibStubGen()
+    gen = LibStubGen(codegen=codegen)
     stub = gen.gen_stub(scan, ctx, profile)
     _check_stub(stub)
     # call func
@@ -138,14 +140,15 @@ def libcore_stub_gen_profile_test():
     _check_profile(scan.get_fd(), profile)
 
 
-def libcore_stub_gen_log_test(caplog):
+@pytest.mark.parametrize("codegen", [True, False])
+def libcore_stub_gen_log_test(caplog, codegen):
     caplog.set_level(logging.INFO)
     scan = _create_scan()
     ctx = _create_ctx()
     log_missing = logging.getLogger("missing")
     log_valid = logging.getLogger("valid")
     # create stub
-    gen = LibStubGen(log_missing=log_missing, log_valid=log_valid)
+    gen = LibStubGen(log_missing=log_missing, log_valid=log_valid, codegen=codegen)
     stub = gen.gen_stub(scan, ctx)
     _check_stub(stub)
     # call func
@@ -156,7 +159,8 @@ def libcore_stub_gen_log_test(caplog):
     _check_log(caplog)
 
 
-def libcore_stub_gen_log_profile_test(caplog):
+@pytest.mark.parametrize("codegen", [True, False])
+def libcore_stub_gen_log_profile_test(caplog, codegen):
     caplog.set_level(logging.INFO)
     scan = _create_scan()
     ctx = _create_ctx()
@@ -164,7 +168,7 @@ def libcore_stub_gen_log_profile_test(caplog):
     log_valid = logging.getLogger("valid")
     profile = LibProfileData(scan.get_fd())
     # create stub
-    gen = LibStubGen(log_missing=log_missing, log_valid=log_valid)
+    gen = LibStubGen(log_missing=log_missing, log_valid=log_valid, codegen=codegen)
     stub = gen.gen_stub(scan, ctx, profile)
     _check_stub(stub)
     # call func
@@ -176,11 +180,12 @@ def libcore_stub_gen_log_profile_test(caplog):
     _check_profile(scan.get_fd(), profile)
 
 
-def libcore_stub_gen_exc_default_test():
+@pytest.mark.parametrize("codegen", [True, False])
+def libcore_stub_gen_exc_default_test(codegen):
     scan = _create_scan()
     ctx = _create_ctx()
     # create stub
-    gen = LibStubGen()
+    gen = LibStubGen(codegen=codegen)
     stub = gen.gen_stub(scan, ctx)
     _check_stub(stub)
     # call func
@@ -190,7 +195,8 @@ def libcore_stub_gen_exc_default_test():
         stub.RaiseError()
 
 
-def libcore_stub_gen_multi_arg_test(caplog):
+@pytest.mark.parametrize("codegen", [True, False])
+def libcore_stub_gen_multi_arg_test(caplog, codegen):
     caplog.set_level(logging.INFO)
     scan = _create_scan()
     ctx = _create_ctx()
@@ -198,7 +204,7 @@ def libcore_stub_gen_multi_arg_test(caplog):
     log_valid = logging.getLogger("valid")
     profile = LibProfileData(scan.get_fd())
     # create stub
-    gen = LibStubGen(log_missing=log_missing, log_valid=log_valid)
+    gen = LibStubGen(log_missing=log_missing, log_valid=log_valid, codegen=codegen)
     stub = gen.gen_stub(scan, ctx, profile)
     _check_stub(stub)
     # call func
@@ -210,6 +216,34 @@ def libcore_stub_gen_multi_arg_test(caplog):
     _check_profile(scan.get_fd(), profile)
 
 
+class NoRetTestLibrary(VamosTestLibrary):
+    def PrintHello(self, ctx) -> None:
+        return 42
+
+
+def libcore_stub_gen_code_ret_anno_test():
+    name = "vamostest.library"
+    impl = NoRetTestLibrary()
+    fd = read_lib_fd(name)
+    scan = LibImplScanner().scan(name, impl, fd)
+    ctx = _create_ctx()
+    stub = LibStubGen().gen_stub(scan, ctx)
+    # no return value: d0 is not touched
+    ctx.cpu.w_reg(REG_D0, 7)
+    assert stub.PrintHello() == 42
+    assert ctx.cpu.r_reg(REG_D0) == 7
+    # int: d0 is set
+    ctx.cpu.w_reg(REG_D0, 0xFFFFFFFF)
+    ctx.cpu.w_reg(REG_D1, 2)
+    assert stub.Add() == 0x100000001
+    assert ctx.cpu.r_reg(REG_D0) == 1
+    # tuple: d0, d1 are set
+    stub.Swap()
+    assert ctx.cpu.r_reg(REG_D0) == 2
+    assert ctx.cpu.r_reg(REG_D1) == 1
+    assert stub.Swap.__name__ == "Swap"
+
+
 def libcore_stub_gen_fake_base_test():
     name = "vamostest.library"
     fd = read_lib_fd(name)
@@ -1,5 +1,9 @@
 import pytest
-from amitools.vamos.libstructs import DosLibraryStruct
+from amitools.vamos.libstructs import (
+    DosLibraryStruct,
+    ExAllDataStruct,
+    ExAllControlStruct,
+)
 from amitools.vamos.machine import MockMemory
 
 
@@ -7,3 +11,8 @@ def libstructs_dos_dosbase_test():
     mem = MockMemory()
     dosbase = DosLibraryStruct(mem, 0x100)
     assert dosbase.get_byte_size() == 70
+
+
+def libstructs_dos_exall_test():
+    assert ExAllDataStruct.get_size() == 40
+    assert ExAllControlStruct.get_size() == 16
@@ -1,3 +1,4 @@
+import pytest
 from machine68k import CPUType
 from amitools.vamos.machine import Machine
 from amitools.vamos.machine.opcodes import *
@@ -48,6 +49,114 @@ def machine_machine_instr_hook_test():
     m.cleanup()
 
 
+def machine_machine_run_hook_test():
+    m, cpu, mem, code, stack = create_machine()
+    a = []
+
+    def my_hook(cycles):
+        a.append((cpu.r_pc(), cycles))
+
+    m.set_run_hook(my_hook)
+    # count down loop: moveq #100,d0 / subq.l #1,d0 / bne.s -4 / rts
+    mem.w16(code, 0x7064)
+    mem.w16(code + 2, 0x5380)
+    mem.w16(code + 4, 0x66FC)
+    mem.w16(code + 6, op_rts)
+    rs = m.run(code, stack, cycles_per_run=100)
+    assert rs.done
+    assert rs.error is None
+    # hook is not called for the final slice
+    assert len(a) > 10
+    assert sum(c for _, c in a) < rs.cycles
+    for pc, cycles in a:
+        assert code <= pc < code + 8
+        assert cycles > 0
+    m.cleanup()
+
+
+def write_trap_loop(mem, code, loops, trap_addr=None):
+    # move.l #loops,d0 / [jsr trap_addr.w] / subq.l #1,d0 / bne.s / rts
+    mem.w16(code, 0x203C)
+    mem.w32(code + 2, loops)
+    addr = code + 6
+    if trap_addr is not None:
+        mem.w16(addr, 0x4EB8)
+        mem.w16(addr + 2, trap_addr)
+        addr += 4
+    mem.w16(addr, 0x5380)
+    mem.w16(addr + 2, 0x6600 | ((code + 6 - addr - 4) & 0xFF))
+    mem.w16(addr + 4, op_rts)
+
+
+def machine_machine_fixed_slicing_test():
+    m, cpu, mem, code, stack = create_machine()
+    write_trap_loop(mem, code, 10000)
+    rs = m.run(code, stack, cycles_per_run=1000)
+    assert rs.done
+    assert rs.error is None
+    assert rs.max_slice == 1000
+    assert rs.cycles // 1010 <= rs.slices <= rs.cycles // 1000 + 1
+    assert rs.trap_slices == 0
+    m.cleanup()
+
+
+def machine_machine_adaptive_slicing_test():
+    m = Machine(slicing="adaptive", max_cycles_per_run=64000, raise_on_main_run=False)
+    mem = m.get_mem()
+    code = m.get_ram_begin()
+    stack = m.get_scratch_top()
+    # no traps: slices grow up to max
+    write_trap_loop(mem, code, 100000)
+    rs = m.run(code, stack, cycles_per_run=1000)
+    assert rs.done
+    assert rs.error is None
+    assert rs.max_slice == 64000
+    assert rs.slices < rs.cycles // 10000
+    # only the final slice calls the exit trap
+    assert rs.trap_slices == 1
+    # trap in every loop: slices stay small
+    calls = []
+
+    def trap(op, pc):
+        calls.append(pc)
+
+    trap_addr = m.setup_quick_trap(trap)
+    write_trap_loop(mem, code, 1000, trap_addr)
+    rs = m.run(code, stack, cycles_per_run=1000)
+    assert rs.done
+    assert rs.error is None
+    assert len(calls) == 1000
+    assert rs.max_slice == 1000
+    assert rs.trap_slices == rs.slices
+    m.free_quick_trap(trap_addr)
+    m.cleanup()
+
+
+def machine_machine_adaptive_max_cycles_test():
+    m = Machine(slicing="adaptive", raise_on_main_run=False)
+    mem = m.get_mem()
+    code = m.get_ram_begin()
+    stack = m.get_scratch_top()
+    write_trap_loop(mem, code, 1000000)
+    rs = m.run(code, stack, cycles_per_run=1000, max_cycles=100000)
+    assert not rs.done
+    # large slices do not run past max cycles
+    assert 100000 <= rs.cycles < 100100
+    # disable adaptive slicing
+    m.set_adaptive_slicing(False)
+    m.run_states = []
+    rs = m.run(code, stack, cycles_per_run=1000, max_cycles=100000)
+    assert rs.max_slice == 1000
+    m.cleanup()
+
+
+def machine_machine_adaptive_enable_test():
+    m = Machine()
+    with pytest.raises(ValueError):
+        m.set_adaptive_slicing(True)
+    m.cleanup()
+
+
 def machine_machine_cpu_mem_trace_test():
     m, cpu, mem, code, stack = create_machine()
     a = []
@@ -219,7 +328,14 @@ def machine_machine_run_addr_exc_test():
 
 def machine_machine_cfg_test():
     cfg = ConfigDict(
-        {"cpu": "68020", "ram_size": 2048, "max_cycles": 128, "cycles_per_run": 2000}
+        {
+            "cpu": "68020",
+            "ram_size": 2048,
+            "max_cycles": 128,
+            "cycles_per_run": 2000,
+            "slicing": "adaptive",
+            "max_cycles_per_run": 64000,
+        }
     )
     m = Machine.from_cfg(cfg, True)
     assert m
@@ -228,4 +344,6 @@ def machine_machine_cfg_test():
     assert m.get_ram_total_kib() == 2048
     assert m.max_cycles == 128
     assert m.cycles_per_run == 2000
+    assert m.adaptive_slicing
+    assert m.max_cycles_per_run == 64000
     assert m.get_label_mgr()
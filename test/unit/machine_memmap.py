@@ -1,4 +1,5 @@
 from amitools.vamos.machine import MemoryMap, Machine, HWAccess
+from amitools.vamos.mem import MemoryAlloc, BinMemoryAlloc
 from amitools.vamos.cfgcore import ConfigDict
 
 
@@ -11,3 +12,14 @@ def machine_memmap_parse_config_test():
     assert mm.get_old_dos_guard_base() != old_base
     assert mm.get_hw_access().mode == HWAccess.MODE_IGNORE
     assert mm.get_alloc()
+
+
+def machine_memmap_mem_alloc_test():
+    machine = Machine()
+    mm = MemoryMap(machine)
+    cfg = ConfigDict({"hw_access": "emu", "old_dos_guard": False})
+    assert mm.parse_config(cfg)
+    assert type(mm.get_alloc()) is MemoryAlloc
+    cfg = ConfigDict({"hw_access": "emu", "old_dos_guard": False, "mem_alloc": "bins"})
+    assert mm.parse_config(cfg)
+    assert type(mm.get_alloc()) is BinMemoryAlloc
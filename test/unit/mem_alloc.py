@@ -1,20 +1,108 @@
+import random
+import pytest
 from amitools.vamos.machine import MockMemory
-from amitools.vamos.mem import MemoryAlloc
+from amitools.vamos.mem import MemoryAlloc, BinMemoryAlloc
+from amitools.vamos.label import LabelManager
 
+alloc_types = pytest.mark.parametrize("alloc_type", [MemoryAlloc, BinMemoryAlloc])
 
-def mem_alloc_base_test():
+
+@alloc_types
+def mem_alloc_base_test(alloc_type):
     mem = MockMemory()
-    alloc = MemoryAlloc(mem)
+    alloc = alloc_type(mem)
     assert alloc.is_all_free()
     addr = alloc.alloc_mem(1024)
     alloc.free_mem(addr, 1024)
     assert alloc.is_all_free()
 
 
-def mem_alloc_nonbase4_test():
+@alloc_types
+def mem_alloc_nonbase4_test(alloc_type):
     mem = MockMemory()
-    alloc = MemoryAlloc(mem)
+    alloc = alloc_type(mem)
     assert alloc.is_all_free()
     addr = alloc.alloc_mem(1021)
     alloc.free_mem(addr, 1021)
     assert alloc.is_all_free()
+
+
+@alloc_types
+def mem_alloc_out_of_mem_test(alloc_type):
+    mem = MockMemory()
+    alloc = alloc_type(mem, addr=0x1000, size=0x1000)
+    a = alloc.alloc_mem(0x800)
+    b = alloc.alloc_mem(0x800)
+    assert alloc.alloc_mem(4, except_on_fail=False) == 0
+    assert alloc.largest_chunk() == 0
+    alloc.free_mem(a, 0x800)
+    alloc.free_mem(b, 0x800)
+    assert alloc.largest_chunk() == 0x1000
+
+
+@alloc_types
+def mem_alloc_stats_test(alloc_type):
+    mem = MockMemory(size_kib=68)
+    alloc = alloc_type(mem, addr=0x1000, size=0x10000)
+    addrs = [alloc.alloc_mem(0x100) for _ in range(16)]
+    # free every second one
+    for addr in addrs[::2]:
+        alloc.free_mem(addr, 0x100)
+    stats = alloc.get_stats()
+    assert stats["peak_used"] == 0x1000
+    assert stats["used"] == 0x800
+    assert stats["num_allocs"] == 16
+    assert stats["cur_allocs"] == 8
+    assert stats["free_chunks"] == 9
+    assert stats["largest_free"] == 0x10000 - 0x1000
+    assert 0.0 < stats["fragmentation"] < 1.0
+    for addr in addrs[1::2]:
+        alloc.free_mem(addr, 0x100)
+    stats = alloc.get_stats()
+    assert stats["fragmentation"] == 0.0
+    assert stats["free_chunks"] == 1
+
+
+@alloc_types
+def mem_alloc_memory_label_test(alloc_type):
+    mem = MockMemory()
+    lm = LabelManager()
+    alloc = alloc_type(mem, label_mgr=lm)
+    m = alloc.alloc_memory(100, label="foo")
+    assert alloc.get_memory(m.addr) is m
+    assert lm.get_label(m.addr) is m.label
+    alloc.free_memory(m)
+    assert lm.get_label(m.addr) is None
+    assert alloc.is_all_free()
+
+
+@alloc_types
+def mem_alloc_random_test(alloc_type):
+    rnd = random.Random(23)
+    mem = MockMemory(size_kib=1028)
+    alloc = alloc_type(mem, addr=0x1000, size=0x100000)
+    allocs = {}
+    for _ in range(5000):
+        if allocs and rnd.random() < 0.45:
+            addr = rnd.choice(list(allocs))
+            alloc.free_mem(addr, allocs.pop(addr))
+        else:
+            size = rnd.choice((4, 12, 40, 100, 256, 1000, 4096, 20000))
+            addr = alloc.alloc_mem(size, except_on_fail=False)
+            if addr != 0:
+                allocs[addr] = size
+        # check: allocations do not overlap with free chunks or each other
+        if rnd.random() < 0.02:
+            ranges = [(a, (s + 3) & ~3) for a, s in allocs.items()]
+            ranges += alloc._get_free_chunks()
+            ranges.sort()
+            pos = 0x1000
+            for a, s in ranges:
+                assert a == pos
+                pos = a + s
+            assert pos == 0x101000
+            assert alloc.available() == alloc.get_free_bytes()
+    for addr, size in allocs.items():
+        alloc.free_mem(addr, size)
+    assert alloc.is_all_free()
+    assert alloc.get_stats()["free_chunks"] == 1
@@ -0,0 +1,61 @@
+import os
+from amitools.vamos.path.dircache import DirCache
+
+
+def touch_dir(path, delta):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + delta))
+
+
+def path_dircache_get_names_test(tmpdir):
+    tmpdir.join("Foo").write("")
+    tmpdir.mkdir("BAR")
+    dc = DirCache()
+    path = str(tmpdir)
+    assert dc.get_names(path) == {"foo": "Foo", "bar": "BAR"}
+    assert dc.get_stats() == {"dirs": 1, "hits": 0, "misses": 1, "stale": 0}
+    assert dc.get_names(path) == {"foo": "Foo", "bar": "BAR"}
+    assert dc.get_stats()["hits"] == 1
+    # no dirs
+    assert dc.get_names(str(tmpdir.join("Foo"))) is None
+    assert dc.get_names(str(tmpdir.join("missing"))) is None
+
+
+def path_dircache_mtime_test(tmpdir):
+    dc = DirCache()
+    path = str(tmpdir)
+    assert dc.get_names(path) == {}
+    tmpdir.join("New").write("")
+    # make sure the change is seen on fs with coarse time stamps
+    touch_dir(path, 1000)
+    assert dc.get_names(path) == {"new": "New"}
+    assert dc.get_stats()["stale"] == 1
+
+
+def path_dircache_invalidate_test(tmpdir):
+    dc = DirCache()
+    sub = tmpdir.mkdir("sub")
+    path = str(tmpdir)
+    sub_path = str(sub)
+    assert dc.get_names(path) == {"sub": "sub"}
+    assert dc.get_names(sub_path) == {}
+    # keep mtime to see the invalidation only
+    st = os.stat(sub_path)
+    sub.join("File").write("")
+    os.utime(sub_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert dc.get_names(sub_path) == {}
+    dc.invalidate(os.path.join(sub_path, "File"))
+    assert dc.get_names(sub_path) == {"file": "File"}
+    # parent is kept
+    assert dc.get_stats()["dirs"] == 2
+    # invalidate a dir drops it and its parent
+    dc.invalidate(sub_path + "/")
+    assert dc.get_stats()["dirs"] == 0
+
+
+def path_dircache_max_dirs_test(tmpdir):
+    dc = DirCache(max_dirs=2)
+    paths = [str(tmpdir.mkdir("d%d" % i)) for i in range(3)]
+    for path in paths:
+        dc.get_names(path)
+    assert sorted(dc.dirs) == paths[1:]
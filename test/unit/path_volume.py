@@ -169,3 +169,26 @@ def path_volume_temp_test(tmpdir):
     v.shutdown()
     # now temp is gone
     assert not tmpdir.join("bla").check()
+
+
+def path_volume_ami_to_sys_dir_cache_test(tmpdir):
+    v = VolumeManager()
+    mp = tmpdir.mkdir("bla")
+    my_path = str(mp)
+    mp.mkdir("Foo").mkdir("BAR")
+    assert v.add_volume("My:" + my_path)
+    a2s = v.ami_to_sys_path
+    assert a2s("my:foo/bar") == os.path.join(my_path, "Foo", "BAR")
+    stats = v.get_dir_cache_stats()
+    assert stats["misses"] == 2
+    assert stats["hits"] == 0
+    # dir listings are reused
+    assert a2s("my:FOO/bar/baz") == os.path.join(my_path, "Foo", "BAR", "baz")
+    stats = v.get_dir_cache_stats()
+    assert stats["misses"] == 3
+    assert stats["hits"] == 2
+    # vamos created a new entry
+    new_path = os.path.join(my_path, "Foo", "BAR", "Baz")
+    os.mkdir(new_path)
+    v.invalidate_sys_path(new_path)
+    assert a2s("my:foo/bar/baz") == new_path
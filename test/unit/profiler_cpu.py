@@ -0,0 +1,165 @@
+import logging
+from machine68k import CPUType
+from amitools.vamos.machine import Machine
+from amitools.vamos.machine.opcodes import op_rts
+from amitools.vamos.label import LabelSegment
+from amitools.vamos.profiler import CPUProfiler, MainProfiler
+from amitools.vamos.cfgcore import ConfigDict
+from amitools.binfmt.BinImage import (
+    Segment,
+    SymbolTable,
+    Symbol,
+    DebugLine,
+    DebugLineFile,
+    DebugLineEntry,
+    SEGMENT_TYPE_CODE,
+)
+
+# main:  bsr.w func / rts
+# func:  move.l #loops,d0 / subq.l #1,d0 / bne.s loop / rts
+MAIN_OFF = 0
+FUNC_OFF = 0x10
+LOOP_OFF = 0x16
+
+
+def create_segment(size):
+    seg = Segment(SEGMENT_TYPE_CODE, size)
+    symtab = SymbolTable()
+    symtab.add_symbol(Symbol(FUNC_OFF, b"_func"))
+    symtab.add_symbol(Symbol(MAIN_OFF, b"_main"))
+    seg.set_symtab(symtab)
+    debug_line = DebugLine()
+    df = DebugLineFile(b"test.c")
+    df.add_entry(DebugLineEntry(MAIN_OFF, 1))
+    df.add_entry(DebugLineEntry(FUNC_OFF, 10))
+    df.add_entry(DebugLineEntry(LOOP_OFF, 11))
+    debug_line.add_file(df)
+    seg.set_debug_line(debug_line)
+    return seg
+
+
+def create_machine(loops=1000):
+    m = Machine(CPUType.M68000, raise_on_main_run=False)
+    mem = m.get_mem()
+    seg_addr = m.get_ram_begin()
+    seg_size = 0x40
+    code = seg_addr + 8
+    # main
+    mem.w16(code + MAIN_OFF, 0x6100)
+    mem.w16(code + MAIN_OFF + 2, FUNC_OFF - 2)
+    mem.w16(code + MAIN_OFF + 4, op_rts)
+    # func
+    mem.w16(code + FUNC_OFF, 0x203C)
+    mem.w32(code + FUNC_OFF + 2, loops)
+    mem.w16(code + LOOP_OFF, 0x5380)
+    mem.w16(code + LOOP_OFF + 2, 0x66FC)
+    mem.w16(code + LOOP_OFF + 4, op_rts)
+    label = LabelSegment("prog:0:code", seg_addr, seg_size, create_segment(seg_size))
+    m.get_label_mgr().add_label(label)
+    return m, code
+
+
+def run_profiler(prof, loops=1000):
+    m, code = create_machine(loops)
+    prof.machine = m
+    prof.setup()
+    rs = m.run(code, m.get_scratch_top())
+    assert rs.done
+    assert rs.error is None
+    prof.shutdown()
+    assert m.run_hook is None
+    m.cleanup()
+    return rs
+
+
+def profiler_cpu_sample_test():
+    prof = CPUProfiler(None, interval=100)
+    rs = run_profiler(prof)
+    # the last slice ends the run and is not sampled
+    assert prof.num_samples > 100
+    assert rs.cycles - 100 <= prof.total_cycles <= rs.cycles
+    # nearly all samples are in the loop of func called by main
+    stacks = prof.stacks
+    assert stacks["_main;_func"] > prof.total_cycles * 0.9
+    assert set(stacks) <= {"_main", "_main;_func"}
+    assert prof.lines["test.c:11"] > prof.total_cycles * 0.9
+    funcs = prof.get_func_cycles()
+    func_self, func_total = funcs["_func"]
+    main_self, main_total = funcs["_main"]
+    assert func_self == func_total
+    assert main_total == prof.total_cycles
+
+
+def profiler_cpu_flat_test():
+    prof = CPUProfiler(None, interval=100, depth=0)
+    run_profiler(prof)
+    assert set(prof.stacks) <= {"_main", "_func"}
+    assert prof.stacks["_func"] > prof.total_cycles * 0.9
+
+
+def profiler_cpu_collapsed_test(tmpdir):
+    path = str(tmpdir.join("stacks.txt"))
+    prof = CPUProfiler(None, interval=100, collapsed=path)
+    run_profiler(prof)
+    with open(path) as fh:
+        lines = fh.read().splitlines()
+    stacks = {}
+    for line in lines:
+        stack, cycles = line.rsplit(" ", 1)
+        stacks[stack] = int(cycles)
+    assert stacks == prof.stacks
+
+
+def profiler_cpu_data_test():
+    prof = CPUProfiler(None, interval=100)
+    run_profiler(prof)
+    data = prof.get_data()
+    prof2 = CPUProfiler(None)
+    assert prof2.set_data(data)
+    assert prof2.get_data() == data
+    # adding data merges samples
+    assert prof2.set_data(data)
+    assert prof2.num_samples == prof.num_samples * 2
+    assert prof2.stacks["_main;_func"] == prof.stacks["_main;_func"] * 2
+
+
+def profiler_cpu_dump_test():
+    prof = CPUProfiler(None, interval=100)
+    run_profiler(prof)
+    lines = []
+    prof.dump(lines.append)
+    assert lines[0] == "%d samples, %d cycles" % (prof.num_samples, prof.total_cycles)
+    assert lines[2].endswith("_func")
+    assert any(line.endswith("test.c:11") for line in lines)
+
+
+def profiler_cpu_main_test(caplog):
+    caplog.set_level(logging.INFO, "prof")
+    m, code = create_machine()
+    mp = MainProfiler()
+    cfg = ConfigDict(
+        {
+            "enabled": True,
+            "cpu": {"enabled": True, "interval": 200, "depth": 4, "collapsed": None},
+            "output": {"dump": True, "file": None, "append": False},
+        }
+    )
+    assert mp.parse_config(cfg)
+    prof = CPUProfiler(m)
+    assert mp.add_profiler(prof)
+    assert prof.interval == 200
+    assert prof.depth == 4
+    mp.setup()
+    assert m.cycles_per_run == 200
+    m.run(code, m.get_scratch_top())
+    mp.shutdown()
+    m.cleanup()
+    assert prof.num_samples > 50
+    msgs = [r[2] for r in caplog.record_tuples]
+    assert "----- profiler 'cpu' -----" in msgs
+
+
+def profiler_cpu_invalid_config_test():
+    prof = CPUProfiler(None)
+    cfg = ConfigDict({"enabled": True, "interval": -1, "depth": 4, "collapsed": None})
+    assert not prof.parse_config(cfg)